@@ -3,19 +3,43 @@
 """
 多项目自动化打包部署工具
 从 config.yaml 读取配置，支持终端上下键选择项目。
-依赖: pip install pyyaml inquirer
+依赖: pip install pyyaml inquirer psutil
 """
 
 import os
+import re
 import sys
+import filecmp
+import hashlib
+import tarfile
+import argparse
 import subprocess
 import shutil
 from pathlib import Path
 import time
+import json
+import queue
+import threading
+from collections import deque
 import yaml
 import inquirer
+import psutil
+from build_worker import WorkerPool, WorkerError, git_snapshot, unpack_to
 
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+MANIFEST_NAME = ".deploy_manifest.json"  # 老版本写在部署目录里的清单, 比较目录时忽略
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MANIFEST_DIR = os.path.join(PROJECT_ROOT, "dpconfig", "deploy-manifests")  # 部署清单放这里, 不进部署目录, 不会被发布出去
+PURGE_JOB_DIR = os.path.join(PROJECT_ROOT, "dpconfig", "purge-jobs")  # refetch_cdn.py --jobs 从这里取刷新任务
+# 文件名里带内容 hash 的产物改了内容就换名字, 不用刷 CDN。默认规则故意很严, 认不出来的宁可多刷:
+# - webpack 的 app.3f2a1b9c.js: 扩展名前 8 位以上十六进制, 字母数字都要有 (logo-20240101.png 是日期, 不算)
+# - vite 的 assets/index-B2x_9aQc.js: 只认 assets/ 下面 "-" 加正好 8 位, 里面至少有一个数字或大写字母
+#   (img/bg-banner01.png 不在 assets 下不算, assets/btn-download.png 全是小写单词也不算)
+# 匹配的是相对部署目录的路径 (/ 分隔), config.yaml 的 hashed_file_pattern 可以换成自己的规则
+HASHED_FILE_PATTERN = (
+    r"[.-](?=[0-9a-f]*[a-f])(?=[0-9a-f]*[0-9])[0-9a-f]{8,}\.[A-Za-z0-9]+$"
+    r"|(?:^|/)assets/(?:[^/]+/)*[^/]+-(?=[a-z_-]{0,7}[0-9A-Z])[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$"
+)
 
 def load_config():
     """加载并校验 YAML 配置"""
@@ -56,10 +80,168 @@ def select_project(projects):
     return next(p for p in projects if p['name'] == selected_name)
 
 
+def link_or_copy(src, dst):
+    """能硬链接就硬链接 (几乎不占空间), 跨盘等情况退回普通复制"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def exchange_dirs(a, b):
+    """
+    原子交换两个目录 (Linux 3.15+ 的 renameat2 RENAME_EXCHANGE), 任何时刻两个路径都是完整的目录。
+    其它系统/文件系统不支持时返回 False, 调用方自己退回两次 rename
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    import ctypes
+    libc = ctypes.CDLL(None, use_errno=True)
+    if not hasattr(libc, "renameat2"):
+        return False
+    AT_FDCWD, RENAME_EXCHANGE = -100, 2
+    return libc.renameat2(AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE) == 0
+
+
+def is_content_hashed(rel_path, pattern=None):
+    """
+    文件名里是否带内容 hash (带的话不用刷 CDN), 规则见 HASHED_FILE_PATTERN。
+    这些不能算: img/bg-banner01.png, img/btn-closeBtn.png, img/logo-20240101.png,
+    assets/icon-settings.png, assets/icons/arrow-selected.png, assets/btn-download.png, assets/bg-homepage.png
+    """
+    return re.search(pattern or HASHED_FILE_PATTERN, rel_path.replace('\\', '/')) is not None
+
+
+def diff_trees(old_dir, new_dir):
+    """比较两个目录, 返回 (新增或内容变了的文件, 被删掉的文件), 都是相对路径"""
+    def files(root):
+        if not os.path.isdir(root):
+            return set()
+        return {
+            os.path.relpath(os.path.join(d, n), root).replace('\\', '/')
+            for d, _, names in os.walk(root) for n in names if n != MANIFEST_NAME
+        }
+
+    old, new = files(old_dir), files(new_dir)
+    changed = sorted(
+        p for p in new
+        if p not in old or not filecmp.cmp(os.path.join(old_dir, p), os.path.join(new_dir, p), shallow=False)
+    )
+    return changed, sorted(old - new)
+
+
+def tree_digest(root):
+    """目录内容摘要 (相对路径 + 文件内容的 sha1), 目录不存在返回 None"""
+    if not os.path.isdir(root):
+        return None
+    digest = hashlib.sha1()
+    paths = sorted(
+        os.path.relpath(os.path.join(d, n), root).replace('\\', '/')
+        for d, _, names in os.walk(root) for n in names if n != MANIFEST_NAME
+    )
+    for rel in paths:
+        digest.update(rel.encode('utf-8') + b'\0')
+        with open(os.path.join(root, rel), 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CommandResult:
+    """命令执行结果, bool() 等价于是否执行成功, 超时/卡死时带上最后几行输出"""
+
+    def __init__(self, return_code=None, timed_out=False, reason="", tail=None, duration=0.0):
+        self.return_code = return_code
+        self.timed_out = timed_out
+        self.reason = reason          # "timeout" / "idle" / "error" / ""
+        self.tail = list(tail or [])  # 最后几行输出
+        self.duration = duration
+
+    def __bool__(self):
+        return not self.timed_out and self.return_code == 0
+
+    def __repr__(self):
+        return f"CommandResult(return_code={self.return_code}, timed_out={self.timed_out}, reason={self.reason!r})"
+
+
+def kill_process_tree(pid, timeout=5):
+    """杀掉整棵进程树, shell=True 时只杀 shell 会留下 bun/node 孤儿进程"""
+    try:
+        parent = psutil.Process(pid)
+        procs = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    for p in procs:
+        try:
+            p.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    _, alive = psutil.wait_procs(procs, timeout=timeout)
+    for p in alive:
+        try:
+            p.kill()
+        except psutil.NoSuchProcess:
+            pass
+    psutil.wait_procs(alive, timeout=timeout)
+
+
+def run_with_watchdog(command, cwd=None, env=None, timeout=None, idle_timeout=None, on_line=None, tail_size=20):
+    """执行命令并实时输出, 超过总时长或 idle_timeout 秒没有输出就杀掉整棵进程树"""
+    start = time.time()
+    tail = deque(maxlen=tail_size)
+    process = subprocess.Popen(
+        command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, cwd=cwd, env=env, encoding='utf-8', errors='ignore'
+    )
+    lines = queue.Queue()
+
+    def reader():
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    threading.Thread(target=reader, daemon=True).start()
+
+    last_output = start
+    reason = ""
+    try:
+        while True:
+            try:
+                line = lines.get(timeout=0.5)
+            except queue.Empty:
+                line = ""
+            if line is None:
+                break
+            now = time.time()
+            if line:
+                last_output = now
+                tail.append(line.rstrip())
+                if on_line:
+                    on_line(line.rstrip())
+            if timeout and now - start > timeout:
+                reason = "timeout"
+            elif idle_timeout and now - last_output > idle_timeout:
+                reason = "idle"
+            if reason:
+                kill_process_tree(process.pid)
+                break
+    except KeyboardInterrupt:
+        kill_process_tree(process.pid)
+        raise
+
+    try:
+        return_code = process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        return_code = None
+    return CommandResult(return_code, bool(reason), reason, tail, time.time() - start)
+
+
 class AutoBuilder:
     """自动化构建部署类"""
 
-    def __init__(self, config):
+    def __init__(self, config, all_projects=None):
         self.config = config
         self.env = os.environ.copy()
         self.original_branch = None
@@ -81,6 +263,62 @@ class AutoBuilder:
         self.static_repo_branch = self.config.get('static_repo_branch', 'yufa')
         self.build_command = self.config.get('build_command', 'bun build')
 
+        # staticDeploy 部分克隆 + 稀疏检出配置
+        self.static_repo_url = self.config.get('static_repo_url')
+        self.sparse_checkout = self.config.get('sparse_checkout', False)
+        self.sparse_paths = self.collect_sparse_paths(all_projects or [self.config])
+
+        # 各阶段超时 (秒) 和无输出看门狗
+        self.stage_timeouts = self.config.get('stage_timeouts', {})
+        self.idle_timeout = self.config.get('idle_timeout', 300)
+
+        # 分布式打包: 配了 build_workers 就把打包分发给 worker
+        self.build_workers = self.config.get('build_workers', [])
+        self.build_worker_secret = self.config.get('build_worker_secret')  # 不配就用环境变量 BUILD_WORKER_SECRET
+
+        # 部署快照: 保留最近 N 次部署的硬链接快照, 用来秒级回滚
+        self.snapshot_keep = self.config.get('snapshot_keep', 5)
+        self.snapshot_dir = self.config.get('snapshot_dir') or os.path.join(
+            os.path.dirname(os.path.normpath(self.static_deploy_dir)), ".deploy_snapshots"
+        )
+        target_rel = os.path.relpath(self.deploy_target_dir, self.static_deploy_dir)
+        if target_rel.startswith('..'):
+            target_rel = os.path.basename(os.path.normpath(self.deploy_target_dir))
+        self.target_snapshot_dir = os.path.join(
+            self.snapshot_dir, target_rel.replace('\\', '/').strip('/').replace('/', '__')
+        )
+
+        # 没有新提交时跳过合并/拉取/打包
+        self.skip_unchanged = self.config.get('skip_unchanged', True)
+        manifest_key = re.sub(r'[^\w.-]+', '_', os.path.normpath(os.path.abspath(self.deploy_target_dir))).strip('_')
+        self.manifest_path = os.path.join(MANIFEST_DIR, f"{manifest_key}.json")
+
+        # CDN 刷新: 部署目录对应的线上地址前缀, 配了就按这次部署的变更生成刷新任务
+        self.public_url_prefix = self.config.get('public_url_prefix')
+        self.hashed_file_pattern = self.config.get('hashed_file_pattern')
+        self.purge_paths = []
+
+    def collect_sparse_paths(self, projects):
+        """收集共用同一个 staticDeploy 的项目的部署目录, 作为稀疏检出范围"""
+        static_root = os.path.normpath(self.static_deploy_dir)
+        paths = []
+        for p in projects:
+            if os.path.normpath(p.get('static_deploy_dir', '')) != static_root:
+                continue
+            target = p.get('deploy_target_dir')
+            if not target:
+                continue
+            if os.path.isabs(target):
+                rel = os.path.relpath(target, static_root)
+                if rel.startswith('..'):
+                    continue  # 不在 staticDeploy 里的目录管不了
+            else:
+                rel = target
+            rel = rel.replace('\\', '/').strip('/')
+            if rel and rel not in paths:
+                paths.append(rel)
+        return paths
+
     def log(self, message, level="INFO"):
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{timestamp}] [{level}] {message}")
@@ -99,29 +337,29 @@ class AutoBuilder:
             self.log(f"✗ 检查 {command} 命令时出错: {str(e)}", "ERROR")
             return False
 
-    def run_command(self, command, cwd=None, description=""):
+    def run_command(self, command, cwd=None, description="", stage="git"):
         self.log(f"执行: {description or command}")
         try:
-            process = subprocess.Popen(
-                command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                text=True, cwd=cwd, env=self.env, encoding='utf-8', errors='ignore'
+            result = run_with_watchdog(
+                command, cwd=cwd, env=self.env,
+                timeout=self.stage_timeouts.get(stage),
+                idle_timeout=self.idle_timeout,
+                on_line=lambda line: print(f"  > {line}"),
             )
-            while True:
-                line = process.stdout.readline()
-                if not line and process.poll() is not None:
-                    break
-                if line:
-                    print(f"  > {line.rstrip()}")
-            return_code = process.wait()
-            if return_code == 0:
-                self.log(f"✓ {description or '命令'} 执行成功")
-                return True
-            else:
-                self.log(f"✗ {description or '命令'} 执行失败, 返回码: {return_code}", "ERROR")
-                return False
         except Exception as e:
             self.log(f"✗ 执行命令出错: {str(e)}", "ERROR")
-            return False
+            return CommandResult(reason="error", tail=[str(e)])
+
+        if result.timed_out:
+            why = "总时长超时" if result.reason == "timeout" else f"超过 {self.idle_timeout} 秒没有输出"
+            self.log(f"✗ {description or '命令'} {why}, 已杀掉整个进程树 (耗时 {result.duration:.0f}s)", "ERROR")
+            for line in result.tail:
+                self.log(f"  | {line}", "ERROR")
+        elif result:
+            self.log(f"✓ {description or '命令'} 执行成功")
+        else:
+            self.log(f"✗ {description or '命令'} 执行失败, 返回码: {result.return_code}", "ERROR")
+        return result
 
     def get_current_branch(self, cwd):
         try:
@@ -139,10 +377,44 @@ class AutoBuilder:
             self.log(f"✗ 获取分支时出错: {str(e)}", "ERROR")
             return None
 
+    def git_output(self, command, cwd):
+        """执行 git 查询命令, 成功返回 stdout, 失败返回 None"""
+        try:
+            result = subprocess.run(
+                command, shell=True, capture_output=True, text=True,
+                cwd=cwd, env=self.env, encoding='utf-8', errors='ignore'
+            )
+            return result.stdout.strip() if result.returncode == 0 else None
+        except Exception as e:
+            self.log(f"✗ 执行 {command} 出错: {str(e)}", "ERROR")
+            return None
+
     def checkout_branch(self, branch_name, cwd):
         return self.run_command(f"git checkout {branch_name}", cwd=cwd, description=f"切换到 {branch_name} 分支")
 
+    def is_remote_up_to_date(self, cwd):
+        """对比本地 HEAD 和远端分支 SHA, 远端没有新提交就不用 pull 了"""
+        if not self.skip_unchanged:
+            return False
+        branch = self.git_output("git rev-parse --abbrev-ref HEAD", cwd)
+        local_sha = self.git_output("git rev-parse HEAD", cwd)
+        if not branch or not local_sha:
+            return False
+        remote = self.git_output(f"git ls-remote origin refs/heads/{branch}", cwd)
+        if not remote:
+            return False
+        remote_sha = remote.split()[0]
+        if remote_sha == local_sha:
+            return True
+        # 本地领先远端 (远端提交已经在本地历史里) 也算最新
+        if self.git_output(f"git cat-file -e {remote_sha}^{{commit}}", cwd) is None:
+            return False
+        return self.git_output(f"git merge-base --is-ancestor {remote_sha} HEAD", cwd) is not None
+
     def pull_branch(self, cwd):
+        if self.is_remote_up_to_date(cwd):
+            self.log("✓ 远端没有新提交, 跳过拉取")
+            return True
         return self.run_command("git pull", cwd=cwd, description="拉取最新代码")
 
     def merge_branch(self, branch_name, cwd):
@@ -185,6 +457,9 @@ class AutoBuilder:
             self.log(f"切换到 {self.deploy_target_branch} 分支失败, 艹!", "ERROR"); return False
         if not self.pull_branch(self.project_dir):
             self.log(f"拉取 {self.deploy_target_branch} 分支最新代码失败, 艹!", "ERROR"); return False
+        if self.skip_unchanged and self.git_output(f"git merge-base --is-ancestor {merge_branch} HEAD", self.project_dir) is not None:
+            self.log(f"✓ {merge_branch} 已经包含在 {self.deploy_target_branch} 里, 跳过合并")
+            return True
         if not self.merge_branch(merge_branch, self.project_dir):
             self.log(f"合并 {merge_branch} 分支失败, 程序退出!", "ERROR"); return False
 
@@ -196,13 +471,161 @@ class AutoBuilder:
         self.log(f"开始打包项目: {self.config['name']}")
         if not os.path.exists(self.project_dir):
             self.log(f"✗ 项目目录不存在: {self.project_dir}", "ERROR"); return False
-        return self.run_command(self.build_command, cwd=self.project_dir, description=f"执行 {self.build_command} 打包命令")
+        if self.build_workers:
+            return self.build_project_remote()
+        return self.run_command(self.build_command, cwd=self.project_dir, description=f"执行 {self.build_command} 打包命令", stage="build")
+
+    def build_project_remote(self):
+        """把 HEAD 的源码快照发给 worker 打包, 产物解压回 build_output_dir"""
+        rel_output = os.path.relpath(self.build_output_dir, self.project_dir)
+        if rel_output.startswith('..'):
+            self.log(f"✗ 分布式打包要求打包输出目录在项目里面: {self.build_output_dir}", "ERROR"); return False
+
+        try:
+            pool = WorkerPool(self.build_workers, secret=self.build_worker_secret, log=self.log)
+        except WorkerError as e:
+            self.log(f"✗ {e}", "ERROR"); return False
+        healthy = pool.health_check()
+        if not healthy:
+            self.log("✗ 没有可用的打包 worker, 艹, 先把 worker 起起来!", "ERROR"); return False
+        self.log(f"可用 worker: {', '.join(healthy)}")
+
+        try:
+            snapshot = git_snapshot(self.project_dir)
+            self.log(f"源码快照 {len(snapshot) / 1024 / 1024:.1f} MB")
+            # 只发项目名, 打包命令和输出目录由 worker 按项目名从它自己的 config.yaml 里查
+            result, artifact = pool.build({
+                "name": self.config['name'],
+                "timeout": self.stage_timeouts.get("build"),
+                "idle_timeout": self.idle_timeout,
+            }, snapshot)
+        except WorkerError as e:
+            self.log(f"✗ 分布式打包失败: {e}", "ERROR"); return False
+
+        for line in result.get("tail", []):
+            print(f"  > {line}")
+        if result.get("return_code") != 0 or result.get("timed_out"):
+            self.log(f"✗ worker {result['worker']} 打包失败: {result.get('reason') or result.get('return_code')}", "ERROR")
+            return False
+        if os.path.exists(self.build_output_dir):
+            shutil.rmtree(self.build_output_dir)
+        os.makedirs(self.build_output_dir)
+        try:
+            unpack_to(artifact, self.build_output_dir)
+        except (WorkerError, tarfile.TarError) as e:
+            self.log(f"✗ 解压 worker 产物失败: {e}", "ERROR"); return False
+        self.log(f"✓ worker {result['worker']} 打包成功, 耗时 {result.get('duration', 0):.0f}s")
+        return True
+
+    def read_deploy_manifest(self, path=None):
+        """读取部署清单 (默认是当前部署目录的), 没有返回 None"""
+        try:
+            with open(path or self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_deploy_manifest(self, path=None, digest=None):
+        """部署完记录产物对应的源码提交和部署目录的内容摘要, 下次用来判断是否需要重新打包"""
+        manifest = {
+            "project": self.config['name'],
+            "deploy_target_dir": self.deploy_target_dir,
+            "source_commit": self.git_output("git rev-parse HEAD", self.project_dir),
+            "source_branch": self.git_output("git rev-parse --abbrev-ref HEAD", self.project_dir),
+            "build_command": self.build_command,
+            "static_repo_branch": self.static_repo_branch,
+            "deploy_digest": digest or tree_digest(self.deploy_target_dir),
+            "deployed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        path = path or self.manifest_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
+    def is_remote_ahead(self, cwd):
+        """先 fetch 当前分支, 远端有本地还没有的提交返回 True (拿不到远端信息返回 False)"""
+        branch = self.git_output("git rev-parse --abbrev-ref HEAD", cwd)
+        if not branch or branch == "HEAD" or self.git_output(f"git fetch origin {branch}", cwd) is None:
+            return False
+        remote = self.git_output(f"git rev-parse origin/{branch}", cwd)
+        return bool(remote) and self.git_output(f"git merge-base --is-ancestor {remote} HEAD", cwd) is None
+
+    def is_deploy_up_to_date(self):
+        """部署清单里的源码提交和 HEAD 一致且工作区干净, 说明没啥可部署的"""
+        if not self.skip_unchanged or not os.path.exists(self.static_deploy_dir):
+            return False
+        head = self.git_output("git rev-parse HEAD", self.project_dir)
+        if not head:
+            return False
+        if self.git_output("git status --porcelain --untracked-files=no", self.project_dir) != "":
+            return False  # 有未提交的改动, 老老实实重新打包
+        manifest = self.read_deploy_manifest()
+        if not manifest:
+            return False
+        if manifest.get("source_commit") != head or manifest.get("build_command") != self.build_command:
+            return False
+        if self.is_remote_ahead(self.project_dir):
+            self.log("远端分支有本地还没拉的新提交, 不能跳过打包", "WARNING")
+            return False
+        # 清单是复制产物时写的, 之后部署目录可能被 git checkout 丢掉了, 或者 static 分支被别人改了
+        static_branch = self.git_output("git rev-parse --abbrev-ref HEAD", self.static_deploy_dir)
+        if manifest.get("static_repo_branch") != self.static_repo_branch or static_branch != self.static_repo_branch:
+            self.log(f"staticDeploy 不在 {self.static_repo_branch} 分支上, 不能确认部署目录, 重新打包")
+            return False
+        if self.is_remote_ahead(self.static_deploy_dir):
+            self.log("staticDeploy 远端有新提交, 部署目录可能变了, 重新打包")
+            return False
+        if not manifest.get("deploy_digest") or manifest["deploy_digest"] != tree_digest(self.deploy_target_dir):
+            self.log("部署目录和上次部署的产物不一致 (被还原或者改过), 重新打包")
+            return False
+        return True
+
+    def prepare_static_repo(self):
+        """staticDeploy 用部分克隆 (blob:none) + 稀疏检出, 只检出配置里用到的部署目录"""
+        if not self.sparse_checkout:
+            return True
+        self.log("=" * 60)
+        self.log(f"准备 staticDeploy 稀疏检出: {', '.join(self.sparse_paths)}")
+
+        if not os.path.exists(self.static_deploy_dir):
+            if not self.static_repo_url:
+                self.log(f"✗ staticDeploy 目录不存在且没配置 static_repo_url: {self.static_deploy_dir}", "ERROR")
+                return False
+            clone_cmd = (
+                f'git clone --filter=blob:none --sparse --branch {self.static_repo_branch} '
+                f'"{self.static_repo_url}" "{self.static_deploy_dir}"'
+            )
+            if not self.run_command(clone_cmd, description="部分克隆 staticDeploy 仓库"):
+                return False
+        elif self.git_output("git rev-parse --git-dir", self.static_deploy_dir) is None:
+            self.log(f"✗ {self.static_deploy_dir} 不是 git 仓库", "ERROR")
+            return False
+        else:
+            # 已有的完整克隆: 打开 partial clone 过滤, 后续 fetch 不再下载无关目录的 blob
+            if self.git_output("git config remote.origin.partialclonefilter", self.static_deploy_dir) != "blob:none":
+                self.git_output("git config remote.origin.promisor true", self.static_deploy_dir)
+                self.git_output("git config remote.origin.partialclonefilter blob:none", self.static_deploy_dir)
+                self.log("已为 staticDeploy 开启 partial clone (blob:none)")
+
+        current = self.git_output("git sparse-checkout list", self.static_deploy_dir)
+        if current is not None and sorted(current.splitlines()) == sorted(self.sparse_paths):
+            self.log("✓ 稀疏检出范围没变化, 跳过")
+            return True
+        paths = " ".join(f'"{p}"' for p in self.sparse_paths)
+        return self.run_command(
+            f"git sparse-checkout set --cone {paths}",
+            cwd=self.static_deploy_dir, description="设置 staticDeploy 稀疏检出范围"
+        )
 
     def git_pull_static_deploy(self):
         self.log("=" * 60)
         self.log("更新 staticDeploy 仓库")
         if not os.path.exists(self.static_deploy_dir):
             self.log(f"✗ staticDeploy 目录不存在: {self.static_deploy_dir}", "ERROR"); return False
+        if self.is_remote_up_to_date(self.static_deploy_dir):
+            self.log("✓ staticDeploy 远端没有新提交, 跳过拉取")
+            return True
         return self.run_command("git pull", cwd=self.static_deploy_dir, description="拉取 staticDeploy 最新代码")
 
     def copy_build_output(self):
@@ -212,18 +635,198 @@ class AutoBuilder:
             self.log(f"✗ 打包输出目录不存在: {self.build_output_dir}", "ERROR")
             self.log("  可能是打包失败了, 检查一下上面的错误信息", "ERROR"); return False
         try:
+            self.purge_paths = self.collect_purge_paths()
+            snapshot = self.create_snapshot() if self.snapshot_keep > 0 else None
             if os.path.exists(self.deploy_target_dir):
                 self.log(f"删除旧的部署目录: {self.deploy_target_dir}")
                 shutil.rmtree(self.deploy_target_dir)
+            # 部署目录始终是独立的副本: 和快照共用 inode 的话, 谁原地改了部署目录里的文件快照也跟着变
             self.log(f"复制: {self.build_output_dir}")
             self.log(f"  到: {self.deploy_target_dir}")
             shutil.copytree(self.build_output_dir, self.deploy_target_dir)
+            if snapshot:
+                os.makedirs(MANIFEST_DIR, exist_ok=True)
+                shutil.copy2(self.snapshot_manifest(snapshot), self.manifest_path)
+                self.prune_snapshots()
+            else:
+                self.write_deploy_manifest()
             file_count = sum(1 for _ in Path(self.deploy_target_dir).rglob("*") if _.is_file())
             self.log(f"✓ 复制完成, 共 {file_count} 个文件")
             return True
         except Exception as e:
             self.log(f"✗ 复制文件时出错: {str(e)}", "ERROR"); return False
 
+    def collect_purge_paths(self):
+        """和当前部署目录比较, 找出需要刷 CDN 的文件: 内容变了或被删掉的、文件名不带 hash 的"""
+        changed, removed = diff_trees(self.deploy_target_dir, self.build_output_dir)
+        paths = [p for p in changed + removed if not is_content_hashed(p, self.hashed_file_pattern)]
+        self.log(f"本次部署 {len(changed)} 个文件有变化, {len(removed)} 个被删除, "
+                 f"其中 {len(paths)} 个文件名不带 hash, 需要刷新 CDN")
+        return sorted(paths)
+
+    def purge_urls(self):
+        """
+        把要刷新的文件映射成线上地址, index.html 顺带刷它所在的目录 (访问 /xxx/ 时返回的就是它)。
+        返回 (URL 列表, {URL: {'content_length': 产物大小}}), 后者给 refetch_cdn 验证刷新后拿到的是不是新文件
+        """
+        prefix = self.public_url_prefix.rstrip('/') + '/'
+        urls, expected = [], {}
+        for path in self.purge_paths:
+            targets = [prefix + path]
+            if path == 'index.html' or path.endswith('/index.html'):
+                targets.insert(0, prefix + path[:-len('index.html')])
+            urls.extend(targets)
+            local = os.path.join(self.build_output_dir, *path.split('/'))
+            if os.path.isfile(local):  # 被删掉的文件没有预期值
+                expected.update((url, {"content_length": os.path.getsize(local)}) for url in targets)
+        return urls, expected
+
+    def write_purge_job(self):
+        """生成 CDN 刷新任务文件, refetch_cdn.py --job <文件> 或 --jobs 提交"""
+        if not self.purge_paths:
+            self.log("没有需要刷新 CDN 的文件")
+            return None
+        if not self.public_url_prefix:
+            self.log(f"有 {len(self.purge_paths)} 个文件需要刷新 CDN, 但没配 public_url_prefix, 只能手动刷了:", "WARNING")
+            for path in self.purge_paths:
+                self.log(f"  {path}", "WARNING")
+            return None
+        urls, expected = self.purge_urls()
+        job = {
+            "project": self.config['name'],
+            "deploy_target_dir": self.deploy_target_dir,
+            "source_commit": self.git_output("git rev-parse HEAD", self.project_dir),
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "urls": urls,
+            "expected": expected,
+        }
+        os.makedirs(PURGE_JOB_DIR, exist_ok=True)
+        name = re.sub(r'[^\w.-]+', '_', os.path.basename(os.path.normpath(self.deploy_target_dir)))
+        job_file = os.path.join(PURGE_JOB_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}.json")
+        with open(job_file, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        self.log(f"✓ 已生成 CDN 刷新任务: {job_file} ({len(urls)} 个 URL)")
+        return job_file
+
+    @staticmethod
+    def snapshot_manifest(snapshot):
+        """快照的清单放在快照目录旁边 (<快照>.json), 不混进产物"""
+        return snapshot.rstrip('/\\') + ".json"
+
+    def list_snapshots(self):
+        """返回当前部署目标的快照目录, 新的在前"""
+        if not os.path.isdir(self.target_snapshot_dir):
+            return []
+        names = [n for n in os.listdir(self.target_snapshot_dir)
+                 if os.path.isdir(os.path.join(self.target_snapshot_dir, n)) and not n.startswith('.')]
+        return [os.path.join(self.target_snapshot_dir, n) for n in sorted(names, reverse=True)]
+
+    def create_snapshot(self):
+        """把打包产物存成一个新快照, 和上一个快照内容相同的文件直接硬链接过去 (快照之间共用, 快照本身不会再改)"""
+        previous = next(iter(self.list_snapshots()), None)
+        head = self.git_output("git rev-parse --short HEAD", self.project_dir) or "unknown"
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}"
+        name, counter = f"{stamp}-{head}", 1
+        while os.path.exists(os.path.join(self.target_snapshot_dir, name)):  # 同一毫秒连着部署两次
+            counter += 1
+            name = f"{stamp}-{head}-{counter}"
+        snapshot = os.path.join(self.target_snapshot_dir, name)
+        tmp = os.path.join(self.target_snapshot_dir, f".{name}.tmp")
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+
+        linked = 0
+        def copy_function(src, dst):
+            nonlocal linked
+            if previous:
+                old = os.path.join(previous, os.path.relpath(dst, tmp))
+                if os.path.isfile(old) and filecmp.cmp(src, old, shallow=False):
+                    linked += 1
+                    return link_or_copy(old, dst)
+            return shutil.copy2(src, dst)
+
+        os.makedirs(self.target_snapshot_dir, exist_ok=True)
+        shutil.copytree(self.build_output_dir, tmp, copy_function=copy_function)
+        os.rename(tmp, snapshot)
+        self.write_deploy_manifest(self.snapshot_manifest(snapshot), digest=tree_digest(snapshot))  # 部署目录还没换, 按快照内容算
+        self.log(f"已保存部署快照: {name} ({linked} 个文件和上次相同, 直接复用)")
+        return snapshot
+
+    def prune_snapshots(self):
+        for old in self.list_snapshots()[self.snapshot_keep:]:
+            self.log(f"删除过期快照: {os.path.basename(old)}")
+            shutil.rmtree(old, ignore_errors=True)
+            if os.path.exists(self.snapshot_manifest(old)):
+                os.remove(self.snapshot_manifest(old))
+
+    def rollback(self, snapshot):
+        """
+        把快照复制到部署目录旁边的临时目录, 再整个换到部署目录, 不用重新打包。
+        Linux 上用 renameat2 原子交换; Windows/macOS 没有目录原子交换, 退回两次 rename, 中间有一瞬间部署目录不存在
+        """
+        start = time.time()
+        staging = self.deploy_target_dir.rstrip('/\\') + ".rollback-tmp"
+        retired = self.deploy_target_dir.rstrip('/\\') + ".rollback-old"
+        for path in (staging, retired):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        try:
+            shutil.copytree(snapshot, staging)  # 复制而不是硬链接, 部署目录不和快照共用文件
+            if os.path.exists(self.deploy_target_dir) and exchange_dirs(staging, self.deploy_target_dir):
+                retired = staging  # 交换后旧内容在 staging 里
+            else:
+                if os.path.exists(self.deploy_target_dir):
+                    os.rename(self.deploy_target_dir, retired)
+                os.rename(staging, self.deploy_target_dir)
+        except Exception as e:
+            self.log(f"✗ 回滚失败: {str(e)}", "ERROR")
+            if not os.path.exists(self.deploy_target_dir) and os.path.exists(retired):
+                os.rename(retired, self.deploy_target_dir)
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+        shutil.rmtree(retired, ignore_errors=True)
+        if os.path.exists(self.snapshot_manifest(snapshot)):
+            os.makedirs(MANIFEST_DIR, exist_ok=True)
+            shutil.copy2(self.snapshot_manifest(snapshot), self.manifest_path)
+        self.log(f"✓ 已回滚到快照 {os.path.basename(snapshot)}, 耗时 {time.time() - start:.2f}s", "SUCCESS")
+        return True
+
+    def run_rollback(self):
+        """交互式选择一个历史快照回滚"""
+        snapshots = self.list_snapshots()
+        if not snapshots:
+            self.log(f"✗ 没有找到 {self.deploy_target_dir} 的部署快照", "ERROR"); return False
+
+        current = (self.read_deploy_manifest() or {}).get("deployed_at")
+        choices = []
+        for path in snapshots:
+            # 老快照的清单还在快照目录里面
+            manifest = (self.read_deploy_manifest(self.snapshot_manifest(path))
+                        or self.read_deploy_manifest(os.path.join(path, MANIFEST_NAME)) or {})
+            label = f"{os.path.basename(path)}  {manifest.get('source_branch', '')}"
+            if current and manifest.get("deployed_at") == current:
+                label += "  (当前)"
+            choices.append((label, path))
+
+        answers = inquirer.prompt([
+            inquirer.List('snapshot', message="选择要回滚到的快照 (↑↓ 选择, Enter 确认)", choices=choices, carousel=True)
+        ])
+        if not answers:
+            self.log("用户取消回滚"); return False
+        if not self.rollback(answers['snapshot']):
+            return False
+        self.log(f"部署路径: {self.deploy_target_dir}")
+        self.log("💡 回滚后记得在 staticDeploy 里检查并 git commit")
+        return True
+
+    def restore_original_branch(self):
+        if self.original_branch:
+            self.log("=" * 60)
+            self.log(f"切回原始分支: {self.original_branch}")
+            if not self.checkout_branch(self.original_branch, self.project_dir):
+                self.log(f"切回 {self.original_branch} 分支失败, 需要手动切换!", "WARNING")
+
     # =====================================================
 
     def run(self):
@@ -240,11 +843,22 @@ class AutoBuilder:
         if not self.handle_branch_merge():
             self.log("分支合并失败, 程序退出!", "ERROR"); return False
 
-        # 3. 执行打包
+        # 3. 没有新提交就不用打包了
+        if self.is_deploy_up_to_date():
+            self.restore_original_branch()
+            print("\n" + "=" * 60)
+            self.log("✓ 没有新提交, 部署目录已经是当前 HEAD 的产物, 没啥可做的", "SUCCESS")
+            self.log(f"部署路径: {self.deploy_target_dir}")
+            print("=" * 60 + "\n")
+            return True
+
+        # 4. 执行打包
         if not self.build_project():
             self.log("打包失败了, 艹, 检查一下代码有没有问题!", "ERROR"); return False
         
-        # 4. 切换 static 仓库分支并拉取
+        # 5. 切换 static 仓库分支并拉取
+        if not self.prepare_static_repo():
+            self.log("staticDeploy 稀疏检出准备失败, 艹!", "ERROR"); return False
         if not self.checkout_branch(self.static_repo_branch, self.static_deploy_dir):
             self.log(f"切换到 static 的 {self.static_repo_branch} 分支失败, 艹!", "ERROR"); return False
         if not self.git_pull_static_deploy():
@@ -252,33 +866,39 @@ class AutoBuilder:
             if input("\n是否继续复制文件? (y/n): ").lower() != 'y':
                 self.log("用户取消操作"); return False
 
-        # 5. 复制打包产物
+        # 6. 复制打包产物
         if not self.copy_build_output():
             self.log("复制文件失败, 艹, 检查一下权限问题!", "ERROR"); return False
 
-        # 7. 切回原始分支
-        if self.original_branch:
-            self.log("=" * 60)
-            self.log(f"切回原始分支: {self.original_branch}")
-            if not self.checkout_branch(self.original_branch, self.project_dir):
-                self.log(f"切回 {self.original_branch} 分支失败, 需要手动切换!", "WARNING")
+        # 7. 生成 CDN 刷新任务, 产物这时候只是暂存了还没推送, 刷了 CDN 回源拿到的还是旧文件,
+        #    所以这里只留任务文件, 推送上线后再用 refetch_cdn.py --jobs 提交
+        job_file = self.write_purge_job()
+
+        # 8. 切回原始分支
+        self.restore_original_branch()
 
         # 完成
         print("\n" + "=" * 60)
         self.log("🎉 所有操作完成! 打包部署成功!", "SUCCESS")
         self.log(f"部署路径: {self.deploy_target_dir}")
         self.log("💡 文件已自动添加到暂存区，请手动检查后执行 git commit")
+        if job_file:
+            self.log("💡 推送上线后执行 python src/xiongmaoboshi/refetch_cdn.py --jobs 刷新 CDN")
         print("=" * 60 + "\n")
         return True
 
 
 def main():
+    parser = argparse.ArgumentParser(description="多项目自动化打包部署工具")
+    parser.add_argument("--rollback", action="store_true", help="从部署快照回滚, 不重新打包")
+    args = parser.parse_args()
+
     projects = load_config()
     selected_config = select_project(projects)
     
-    builder = AutoBuilder(selected_config)
+    builder = AutoBuilder(selected_config, projects)
     try:
-        success = builder.run()
+        success = builder.run_rollback() if args.rollback else builder.run()
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         print("\n\n用户中断操作, 艹, 不玩了!")
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式打包 worker 和调度端
+worker 监听一个 TCP 端口, 收到源码快照后在临时目录里打包, 再把产物打包传回去。
+本机起几个不同端口的 worker 就能模拟多台机器:
+    export BUILD_WORKER_SECRET=<两边一样的密钥>
+    python build_worker.py serve --port 9701
+    python build_worker.py serve --port 9702
+    python build_worker.py ping 127.0.0.1:9701 127.0.0.1:9702
+
+安全: worker 只执行自己 config.yaml 里配过的项目 (按项目名查 build_command / worker_setup_command /
+build_output_dir), 不执行调度端发过来的命令; 每个请求都要带上用共享密钥算的 HMAC 签名, 对不上直接拒绝。
+
+协议: 每条消息 = 4 字节大端头长度 + JSON 头 + 头里 size 指定长度的二进制数据
+    ping  -> {"ok": true, "busy": false, "host": ..., "pid": ...}
+    build -> {"ok": true, "return_code": 0, "reason": "", "tail": [...], "size": N} + 产物 tar.gz
+"""
+
+import io
+import os
+import sys
+import hmac
+import json
+import time
+import hashlib
+import posixpath
+import shutil
+import socket
+import struct
+import tarfile
+import argparse
+import tempfile
+import threading
+import subprocess
+import socketserver
+from pathlib import PurePosixPath
+from concurrent.futures import ThreadPoolExecutor
+
+HEADER = struct.Struct(">I")
+CHUNK_SIZE = 1024 * 1024
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+SECRET_ENV = "BUILD_WORKER_SECRET"
+MAX_CLOCK_SKEW = 300  # 签名里的时间戳和 worker 本机时间最多差多少秒, 防止旧请求被重放
+SIGNED_FIELDS = ("op", "name", "timeout", "idle_timeout", "ts")
+
+
+class WorkerError(Exception):
+    """worker 连接/协议出错, 调度端会换一个 worker 重试"""
+
+
+def sign(secret, header, payload=b""):
+    """对头里的关键字段和数据的 sha256 算 HMAC"""
+    fields = json.dumps({k: header.get(k) for k in SIGNED_FIELDS}, sort_keys=True)
+    message = f"{fields}\n{hashlib.sha256(payload).hexdigest()}".encode("utf-8")
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify(secret, header, payload=b""):
+    ts = header.get("ts")
+    if not isinstance(ts, (int, float)) or abs(time.time() - ts) > MAX_CLOCK_SKEW:
+        return False
+    return hmac.compare_digest(sign(secret, header, payload), str(header.get("auth", "")))
+
+
+def load_worker_projects(path=CONFIG_FILE):
+    """
+    worker 能打包的项目: 和 build.py 用同一个 config.yaml, 项目名 -> 打包命令 / 安装命令 / 输出目录 (相对项目根目录)
+    输出目录跑到项目外面的项目不接
+    """
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as f:
+        projects = (yaml.safe_load(f) or {}).get("projects", [])
+    allowed = {}
+    for p in projects:
+        project_dir = p["project_dir"].replace("\\", "/").rstrip("/")
+        output = p["build_output_dir"].replace("\\", "/")
+        if output.startswith(project_dir + "/"):
+            output = output[len(project_dir) + 1:]
+        output = posixpath.normpath(output)
+        if posixpath.isabs(output) or ":" in output or output.split("/")[0] == "..":
+            print(f"[worker] 跳过项目 {p['name']}: 打包输出目录不在项目目录里 ({p['build_output_dir']})")
+            continue
+        allowed[p["name"]] = {
+            "build_command": p["build_command"],
+            "setup_command": p.get("worker_setup_command", "bun install"),
+            "build_output_dir": output,
+        }
+    return allowed
+
+
+def send_message(sock, header, payload=b""):
+    header = dict(header, size=len(payload))
+    data = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(HEADER.pack(len(data)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(min(CHUNK_SIZE, size - len(buf)))
+        if not chunk:
+            raise WorkerError("连接被对方关闭")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_message(sock):
+    (length,) = HEADER.unpack(recv_exact(sock, HEADER.size))
+    header = json.loads(recv_exact(sock, length).decode("utf-8"))
+    payload = recv_exact(sock, header.get("size", 0)) if header.get("size") else b""
+    return header, payload
+
+
+def pack_dir(path):
+    """把目录打成内存里的 tar.gz"""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz", compresslevel=1) as tar:
+        tar.add(path, arcname=".")
+    return buf.getvalue()
+
+
+def unpack_to(data, path):
+    """解压 tar.gz 到 path, 路径越界直接报错; 支持解压过滤器的 Python 用 filter='data', 老版本不接受链接"""
+    root = os.path.realpath(path)
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as tar:
+        members = tar.getmembers()
+        for member in members:
+            target = os.path.realpath(os.path.join(root, member.name))
+            if os.path.commonpath([root, target]) != root:
+                raise WorkerError(f"快照里有越界路径: {member.name}")
+        if hasattr(tarfile, "data_filter"):  # 3.12+, 以及打了补丁的 3.8~3.11
+            try:
+                tar.extractall(root, filter="data")
+            except tarfile.FilterError as e:
+                raise WorkerError(f"快照里有不安全的文件: {e}")
+            return
+        for member in members:
+            if not (member.isfile() or member.isdir()):
+                raise WorkerError(f"快照里有链接或特殊文件, 不解压: {member.name}")
+        tar.extractall(root)
+
+
+def git_snapshot(project_dir, ref="HEAD"):
+    """用 git archive 打源码快照, 只包含提交过的文件 (不带 node_modules)"""
+    result = subprocess.run(
+        ["git", "archive", "--format=tar", ref], cwd=project_dir, capture_output=True
+    )
+    if result.returncode != 0:
+        raise WorkerError(result.stderr.decode("utf-8", "ignore").strip() or "git archive 失败")
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz", compresslevel=1) as out:
+        with tarfile.open(fileobj=io.BytesIO(result.stdout), mode="r:") as src:
+            for member in src.getmembers():
+                out.addfile(member, src.extractfile(member) if member.isfile() else None)
+    return buf.getvalue()
+
+
+# ========================== worker 端 ==========================
+
+class BuildRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        try:
+            header, payload = recv_message(self.request)
+            if not verify(self.server.secret, header, payload):
+                print(f"[worker] 拒绝来自 {self.client_address[0]} 的请求: 签名不对或者已过期")
+                send_message(self.request, {"ok": False, "error": "unauthorized"})
+                return
+            op = header.get("op")
+            if op == "ping":
+                send_message(self.request, {
+                    "ok": True, "busy": self.server.build_lock.locked(),
+                    "host": socket.gethostname(), "pid": os.getpid(),
+                })
+            elif op == "build":
+                self.handle_build(header, payload)
+            else:
+                send_message(self.request, {"ok": False, "error": f"未知操作: {op}"})
+        except (WorkerError, OSError, ValueError) as e:
+            print(f"[worker] 处理请求出错: {e}")
+
+    def handle_build(self, header, payload):
+        project = self.server.projects.get(header.get("name"))
+        if not project:
+            send_message(self.request, {"ok": False, "error": f"worker 没有配置项目: {header.get('name')}"})
+            return
+        if not self.server.build_lock.acquire(blocking=False):
+            send_message(self.request, {"ok": False, "error": "busy"})
+            return
+        workdir = tempfile.mkdtemp(prefix="build-worker-")
+        try:
+            from build import run_with_watchdog
+
+            unpack_to(payload, workdir)
+            print(f"[worker] 开始打包: {header.get('name', '')} -> {workdir}")
+            on_line = lambda line: print(f"  > {line}")
+            timeout = header.get("timeout")
+            idle_timeout = header.get("idle_timeout")
+            # 命令只用 worker 自己配置里的, 调度端发来的头里就算带了命令也不看
+            result = None
+            for command in filter(None, [project["setup_command"], project["build_command"]]):
+                result = run_with_watchdog(
+                    command, cwd=workdir, timeout=timeout, idle_timeout=idle_timeout, on_line=on_line
+                )
+                if not result:
+                    break
+            if result is None:
+                send_message(self.request, {"ok": False, "error": f"项目 {header['name']} 没有配置打包命令"})
+                return
+
+            response = {
+                "ok": True, "return_code": result.return_code, "timed_out": result.timed_out,
+                "reason": result.reason, "tail": result.tail, "duration": result.duration,
+            }
+            artifact = b""
+            output_dir = os.path.join(workdir, *PurePosixPath(project["build_output_dir"]).parts)
+            if result and os.path.isdir(output_dir):
+                artifact = pack_dir(output_dir)
+            elif result:
+                response.update(return_code=1, reason="no_output", tail=[f"打包输出目录不存在: {project['build_output_dir']}"])
+            print(f"[worker] 打包结束, 返回码: {response['return_code']}, 产物 {len(artifact)} 字节")
+            send_message(self.request, response, artifact)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            self.server.build_lock.release()
+
+
+class BuildWorkerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, secret, projects):
+        super().__init__(address, BuildRequestHandler)
+        self.secret = secret
+        self.projects = projects
+        self.build_lock = threading.Lock()  # 一个 worker 同时只跑一个打包
+
+
+def serve(host="127.0.0.1", port=9701, secret=None, config_file=CONFIG_FILE):
+    secret = secret or os.environ.get(SECRET_ENV)
+    if not secret:
+        raise WorkerError(f"没有设置共享密钥, 先设置环境变量 {SECRET_ENV}")
+    projects = load_worker_projects(config_file)
+    with BuildWorkerServer((host, port), secret, projects) as server:
+        print(f"[worker] 监听 {host}:{port}, 可以打包 {len(projects)} 个项目, Ctrl+C 退出")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n[worker] 退出")
+
+
+# ========================== 调度端 ==========================
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class WorkerPool:
+    """管理一组 worker: 健康检查、分发打包、失败换 worker 重试"""
+
+    def __init__(self, addresses, secret=None, connect_timeout=3, build_timeout=None, queue_timeout=1800, log=None):
+        self.addresses = list(addresses)
+        self.secret = secret or os.environ.get(SECRET_ENV)
+        if not self.secret:
+            raise WorkerError(f"没有配置 worker 共享密钥 (build_worker_secret 或环境变量 {SECRET_ENV})")
+        self.connect_timeout = connect_timeout
+        self.build_timeout = build_timeout  # socket 读超时, None 表示一直等
+        self.queue_timeout = queue_timeout  # 所有 worker 都忙时最多排队等多久
+        self.log = log or (lambda message, level="INFO": print(f"[{level}] {message}"))
+        self.unhealthy = set()
+        self.in_use = set()  # 本进程正在用的 worker
+        self.lock = threading.Lock()
+        self.freed = threading.Condition(self.lock)  # 本进程有 worker 空出来时通知
+        self.next_index = 0
+
+    def request(self, address, header, payload=b"", timeout=None):
+        header = dict(header, ts=time.time())
+        header["auth"] = sign(self.secret, header, payload)
+        with socket.create_connection(parse_address(address), timeout=self.connect_timeout) as sock:
+            sock.settimeout(timeout)
+            send_message(sock, header, payload)
+            return recv_message(sock)
+
+    def ping(self, address):
+        try:
+            header, _ = self.request(address, {"op": "ping"}, timeout=self.connect_timeout)
+            return header
+        except (OSError, WorkerError, ValueError):
+            return None
+
+    def health_check(self):
+        """并发 ping 所有 worker, 返回健康的地址列表"""
+        with ThreadPoolExecutor(max_workers=max(1, len(self.addresses))) as pool:
+            states = list(pool.map(self.ping, self.addresses))
+        healthy = []
+        with self.lock:
+            for address, state in zip(self.addresses, states):
+                if state and state.get("ok"):
+                    self.unhealthy.discard(address)
+                    healthy.append(address)
+                else:
+                    self.unhealthy.add(address)
+        return healthy
+
+    def candidates(self):
+        """按轮询顺序返回健康的 worker, 让多个任务分散到不同机器"""
+        with self.lock:
+            start = self.next_index
+            self.next_index += 1
+            ordered = self.addresses[start % len(self.addresses):] + self.addresses[:start % len(self.addresses)]
+            return [a for a in ordered if a not in self.unhealthy]
+
+    def build(self, job, snapshot):
+        """
+        把一个打包任务发给 worker, worker 挂了就换下一个, 都忙就排队等到有空闲的 (最多 queue_timeout 秒)
+        job: name (worker 按项目名在自己的 config.yaml 里找命令) / timeout / idle_timeout
+        返回 (结果头, 产物 tar.gz)
+        """
+        header = dict(job, op="build")
+        tried = []
+        deadline = time.monotonic() + self.queue_timeout
+        waiting = False
+        while True:
+            candidates = [a for a in self.candidates() if a not in tried]
+            if not candidates:
+                raise WorkerError("没有可用的 worker")
+            for address in candidates:
+                with self.lock:
+                    if address in self.in_use:
+                        continue
+                state = self.ping(address)
+                if not state:
+                    self.log(f"worker {address} 没响应, 标记为不健康", "WARNING")
+                    with self.lock:
+                        self.unhealthy.add(address)
+                    continue
+                if not state.get("ok"):
+                    self.log(f"worker {address} 拒绝连接: {state.get('error')}, 检查两边的共享密钥", "WARNING")
+                    with self.lock:
+                        self.unhealthy.add(address)
+                    continue
+                if state.get("busy"):
+                    continue  # 被别的调度端占着
+                with self.lock:
+                    if address in self.in_use:
+                        continue
+                    self.in_use.add(address)
+                self.log(f"把 {job.get('name', '打包任务')} 发给 worker {address} ({state.get('host')})")
+                try:
+                    result, artifact = self.request(address, header, snapshot, timeout=self.build_timeout)
+                except (OSError, WorkerError, ValueError) as e:
+                    self.log(f"worker {address} 执行出错: {e}, 换一个 worker 重试", "WARNING")
+                    tried.append(address)
+                    with self.lock:
+                        self.unhealthy.add(address)
+                    continue
+                finally:
+                    with self.lock:
+                        self.in_use.discard(address)
+                        self.freed.notify_all()
+                if not result.get("ok"):
+                    self.log(f"worker {address} 拒绝任务: {result.get('error')}", "WARNING")
+                    if result.get("error") != "busy":
+                        tried.append(address)  # 没配这个项目之类的, 等也没用
+                    continue
+                result["worker"] = address
+                return result, artifact
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerError(f"排队 {self.queue_timeout}s 仍没有空闲的 worker")
+            if not waiting:
+                self.log(f"worker 都在忙, {job.get('name', '打包任务')} 排队等待 (最多 {self.queue_timeout}s)")
+                waiting = True
+            # 本进程的任务结束会立刻唤醒; 别的调度端占着的 worker 只能隔一会儿再 ping
+            with self.lock:
+                self.freed.wait(min(remaining, 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式打包 worker")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_serve = sub.add_parser("serve", help="启动 worker")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=9701)
+    p_serve.add_argument("--config", default=CONFIG_FILE, help="能打包的项目从这个配置里读")
+    p_ping = sub.add_parser("ping", help="检查 worker 是否可用")
+    p_ping.add_argument("addresses", nargs="+")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        serve(args.host, args.port, config_file=args.config)
+    else:
+        pool = WorkerPool(args.addresses)
+        for address in args.addresses:
+            state = pool.ping(address)
+            print(f"{address}: {'✓ ' + json.dumps(state, ensure_ascii=False) if state else '✗ 不可用'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,533 @@
+import os
+import sys
+import csv
+import json
+import time
+import struct
+import argparse
+import threading
+import subprocess
+from array import array
+
 import psutil
 
+ATTRS = ('pid', 'name', 'username')
+
+
 def get_running_processes():
     # 获取当前运行的进程信息
-    return [p.info for p in psutil.process_iter(['pid', 'name', 'username'])]
+    return [p.info for p in psutil.process_iter(list(ATTRS))]
 
-def kill_process_by_name(process_name):
-    # 遍历当前运行的进程
-    for p in psutil.process_iter(['pid', 'name', 'username']):
-        # 如果进程名匹配，则终止进程
-        if p.info['name'] == process_name:
+
+def kill_process_by_name(process_name, snapshot=None):
+    # 传了 snapshot 就直接查索引, 否则遍历当前运行的进程
+    procs = snapshot.find(process_name) if snapshot else (
+        p for p in psutil.process_iter(list(ATTRS)) if p.info['name'] == process_name)
+    killed = 0
+    for p in procs:
+        # 如果进程名匹配，则终止进程 (psutil 会检查 pid 有没有被别的进程复用)
+        try:
             p.kill()
+            killed += 1
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return killed
+
+
+class ProcessSnapshot:
+    """
+    进程表快照: 按 pid / 进程名 / 用户建索引, 查找不用再遍历所有进程。
+    refresh() 只对比 pid 列表, 新出现的进程才读属性 (oneshot 一次读完), 消失的从索引里删掉;
+    进程 exec 换了名字这种 pid 不变的变化要 refresh(full=True) 才能看到。
+    """
+
+    def __init__(self):
+        self.procs = {}    # pid -> psutil.Process (info 里是 pid/name/username)
+        self.by_name = {}  # name -> {pid}
+        self.by_user = {}  # username -> {pid}
+        self.refresh(full=True)
+
+    def _read(self, pid):
+        p = psutil.Process(pid)
+        with p.oneshot():
+            info = {'pid': pid}
+            for attr in ATTRS[1:]:
+                try:
+                    info[attr] = getattr(p, attr)()
+                except psutil.AccessDenied:
+                    info[attr] = None
+        p.info = info
+        return p
+
+    def _add(self, p):
+        self.procs[p.pid] = p
+        self.by_name.setdefault(p.info['name'], set()).add(p.pid)
+        self.by_user.setdefault(p.info['username'], set()).add(p.pid)
+
+    def _remove(self, pid):
+        p = self.procs.pop(pid)
+        for index, key in ((self.by_name, p.info['name']), (self.by_user, p.info['username'])):
+            pids = index.get(key)
+            if pids is not None:
+                pids.discard(pid)
+                if not pids:
+                    del index[key]
+
+    def refresh(self, full=False):
+        """同步到当前进程表, 返回 (新增个数, 消失个数)"""
+        current = set(psutil.pids())
+        known = set(self.procs)
+        gone = known - current if not full else known
+        for pid in gone:
+            self._remove(pid)
+        added = 0
+        for pid in current - set(self.procs):
+            try:
+                self._add(self._read(pid))
+                added += 1
+            except psutil.NoSuchProcess:
+                pass  # 读属性时已经退出了 (包括僵尸进程)
+        return added, len(gone)
+
+    def __len__(self):
+        return len(self.procs)
+
+    def __contains__(self, pid):
+        return pid in self.procs
+
+    def get(self, pid):
+        p = self.procs.get(pid)
+        return p and p.info
+
+    def find(self, name):
+        """按进程名查, 返回 psutil.Process 列表"""
+        return [self.procs[pid] for pid in self.by_name.get(name, ())]
+
+    def find_user(self, username):
+        return [self.procs[pid] for pid in self.by_user.get(username, ())]
+
+    def processes(self):
+        """和 get_running_processes() 一样的 [{'pid', 'name', 'username'}]"""
+        return [p.info for p in self.procs.values()]
+
+
+# 采样的列和 array 类型码: 时间 (秒) / pid / CPU% / 常驻内存 / 累计读写字节 / 线程数
+SAMPLE_COLUMNS = (('time', 'd'), ('pid', 'I'), ('cpu', 'f'), ('rss', 'Q'),
+                  ('read_bytes', 'Q'), ('write_bytes', 'Q'), ('threads', 'I'))
+SAMPLE_MAGIC = b'PSMP'
+
+# linux 上直接读 /proc/<pid>/stat, 一次拿到 CPU 时间/线程数/RSS, 比 psutil 分别读 stat/statm/status 便宜
+PROC_STAT = sys.platform.startswith('linux')
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if PROC_STAT else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if PROC_STAT else 4096
+
+
+def read_proc_stat(pid):
+    """返回 (状态, 累计 CPU 秒数, 线程数, RSS 字节)"""
+    with open(f'/proc/{pid}/stat', 'rb') as f:
+        data = f.read()
+    # 进程名在括号里, 可能带空格, 从最后一个 ')' 后面开始按字段切
+    fields = data[data.rfind(b')') + 2:].split()
+    return fields[0], (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, int(fields[17]), int(fields[21]) * PAGE_SIZE
+
+
+def read_proc_ppid(pid):
+    """只读父进程 pid, 比 psutil.Process(pid).ppid() 少建一个对象"""
+    with open(f'/proc/{pid}/stat', 'rb') as f:
+        data = f.read()
+    return int(data[data.rfind(b')') + 2:].split(None, 2)[1])
+
+
+def read_proc_io(pid):
+    """返回 (read_bytes, write_bytes), 没权限读就是 (0, 0)"""
+    try:
+        with open(f'/proc/{pid}/io', 'rb') as f:
+            values = dict(line.split(b': ') for line in f.read().splitlines())
+        return int(values[b'read_bytes']), int(values[b'write_bytes'])
+    except (PermissionError, KeyError):
+        return 0, 0
+
+
+class SampleRing:
+    """按列存的环形缓冲: 每列一个定长 array, 写满后覆盖最旧的, 比 list[dict] 省内存得多"""
+
+    def __init__(self, capacity=200000):
+        self.capacity = capacity
+        self.columns = {name: array(code, [0]) * capacity for name, code in SAMPLE_COLUMNS}
+        self.count = 0  # 一共写过多少行 (包括被覆盖的)
+
+    def append(self, *values):
+        i = self.count % self.capacity
+        for (name, _), value in zip(SAMPLE_COLUMNS, values):
+            self.columns[name][i] = value
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def column(self, name):
+        """按时间顺序返回一列 (array)"""
+        data = self.columns[name]
+        if self.count <= self.capacity:
+            return data[:self.count]
+        start = self.count % self.capacity
+        return data[start:] + data[:start]
+
+    def rows(self):
+        return zip(*(self.column(name) for name, _ in SAMPLE_COLUMNS))
+
+
+class ProcessSampler:
+    """
+    按固定间隔采样指定进程 (可以带上整个子进程树, 比如 bun build 起的一堆 worker) 的 CPU%、RSS、IO、线程数,
+    在后台线程里跑, 数据写进 SampleRing。为了能一直挂在构建机上, 开销压得很低: 子进程树每 tree_every 秒才重新找一次,
+    而且不用 psutil 的 children() (每个根进程都要把整个进程表的父子关系扫一遍): 自己维护 pid -> ppid,
+    每次只列一下 pid, 新出现的进程才去读它的父进程, 所有根进程共用;
+    linux 上每个进程每轮只读一次 /proc/<pid>/stat (其他系统用 psutil oneshot), IO 计数大约每秒读一次。
+    """
+
+    def __init__(self, pids=(), names=(), tree=True, interval=0.1, capacity=200000, tree_every=1.0):
+        self.roots = set(pids)
+        self.names = set(names)
+        self.tree = tree
+        self.interval = interval
+        self.tree_every = tree_every
+        self.ring = SampleRing(capacity)
+        self.procs = {}      # pid -> psutil.Process, 复用对象 cpu_percent 才有上一次的基准
+        self.labels = {}     # pid -> 进程名, 只有正在采样的; 进程退出就删掉, pid 被复用时重新取名
+        self.exited_labels = {}  # 退出的进程最后用的名字, 导出时补上
+        self.ppids = {}      # pid -> ppid, 整个进程表的, 增量更新
+        self.snapshot = ProcessSnapshot() if names else None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started = None
+        self.elapsed = 0.0
+        self.cpu_used = 0.0  # 采样线程自己用掉的 CPU 时间
+        self.ticks = 0
+        self.io_every = max(1, round(1.0 / interval))  # IO 计数是累计值, 大约每秒读一次就够了, 中间沿用上次的
+        self.last_cpu = {}   # pid -> (累计 CPU 秒数, 时间), 算 CPU%
+        self.last_io = {}    # pid -> (read_bytes, write_bytes)
+
+    def _refresh_ppids(self):
+        """列一遍 pid, 退出的删掉, 新出现的读一下父进程, 返回 ppid -> [子进程 pid]"""
+        current = set(psutil.pids())
+        for pid in set(self.ppids) - current:
+            del self.ppids[pid]
+        for pid in current - set(self.ppids):
+            try:
+                self.ppids[pid] = read_proc_ppid(pid) if PROC_STAT else psutil.Process(pid).ppid()
+            except (OSError, IndexError, ValueError, psutil.Error):
+                pass  # 刚列出来就退出了
+        children = {}
+        for pid, ppid in self.ppids.items():
+            children.setdefault(ppid, []).append(pid)
+        return children
+
+    def _targets(self):
+        """找出这一轮要采样的进程: 根进程 (+ 按名字匹配的) 以及它们的子进程"""
+        roots = set(self.roots)
+        if self.snapshot is not None:
+            self.snapshot.refresh()
+            for name in self.names:
+                roots.update(p.pid for p in self.snapshot.find(name))
+        pids = set()
+        for pid in roots:
+            try:
+                if (self.procs.get(pid) or psutil.Process(pid)).status() == psutil.STATUS_ZOMBIE:
+                    continue  # 已经退出, 只是父进程还没回收
+            except psutil.NoSuchProcess:
+                continue
+            pids.add(pid)
+        if self.tree and pids:
+            children = self._refresh_ppids()
+            stack = list(pids)
+            while stack:
+                for child in children.get(stack.pop(), ()):
+                    if child not in pids:
+                        pids.add(child)
+                        stack.append(child)
+        for pid in pids - set(self.procs):
+            try:
+                self.procs[pid] = psutil.Process(pid)
+                self.labels[pid] = self.procs[pid].name()
+            except psutil.Error:
+                self.procs.pop(pid, None)
+        for pid in set(self.procs) - pids:
+            self._forget(pid)
+        return pids
+
+    def _forget(self, pid):
+        """进程退出或者不在树里了: 清掉它的状态, 名字挪到 exited_labels"""
+        self.procs.pop(pid, None)
+        self.last_cpu.pop(pid, None)
+        self.last_io.pop(pid, None)
+        if pid in self.labels:
+            self.exited_labels[pid] = self.labels.pop(pid)
+
+    def all_labels(self):
+        """导出用: 退出的进程也带上名字, 同一个 pid 以最近的进程为准"""
+        return {**self.exited_labels, **self.labels}
+
+    def _read_fast(self, pid, now, read_io):
+        state, cpu_seconds, threads, rss = read_proc_stat(pid)
+        if state == b'Z':
+            raise psutil.NoSuchProcess(pid)
+        last = self.last_cpu.get(pid)
+        self.last_cpu[pid] = (cpu_seconds, now)
+        cpu = (cpu_seconds - last[0]) / (now - last[1]) * 100 if last and now > last[1] else 0.0
+        if read_io or pid not in self.last_io:
+            self.last_io[pid] = read_proc_io(pid)
+        return cpu, rss, threads, self.last_io[pid]
+
+    def _read_psutil(self, p, read_io):
+        with p.oneshot():
+            cpu = p.cpu_percent(None)
+            rss = p.memory_info().rss
+            threads = p.num_threads()
+            if (read_io or p.pid not in self.last_io) and hasattr(p, 'io_counters'):
+                try:
+                    counters = p.io_counters()
+                    self.last_io[p.pid] = (counters.read_bytes, counters.write_bytes)
+                except psutil.AccessDenied:
+                    pass
+        return cpu, rss, threads, self.last_io.get(p.pid, (0, 0))
+
+    def sample_once(self, now=None):
+        """采一轮, 返回采到的进程数"""
+        now = time.time() if now is None else now
+        read_io = self.ticks % self.io_every == 0
+        sampled = 0
+        for pid, p in list(self.procs.items()):
+            try:
+                if PROC_STAT:
+                    cpu, rss, threads, (read_bytes, write_bytes) = self._read_fast(pid, now, read_io)
+                else:
+                    cpu, rss, threads, (read_bytes, write_bytes) = self._read_psutil(p, read_io)
+            except (OSError, psutil.NoSuchProcess, psutil.AccessDenied):
+                self._forget(pid)
+                continue
+            self.ring.append(now, pid, cpu, rss, read_bytes, write_bytes, threads)
+            sampled += 1
+        return sampled
+
+    def run(self, duration=None, until_exit=False):
+        """在当前线程里采样, 到 duration 秒、stop() 或者 (until_exit) 目标进程都退出为止"""
+        self.started = time.time()
+        cpu_start = time.thread_time()
+        next_tree = 0.0
+        tick = 0
+        while not self.stop_event.is_set():
+            now = time.time()
+            if now >= next_tree:
+                self._targets()
+                next_tree = now + self.tree_every
+            if not self.procs and until_exit:
+                break
+            self.sample_once(now)
+            self.ticks += 1
+            if duration and now - self.started >= duration:
+                break
+            # 按起点对齐下一次采样, 不会因为每轮的耗时越跑越偏
+            tick += 1
+            self.stop_event.wait(max(0.0, self.started + tick * self.interval - time.time()))
+        self.elapsed = time.time() - self.started
+        self.cpu_used = time.thread_time() - cpu_start
+
+    def start(self, duration=None, until_exit=False):
+        self.thread = threading.Thread(target=self.run, args=(duration, until_exit), daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def overhead(self):
+        """采样线程自己的 CPU 占用 (%)"""
+        return self.cpu_used / self.elapsed * 100 if self.elapsed else 0.0
+
+    def summary(self):
+        """{pid: {...}} 加上 'total' (同一时刻所有进程相加), 包括 CPU 平均/峰值、RSS 平均/峰值、读写字节、线程峰值"""
+        per_pid, per_tick = {}, {}
+        labels = self.all_labels()
+        for t, pid, cpu, rss, read_bytes, write_bytes, threads in self.ring.rows():
+            s = per_pid.get(pid)
+            if s is None:
+                s = per_pid[pid] = {'name': labels.get(pid, ''), 'samples': 0, 'cpu_sum': 0.0, 'cpu_peak': 0.0,
+                                    'rss_sum': 0, 'rss_peak': 0, 'read_first': read_bytes, 'write_first': write_bytes,
+                                    'threads_peak': 0}
+            s['samples'] += 1
+            s['cpu_sum'] += cpu
+            s['cpu_peak'] = max(s['cpu_peak'], cpu)
+            s['rss_sum'] += rss
+            s['rss_peak'] = max(s['rss_peak'], rss)
+            s['read'], s['write'] = read_bytes - s['read_first'], write_bytes - s['write_first']
+            s['threads_peak'] = max(s['threads_peak'], threads)
+            tick = per_tick.setdefault(t, [0.0, 0, 0])
+            tick[0] += cpu
+            tick[1] += rss
+            tick[2] += threads
+        result = {}
+        for pid, s in per_pid.items():
+            result[pid] = {'name': s['name'], 'samples': s['samples'],
+                           'cpu_avg': s['cpu_sum'] / s['samples'], 'cpu_peak': s['cpu_peak'],
+                           'rss_avg': s['rss_sum'] / s['samples'], 'rss_peak': s['rss_peak'],
+                           'read': s['read'], 'write': s['write'], 'threads_peak': s['threads_peak']}
+        if per_tick:
+            ticks = per_tick.values()
+            result['total'] = {'name': f'{len(per_pid)} 个进程', 'samples': len(per_tick),
+                               'cpu_avg': sum(t[0] for t in ticks) / len(per_tick), 'cpu_peak': max(t[0] for t in ticks),
+                               'rss_avg': sum(t[1] for t in ticks) / len(per_tick), 'rss_peak': max(t[1] for t in ticks),
+                               'read': sum(r['read'] for r in result.values()),
+                               'write': sum(r['write'] for r in result.values()),
+                               'threads_peak': max(t[2] for t in ticks)}
+        return result
+
+    def print_summary(self):
+        mb = 1024 * 1024
+        print(f"采样 {self.ticks} 轮, {len(self.ring)} 条, 用时 {self.elapsed:.1f}s, "
+              f"采样自身 CPU {self.overhead():.2f}%")
+        print(f"  {'pid':>7} {'进程':<20} {'CPU 平均':>8} {'峰值':>7} {'RSS 平均':>9} {'峰值':>8} "
+              f"{'读':>8} {'写':>8} {'线程':>4}")
+        for pid, s in sorted(self.summary().items(), key=lambda item: item[0] == 'total'):
+            print(f"  {pid:>7} {s['name'][:20]:<20} {s['cpu_avg']:7.1f}% {s['cpu_peak']:6.1f}% "
+                  f"{s['rss_avg'] / mb:7.1f}MB {s['rss_peak'] / mb:6.1f}MB "
+                  f"{s['read'] / mb:6.1f}MB {s['write'] / mb:6.1f}MB {s['threads_peak']:4d}")
+
+    def to_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow([name for name, _ in SAMPLE_COLUMNS] + ['name'])
+            labels = self.all_labels()
+            for row in self.ring.rows():
+                writer.writerow(list(row) + [labels.get(row[1], '')])
+
+    def to_binary(self, path):
+        """
+        紧凑的二进制格式: b'PSMP' + 4 字节头长度 + JSON 头 (列、类型码、行数、pid -> 进程名),
+        后面按列依次是每列 array 的原始字节 (本机字节序, 头里记了)
+        """
+        header = json.dumps({
+            'columns': SAMPLE_COLUMNS, 'count': len(self.ring), 'byteorder': sys.byteorder,
+            'interval': self.interval, 'labels': self.all_labels(),
+        }).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(SAMPLE_MAGIC + struct.pack('<I', len(header)) + header)
+            for name, _ in SAMPLE_COLUMNS:
+                self.ring.column(name).tofile(f)
+
+
+def load_samples(path):
+    """读回 to_binary 写的文件, 返回 (头, {列名: array})"""
+    with open(path, 'rb') as f:
+        if f.read(4) != SAMPLE_MAGIC:
+            raise ValueError(f"{path} 不是采样文件")
+        size, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(size))
+        columns = {}
+        for name, code in header['columns']:
+            data = array(code)
+            data.fromfile(f, header['count'])
+            if header['byteorder'] != sys.byteorder:
+                data.byteswap()
+            columns[name] = data
+    return header, columns
+
+
+def spawn_sleepers(count):
+    """起一堆空闲子进程把进程表撑大, 模拟构建机上上万个进程的情况"""
+    command = ['sleep', '600'] if os.name != 'nt' else [sys.executable, '-c', 'import time; time.sleep(600)']
+    return [subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for _ in range(count)]
+
+
+def timed(func, repeat=1):
+    """跑 repeat 次, 返回 (最后一次的结果, 平均耗时秒)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def bench(lookups=20, repeat=3):
+    """对比老办法 (每次遍历全部进程) 和 ProcessSnapshot (建一次索引, 增量刷新) 的耗时"""
+    names = list(dict.fromkeys(p['name'] for p in get_running_processes()))[:lookups] or ['python']
+
+    def scan(name):
+        return [p for p in psutil.process_iter(list(ATTRS)) if p.info['name'] == name]
+
+    procs, list_cost = timed(get_running_processes, repeat)
+    _, scan_cost = timed(lambda: [scan(n) for n in names])
+    snapshot, build_cost = timed(ProcessSnapshot)
+    _, refresh_cost = timed(snapshot.refresh, repeat)
+    _, full_cost = timed(lambda: snapshot.refresh(full=True))
+    _, lookup_cost = timed(lambda: [snapshot.find(n) for n in names], repeat)
+
+    print(f"进程数 {len(procs)}, 按名字查 {len(names)} 次")
+    print(f"  老办法  列出全部进程          {list_cost * 1000:9.1f}ms")
+    print(f"  老办法  每次遍历查找 x{len(names):<3}     {scan_cost * 1000:9.1f}ms")
+    print(f"  快照    建索引                {build_cost * 1000:9.1f}ms")
+    print(f"  快照    增量刷新 (按 pid 对比) {refresh_cost * 1000:9.1f}ms")
+    print(f"  快照    全量刷新              {full_cost * 1000:9.1f}ms")
+    print(f"  快照    索引查找 x{len(names):<3}         {lookup_cost * 1000:9.3f}ms")
+
+
+if __name__ == '__main__':
+    # python src/processes.py sample --name bun --duration 60 --csv out.csv
+    # python src/processes.py sample --bin build.psmp -- bun run build     跑命令并采样它的整个进程树直到退出
+    parser = argparse.ArgumentParser(description='进程列表')
+    parser.add_argument('cmd', nargs='?', choices=['list', 'bench', 'sample'], default='list')
+    parser.add_argument('--spawn', type=int, default=0, help='bench 前先起多少个空闲子进程, 模拟进程很多的机器')
+    parser.add_argument('--lookups', type=int, default=20, help='bench 里按名字查找多少次')
+    parser.add_argument('--pid', type=int, action='append', default=[], help='sample: 要采样的进程, 可以写多次')
+    parser.add_argument('--name', action='append', default=[], help='sample: 按进程名采样, 可以写多次')
+    parser.add_argument('--no-tree', action='store_true', help='sample: 不带上子进程')
+    parser.add_argument('--interval', type=float, default=0.1, help='sample: 采样间隔 (秒)')
+    parser.add_argument('--duration', type=float, default=None, help='sample: 最多采样多少秒')
+    parser.add_argument('--csv', help='sample: 导出 CSV')
+    parser.add_argument('--bin', help='sample: 导出二进制 (load_samples 读回)')
+    # sample: -- 后面是要运行并采样的命令
+    argv = sys.argv[1:]
+    split = argv.index('--') if '--' in argv else len(argv)
+    args, command = parser.parse_args(argv[:split]), argv[split + 1:]
 
-# 获取运行中的进程列表
-running_processes = get_running_processes()
-print('found %d running processes' % len(running_processes))
+    if args.cmd == 'sample':
+        child = subprocess.Popen(command) if command else None
+        pids = args.pid + ([child.pid] if child else [])
+        if not pids and not args.name:
+            parser.error('sample 需要 --pid / --name 或者 -- 命令')
+        sampler = ProcessSampler(pids, args.name, tree=not args.no_tree, interval=args.interval)
+        try:
+            sampler.run(args.duration, until_exit=not args.name)
+        except KeyboardInterrupt:
+            pass
+        if child:
+            child.wait()
+        sampler.print_summary()
+        if args.csv:
+            sampler.to_csv(args.csv)
+            print(f"已导出 {args.csv}")
+        if args.bin:
+            sampler.to_binary(args.bin)
+            print(f"已导出 {args.bin}")
+    elif args.cmd == 'bench':
+        sleepers = spawn_sleepers(args.spawn)
+        try:
+            bench(args.lookups)
+        finally:
+            for p in sleepers:
+                p.kill()
+                p.wait()
+    else:
+        # 获取运行中的进程列表
+        running_processes = get_running_processes()
+        print('found %d running processes' % len(running_processes))
 
-# 杀死指定名称的进程（请谨慎使用）
-# kill_process_by_name('process_name_here')
\ No newline at end of file
+    # 杀死指定名称的进程（请谨慎使用）
+    # kill_process_by_name('process_name_here')
@@ -0,0 +1,117 @@
+"""
+对比普通浏览器和 fast 模式 (无头 + 拦截图片/字体/第三方脚本) 的启动和页面就绪耗时。
+两种模式都从会话池里开独立浏览器 (克隆的 profile, 登录态一样), 不影响正在用的 9333 浏览器。
+
+    python src/utils/bench_browser.py                  # 默认测 const.yaml 的 openurl 和 cdn.yaml 的 cdnOpenUrl
+    python src/utils/bench_browser.py --runs 5 --url https://xxx --ready "tag:textarea@@id=url"
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import yaml
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.open_browser_old_user_data import get_session_pool, block_resources
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+
+# 默认测的页面和判断页面就绪用的元素 (和各流程第一步等的元素一致)
+DEFAULT_TARGETS = [
+    ('xiongmaoboshi/const.yaml', 'openurl', 'tag:a@@class=shortcuts-merge_requests qa-merge-requests-link'),
+    ('xiongmaoboshi/cdn.yaml', 'cdnOpenUrl', 'tag:textarea@@id=url'),
+]
+
+RESOURCE_JS = ("const r = performance.getEntriesByType('resource');"
+               "return [r.length, r.reduce((s, e) => s + (e.transferSize || 0), 0)]")
+
+
+def default_targets():
+    targets = []
+    for rel, key, ready in DEFAULT_TARGETS:
+        try:
+            with open(os.path.join(project_root, 'src', rel), 'r', encoding='utf-8') as f:
+                url = (yaml.safe_load(f) or {}).get(key)
+        except OSError:
+            url = None
+        if url:
+            targets.append((url, ready))
+    return targets
+
+
+def measure(tab, url, ready, timeout):
+    """打开页面, 等到就绪元素出现 (没给就等文档加载完), 返回 (耗时, 资源数, 传输字节数, 是否就绪)"""
+    tab.set.load_mode.none()
+    start = time.time()
+    tab.get(url)
+    if ready:
+        ok = bool(tab.ele(ready, timeout=timeout))
+    else:
+        ok = tab.wait.doc_loaded(timeout=timeout)
+    cost = time.time() - start
+    count, size = tab.run_js(RESOURCE_JS)
+    return cost, count, size, ok
+
+
+def bench_mode(fast, targets, runs, timeout):
+    pool = get_session_pool(max_sessions=1, fast=fast)
+    start = time.time()
+    session = pool.start()
+    launch = time.time() - start
+    try:
+        tab = session.browser.latest_tab
+        if fast:
+            block_resources(tab)
+        results = {}
+        for url, ready in targets:
+            results[url] = [measure(tab, url, ready, timeout) for _ in range(runs)]
+        return launch, results
+    finally:
+        pool.stop(session)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='普通 / fast 浏览器模式耗时对比')
+    parser.add_argument('--url', action='append', help='要测的页面, 可以写多个')
+    parser.add_argument('--ready', action='append', help='和 --url 一一对应的就绪元素定位')
+    parser.add_argument('--runs', type=int, default=3, help='每个页面打开几次 (第一次是冷缓存)')
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+
+    if args.url:
+        readies = (args.ready or []) + [None] * len(args.url)
+        targets = list(zip(args.url, readies))
+    else:
+        targets = default_targets()
+    if not targets:
+        print("没有要测的页面, 用 --url 指定")
+        return
+
+    report = {}
+    for fast in (False, True):
+        name = 'fast' if fast else 'normal'
+        print(f"测试 {name} 模式...")
+        report[name] = bench_mode(fast, targets, args.runs, args.timeout)
+
+    print("\n启动耗时:")
+    for name, (launch, _) in report.items():
+        print(f"  {name:<7} {launch:6.2f}s")
+    print(f"\n页面就绪耗时 (中位数 / 首次, {args.runs} 次):")
+    for url, _ in targets:
+        print(f"  {url}")
+        for name, (_, results) in report.items():
+            samples = results[url]
+            median = statistics.median(s[0] for s in samples)
+            count, size = samples[-1][1], samples[-1][2]
+            failed = sum(1 for s in samples if not s[3])
+            extra = f", {failed} 次没等到就绪元素" if failed else ''
+            print(f"    {name:<7} {median:6.2f}s / {samples[0][0]:6.2f}s  "
+                  f"资源 {count} 个 {size / 1024:.0f}KB{extra}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+浏览器会话管理: 调试端口上已经有活着的 Chromium 就直接接管, 没有才启动新的,
+空闲超过 TTL 由后台 reaper 进程负责关掉。
+
+    python src/utils/browser_session.py status      查看 9333 端口上的浏览器
+    python src/utils/browser_session.py stop        关掉它
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import argparse
+import subprocess
+import urllib.request
+
+import psutil
+from DrissionPage import Chromium
+
+DEFAULT_PORT = 9333
+DEFAULT_IDLE_TTL = int(os.environ.get('DP_BROWSER_IDLE_TTL', 600))  # 秒, 0 表示不自动关闭
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+STATE_DIR = os.path.join(project_root, 'dpconfig')
+
+
+def probe(port, timeout=1):
+    """访问调试端口的 /json/version, 浏览器活着返回版本信息, 否则返回 None"""
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/json/version', timeout=timeout) as resp:
+            info = json.loads(resp.read().decode('utf-8'))
+        return info if 'webSocketDebuggerUrl' in info else None
+    except (OSError, ValueError):
+        return None
+
+
+def find_browser_processes(port):
+    """找到用这个调试端口启动的浏览器主进程"""
+    flag = f'--remote-debugging-port={port}'
+    procs = []
+    for p in psutil.process_iter(['cmdline']):
+        cmdline = p.info['cmdline'] or []
+        if flag in cmdline and not any(arg.startswith('--type=') for arg in cmdline):
+            procs.append(p)
+    return procs
+
+
+def kill_browser(port):
+    procs = find_browser_processes(port)
+    for p in procs:
+        for child in p.children(recursive=True):
+            try:
+                child.kill()
+            except psutil.NoSuchProcess:
+                pass
+        try:
+            p.kill()
+        except psutil.NoSuchProcess:
+            pass
+    psutil.wait_procs(procs, timeout=5)
+
+
+class BrowserSession:
+    """一个调试端口对应一个会话, 状态 (最后使用时间 / 使用中的进程 / reaper pid) 存在 dpconfig 下"""
+
+    def __init__(self, port=DEFAULT_PORT, idle_ttl=DEFAULT_IDLE_TTL, options_factory=None):
+        self.port = port
+        self.idle_ttl = idle_ttl
+        self.options_factory = options_factory
+        self.state_file = os.path.join(STATE_DIR, f'browser-session-{port}.json')
+        self.browser = None
+
+    # ---------------- 状态文件 ----------------
+
+    def read_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_state(self, state):
+        os.makedirs(STATE_DIR, exist_ok=True)
+        tmp = self.state_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_file)
+
+    def update_state(self, add_pid=None, remove_pid=None, **fields):
+        state = self.read_state()
+        users = [pid for pid in state.get('users', []) if psutil.pid_exists(pid)]
+        if add_pid and add_pid not in users:
+            users.append(add_pid)
+        if remove_pid in users:
+            users.remove(remove_pid)
+        state.update(fields, users=users, last_used=time.time())
+        self.write_state(state)
+        return state
+
+    def users(self):
+        """还活着的、登记在用这个浏览器的脚本进程"""
+        return [pid for pid in self.read_state().get('users', []) if psutil.pid_exists(pid)]
+
+    # ---------------- 会话 ----------------
+
+    def get(self):
+        """返回可用的浏览器: 优先接管已有实例, 不健康就杀掉重开"""
+        if self.browser:
+            return self.browser
+
+        start = time.time()
+        if probe(self.port):
+            try:
+                self.browser = Chromium(f'127.0.0.1:{self.port}')
+                self.browser.latest_tab  # 能拿到标签页才算健康
+                print(f"yong ->  接管已运行的浏览器 (端口 {self.port}), 耗时 {time.time() - start:.2f}s")
+            except Exception as e:
+                print(f"yong ->  端口 {self.port} 上的浏览器不健康 ({e}), 重新启动")
+                self.browser = None
+                kill_browser(self.port)
+
+        if not self.browser:
+            self.browser = Chromium(self.options_factory())
+            print(f"yong ->  启动新浏览器 (端口 {self.port}), 耗时 {time.time() - start:.2f}s")
+
+        self.update_state(add_pid=os.getpid())
+        atexit.register(self.release)
+        self.ensure_reaper()
+        return self.browser
+
+    def release(self):
+        """脚本用完浏览器不关, 只登记一下最后使用时间, 空闲超时交给 reaper"""
+        self.update_state(remove_pid=os.getpid())
+
+    def ensure_reaper(self):
+        if self.idle_ttl <= 0:
+            return
+        reaper_pid = self.read_state().get('reaper_pid')
+        if reaper_pid and psutil.pid_exists(reaper_pid):
+            return
+        kwargs = {'stdin': subprocess.DEVNULL, 'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+        if sys.platform == 'win32':
+            kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs['start_new_session'] = True
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'reap', '--port', str(self.port), '--ttl', str(self.idle_ttl)],
+            **kwargs
+        )
+        self.update_state(reaper_pid=proc.pid)
+
+    def stop(self):
+        if probe(self.port):
+            try:
+                Chromium(f'127.0.0.1:{self.port}').quit()
+            except Exception:
+                kill_browser(self.port)
+
+    def reap(self):
+        """后台循环: 没有脚本在用且空闲超过 TTL 就关掉浏览器"""
+        while probe(self.port):
+            state = self.read_state()
+            users = [pid for pid in state.get('users', []) if psutil.pid_exists(pid)]
+            idle = time.time() - state.get('last_used', time.time())
+            if not users and idle >= self.idle_ttl:
+                self.stop()
+                break
+            time.sleep(max(1, min(30, self.idle_ttl - idle if not users else 30)))
+        state = self.read_state()
+        if state.get('reaper_pid') == os.getpid():
+            state.pop('reaper_pid')
+            self.write_state(state)
+
+
+_sessions = {}
+
+
+def get_session(options_factory, port=DEFAULT_PORT, idle_ttl=DEFAULT_IDLE_TTL):
+    """同一个进程里同一个端口只用一个会话"""
+    if port not in _sessions:
+        _sessions[port] = BrowserSession(port, idle_ttl, options_factory)
+    return _sessions[port]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='浏览器会话管理')
+    parser.add_argument('cmd', choices=['status', 'stop', 'reap'])
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--ttl', type=int, default=DEFAULT_IDLE_TTL)
+    args = parser.parse_args()
+
+    session = BrowserSession(args.port, args.ttl)
+    if args.cmd == 'reap':
+        session.reap()
+    elif args.cmd == 'stop':
+        session.stop()
+        print(f"已关闭端口 {args.port} 上的浏览器")
+    else:
+        info = probe(args.port)
+        state = session.read_state()
+        print(f"端口 {args.port}: {info.get('Browser') if info else '没有运行'}")
+        if info and state.get('last_used'):
+            print(f"空闲 {time.time() - state['last_used']:.0f}s, 使用中的进程: {state.get('users', [])}")
+
+
+if __name__ == '__main__':
+    main()
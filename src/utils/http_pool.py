@@ -0,0 +1,315 @@
+"""
+带连接池的 HTTP 客户端 (只用标准库)
+同一个 host 的连接用完放回池子复用 (keep-alive), 省掉每次请求的 TCP/TLS 握手。
+每个 host 可以单独限制并发数和每秒请求数 (令牌桶), GET/HEAD 遇到网络错误或 429/502/503/504
+按指数退避 + 随机抖动重试, 并记录请求数/耗时分位数/重试次数。
+
+所有脚本默认共用 shared_pool(), 配置 (const.yaml / cdn.yaml 里的 http 段) 用 configure_shared_pool 设置:
+
+    http:
+      maxPerHost: 4
+      retries: 2
+      hosts:
+        git.100tal.com: { concurrency: 4, rate: 10 }
+"""
+import json as jsonlib
+import math
+import time
+import random
+import threading
+import http.client
+from collections import deque
+from urllib.parse import urlsplit, urlencode
+
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_METHODS = ('GET', 'HEAD', 'OPTIONS')  # 只重试幂等请求, POST/PUT 不能重复提交
+# 复用的空闲连接被服务端关掉时的报错, 只有这几种才换新连接重发; 读超时不算 (服务端可能已经在处理了)
+STALE_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+LATENCY_SAMPLES = 2000  # 每个 host 保留最近多少次请求的耗时算分位数
+
+
+class HTTPError(Exception):
+    """网络层出错 (连不上/断开/超时)"""
+
+
+class TokenBucket:
+    """令牌桶限速: 每秒补充 rate 个令牌, 最多攒 burst 个, 取不到就等"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """服务端说被限流了 (Retry-After), 所有人一起停一会"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class Response:
+
+    def __init__(self, status, headers, body, url):
+        self.status = status
+        self.headers = headers  # key 全部小写
+        self.body = body
+        self.url = url
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', 'ignore')
+
+    def json(self):
+        return jsonlib.loads(self.body.decode('utf-8')) if self.body else None
+
+    def __repr__(self):
+        return f"<Response {self.status} {self.url}>"
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class HostMetrics:
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.statuses = {}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def snapshot(self):
+        values = sorted(self.latencies)
+        return {
+            'requests': self.requests, 'errors': self.errors, 'retries': self.retries,
+            'statuses': dict(self.statuses),
+            'p50': percentile(values, 50), 'p90': percentile(values, 90), 'p99': percentile(values, 99),
+            'max': values[-1] if values else 0.0,
+        }
+
+
+class HTTPPool:
+
+    def __init__(self, max_per_host=4, timeout=15, headers=None, retries=2, backoff=0.5, host_limits=None):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.retries = retries                    # GET/HEAD 出错后最多重试几次
+        self.backoff = backoff
+        self.host_limits = dict(host_limits or {})  # host -> {'concurrency': n, 'rate': 每秒请求数}
+        self.lock = threading.Lock()
+        self.idle = {}     # (scheme, host, port) -> deque[连接]
+        self.slots = {}    # (scheme, host, port) -> 限制每个 host 的并发连接数
+        self.buckets = {}  # host -> TokenBucket
+        self.stats = {}    # host -> HostMetrics
+
+    def _key(self, url):
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        return scheme, parts.hostname, port
+
+    def _slot(self, key):
+        with self.lock:
+            if key not in self.slots:
+                limit = self.host_limits.get(key[1], {}).get('concurrency') or self.max_per_host
+                self.slots[key] = threading.BoundedSemaphore(limit)
+            return self.slots[key]
+
+    def _bucket(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                limits = self.host_limits.get(host, {})
+                rate = limits.get('rate')
+                self.buckets[host] = TokenBucket(rate, limits.get('burst') or limits.get('concurrency')) if rate else None
+            return self.buckets[host]
+
+    def _metrics(self, host):
+        with self.lock:
+            return self.stats.setdefault(host, HostMetrics())
+
+    def set_host_limit(self, host, concurrency=None, rate=None, burst=None):
+        """调整某个 host 的并发数和每秒请求数, 对之后的新请求生效"""
+        with self.lock:
+            self.host_limits[host] = {'concurrency': concurrency, 'rate': rate, 'burst': burst}
+            for key in [k for k in self.slots if k[1] == host]:
+                del self.slots[key]
+            self.buckets.pop(host, None)
+
+    def _acquire(self, key):
+        with self.lock:
+            idle = self.idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout), False
+
+    def _release(self, key, conn):
+        with self.lock:
+            self.idle.setdefault(key, deque()).append(conn)
+
+    def request(self, method, url, params=None, json=None, data=None, headers=None):
+        if params:
+            url += ('&' if '?' in url else '?') + urlencode(params)
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        send_headers = dict(self.headers)
+        send_headers.update(headers or {})
+        body = data
+        if json is not None:
+            body = jsonlib.dumps(json).encode('utf-8')
+            send_headers.setdefault('Content-Type', 'application/json')
+        elif isinstance(data, dict):
+            body = urlencode(data).encode('utf-8')
+            send_headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+
+        key = self._key(url)
+        metrics = self._metrics(key[1])
+        retries = self.retries if method in RETRY_METHODS else 0
+        for attempt in range(retries + 1):
+            try:
+                response = self._send(key, method, path, body, send_headers, url, metrics)
+            except HTTPError:
+                if attempt >= retries:
+                    raise
+                wait = None
+            else:
+                if response.status not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                retry_after = response.headers.get('retry-after', '')
+                wait = float(retry_after) if retry_after.replace('.', '', 1).isdigit() else None
+            with self.lock:
+                metrics.retries += 1
+            wait = min(30, wait if wait is not None else self.backoff * 2 ** attempt)
+            time.sleep(wait + random.uniform(0, wait / 2))
+
+    def _send(self, key, method, path, body, headers, url, metrics):
+        bucket = self._bucket(key[1])
+        if bucket:
+            bucket.acquire()
+        with self._slot(key):
+            for attempt in range(2):
+                conn, reused = self._acquire(key)
+                start = time.perf_counter()
+                sent = False
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    sent = True
+                    resp = conn.getresponse()
+                    payload = resp.read()
+                except (http.client.HTTPException, OSError) as e:
+                    conn.close()
+                    # 复用的连接可能已经被服务端关掉了, 换新连接再试一次;
+                    # 非幂等请求只有在请求还没发完时才重发, 已经发出去的 POST 不能再发一遍
+                    stale = isinstance(e, STALE_ERRORS) and (not sent or method in RETRY_METHODS)
+                    if reused and attempt == 0 and stale:
+                        continue
+                    with self.lock:
+                        metrics.requests += 1
+                        metrics.errors += 1
+                    raise HTTPError(f"{method} {url} 失败: {e}") from e
+                with self.lock:
+                    metrics.requests += 1
+                    metrics.latencies.append(time.perf_counter() - start)
+                    metrics.statuses[resp.status] = metrics.statuses.get(resp.status, 0) + 1
+                headers_out = {k.lower(): v for k, v in resp.getheaders()}
+                if resp.will_close:
+                    conn.close()
+                else:
+                    self._release(key, conn)
+                return Response(resp.status, headers_out, payload, url)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def metrics(self):
+        """{host: {'requests', 'errors', 'retries', 'statuses', 'p50', 'p90', 'p99', 'max'}}, 耗时单位秒"""
+        with self.lock:
+            return {host: m.snapshot() for host, m in self.stats.items()}
+
+    def print_metrics(self):
+        stats = self.metrics()
+        if not stats:
+            return
+        print("HTTP 请求统计:")
+        print(f"  {'host':<32} {'请求':>5} {'重试':>4} {'出错':>4} {'p50':>8} {'p90':>8} {'p99':>8}  状态码")
+        for host, m in stats.items():
+            statuses = ' '.join(f"{k}x{v}" for k, v in sorted(m['statuses'].items()))
+            print(f"  {host:<32} {m['requests']:5d} {m['retries']:4d} {m['errors']:4d} "
+                  f"{m['p50'] * 1000:6.0f}ms {m['p90'] * 1000:6.0f}ms {m['p99'] * 1000:6.0f}ms  {statuses}")
+
+    def close(self):
+        with self.lock:
+            for idle in self.idle.values():
+                while idle:
+                    idle.pop().close()
+            self.idle.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool():
+    """进程内共用的连接池, GitLab / CMS / CDN 的请求默认都走它"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HTTPPool()
+        return _shared
+
+
+def configure_shared_pool(config):
+    """按配置里的 http 段设置共用连接池的并发/限速/重试, 没配就保持默认"""
+    options = (config or {}).get('http') or {}
+    pool = shared_pool()
+    pool.max_per_host = options.get('maxPerHost', pool.max_per_host)
+    pool.retries = options.get('retries', pool.retries)
+    pool.timeout = options.get('timeout', pool.timeout)
+    for host, limits in (options.get('hosts') or {}).items():
+        pool.set_host_limit(host, limits.get('concurrency'), limits.get('rate'), limits.get('burst'))
+    return pool
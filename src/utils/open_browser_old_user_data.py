@@ -1,21 +1,52 @@
 import platform
 from DrissionPage import ChromiumOptions, Chromium
 import os
+import atexit
+import ipaddress
+from urllib.parse import urlsplit
+from src.utils.browser_session import get_session, probe, kill_browser, DEFAULT_PORT, DEFAULT_IDLE_TTL
 
+FAST_PORT = DEFAULT_PORT + 1  # fast 模式是无头浏览器, 和有界面的分开用一个端口
 
-def get_browser_options():
+# fast 模式下拦掉的请求: 图片、音视频、字体 (样式表保留, 可见性判断要用); 第三方的请求按站点拦, 见 block_third_party
+BLOCKED_EXTENSIONS = [
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp',
+    'mp4', 'webm', 'mp3', 'm4a', 'ogg', 'wav',
+    'woff', 'woff2', 'ttf', 'otf', 'eot',
+]
+BLOCKED_URL_PATTERNS = [f'*.{ext}' for ext in BLOCKED_EXTENSIONS] + [f'*.{ext}?*' for ext in BLOCKED_EXTENSIONS]
+# 这些二级域名下面注册的是三级域名 (xxx.com.cn), 判断是不是同一个站时要多看一级
+SECOND_LEVEL_SUFFIXES = ('com', 'net', 'org', 'gov', 'edu', 'co', 'ac')
+
+# fast 模式额外的启动参数: 不要 GPU, 关掉后台联网/组件更新/翻译等用不上的功能
+FAST_ARGUMENTS = [
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-sync',
+    '--disable-default-apps',
+    '--disable-breakpad',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+    '--disable-renderer-backgrounding',
+    '--disable-background-timer-throttling',
+    '--metrics-recording-only',
+]
+
+
+def get_browser_options(port=DEFAULT_PORT, user_data_path=None, fast=False):
     # 创建配置对象
     co = ChromiumOptions()
-    co.set_local_port(9333)
+    co.set_local_port(port)
     system = get_system()
-    # 设置用户文件夹路径
+    # 设置用户文件夹路径, 会话池里的会话传自己克隆出来的 profile
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(current_dir))
-    user_data_path = ''
-    if system == 'Windows':
-        user_data_path = os.path.join(project_root, 'dpconfig/user-files', 'User Data')
-    else:
-        user_data_path = os.path.join(project_root, 'dpconfig/user-files')
+    if not user_data_path:
+        if system == 'Windows':
+            user_data_path = os.path.join(project_root, 'dpconfig/user-files', 'User Data')
+        else:
+            user_data_path = os.path.join(project_root, 'dpconfig/user-files')
 
     print(f"yong ->  用户数据路径: {user_data_path}")
     
@@ -26,19 +57,119 @@ def get_browser_options():
     co.set_argument('--disable-web-security')  # 禁用跨域限制
     co.set_argument('--no-first-run')  # 禁用首次运行提示
     co.set_argument('--no-default-browser-check')  # 禁用默认浏览器检查
+
+    if fast:
+        # 只需要 DOM 和表单交互: 无头, 不加载图片, 静音, 关掉 GPU 和后台功能
+        co.headless(True)
+        co.no_imgs(True)
+        co.mute(True)
+        for arg in FAST_ARGUMENTS:
+            co.set_argument(arg)
     
     return co
 
+
+def site_of(host):
+    """粗略的注册域名: cms.xiongmaoboshi.com -> xiongmaoboshi.com, a.b.com.cn -> b.com.cn, IP/localhost 原样返回"""
+    host = (host or '').lower().rstrip('.')
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return host
+    except ValueError:
+        pass
+    labels = host.split('.')
+    keep = 3 if len(labels) >= 3 and labels[-2] in SECOND_LEVEL_SUFFIXES else 2
+    return '.'.join(labels[-keep:])
+
+
+def block_third_party(tab):
+    """
+    用 CDP 的 Fetch 拦截这个标签页的请求: 和主框架当前页面不是同一个站的 (统计、监控、外链头像...) 都拦掉。
+    主框架的页面请求永远放行, 跳到哪个站 (比如登录跳转) 哪个站就是第一方
+    """
+    driver = tab.driver
+    main_frame = tab.tab_id  # 页面的主框架 id 就是 target id
+    state = {'site': None}
+
+    def on_request_paused(requestId, request, resourceType=None, frameId=None, **_):
+        site = site_of(urlsplit(request['url']).hostname)
+        if resourceType == 'Document' and frameId == main_frame:
+            state['site'] = site
+        allowed = not site or state['site'] in (None, site)  # data:/blob: 没有 host, 放行
+        if allowed:
+            driver.run('Fetch.continueRequest', requestId=requestId)
+        else:
+            driver.run('Fetch.failRequest', requestId=requestId, errorReason='BlockedByClient')
+
+    driver.set_callback('Fetch.requestPaused', on_request_paused)
+    tab.run_cdp('Fetch.enable', patterns=[{'urlPattern': '*', 'requestStage': 'Request'}])
+    return tab
+
+
+def block_resources(tab, patterns=None):
+    """用 CDP 的 Network.setBlockedURLs 拦掉图片/媒体/字体, 再拦掉第三方站点的请求 (只对这个标签页生效)"""
+    tab.run_cdp('Network.enable')
+    tab.run_cdp('Network.setBlockedURLs', urls=list(patterns or BLOCKED_URL_PATTERNS))
+    return block_third_party(tab)
+
 # 区分系统
 def get_system():
     system = platform.system()
     return system
 
-def open_browser():
-    co = get_browser_options()
-    browser = Chromium(co)
+_pools = {}
+
+
+def get_session_pool(max_sessions=4, fast=False):
+    """进程内共用一个会话池 (普通/fast 各一个), 退出时关掉所有会话并删除克隆的 profile"""
+    if fast not in _pools:
+        from src.utils.session_pool import SessionPool
+        _pools[fast] = SessionPool(
+            lambda port, path: get_browser_options(port, path, fast=fast), max_sessions=max_sessions
+        )
+        atexit.register(_pools[fast].close_all)
+    return _pools[fast]
+
+
+def fast_session(idle_ttl=DEFAULT_IDLE_TTL):
+    return get_session(lambda: get_browser_options(FAST_PORT, fast=True), FAST_PORT, idle_ttl)
+
+
+def release_fast_browser(idle_ttl=DEFAULT_IDLE_TTL):
+    """
+    有界面的浏览器要启动时, fast 浏览器还占着共用的 profile 就会抢 profile 锁。
+    fast 浏览器没人在用就关掉把 profile 让出来, 返回 True; 还有脚本在用返回 False
+    """
+    session = fast_session(idle_ttl)
+    if session.users():
+        return False
+    print(f"yong ->  端口 {FAST_PORT} 上空闲的 fast 浏览器占着 profile, 先关掉")
+    session.stop()
+    kill_browser(FAST_PORT)  # quit 没退干净的进程也要等它们退出, profile 锁才会释放
+    return True
+
+
+def open_browser(idle_ttl=DEFAULT_IDLE_TTL, isolated=False, fast=False):
+    # fast: 无头 + 拦截图片/字体/第三方请求, 用单独的端口; 有界面的浏览器正占着 profile 时改用会话池里的克隆
+    if fast and not isolated and probe(DEFAULT_PORT):
+        print(f"yong ->  端口 {DEFAULT_PORT} 上的浏览器正在用 profile, fast 模式改用独立会话")
+        isolated = True
+    # 反过来也一样: 要开有界面的, fast 浏览器占着 profile 又有脚本在用, 有界面的就用克隆
+    if not fast and not isolated and not probe(DEFAULT_PORT) and probe(FAST_PORT) and not release_fast_browser(idle_ttl):
+        print(f"yong ->  端口 {FAST_PORT} 上的 fast 浏览器正在用 profile, 改用独立会话")
+        isolated = True
+    # isolated: 从会话池拿一个独立端口 + 克隆 profile 的浏览器, 可以和别的自动化脚本同时跑, 退出时清理
+    if isolated:
+        browser = get_session_pool(fast=fast).start().browser
+    elif fast:
+        browser = fast_session(idle_ttl).get()
+    else:
+        # 调试端口上已有浏览器就直接接管, 没有才冷启动, 空闲超过 idle_ttl 秒自动关闭
+        return get_session(get_browser_options, DEFAULT_PORT, idle_ttl).get()
+    if fast:
+        block_resources(browser.latest_tab)
     return browser
 
 
 # 如果有其他函数，也需要在这里导出
-__all__ = ['open_browser']
\ No newline at end of file
+__all__ = ['open_browser', 'get_browser_options', 'get_session_pool', 'block_resources', 'block_third_party']
\ No newline at end of file
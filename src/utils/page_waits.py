@@ -0,0 +1,126 @@
+"""
+页面等待层: 等真正的条件 (元素出现/可点击、下拉框展开、跳转完成、网络空闲), 不再写死 time.sleep。
+每一步都有超时, 并记录实际等了多久, 最后可以打印汇总。
+传了 tracer (step_trace.StepTracer) 的话每一步同时记到 trace 里。
+"""
+import time
+
+
+class WaitTimeout(Exception):
+    """某一步等待超时"""
+
+
+class PageWaiter:
+
+    def __init__(self, page, timeout=10, poll=0.1, tracer=None):
+        self.page = page
+        self.timeout = timeout
+        self.poll = poll
+        self.tracer = tracer
+        self.records = []  # [(步骤, 耗时秒, 是否成功)]
+
+    def _record(self, step, start, ok, locator='', action='wait', retries=0, error=''):
+        self.records.append((step, time.time() - start, ok))
+        if self.tracer:
+            self.tracer.record(step, start, ok, locator, action, retries, error)
+
+    def _fail(self, step, start, message, locator='', action='wait', retries=0):
+        message = f"{step}: {message} (等了 {time.time() - start:.1f}s)"
+        self._record(step, start, False, locator, action, retries, f"WaitTimeout: {message}")
+        raise WaitTimeout(message)
+
+    def ele(self, locator, timeout=None, step=None, within=None):
+        """等元素出现"""
+        step = step or locator
+        timeout = self.timeout if timeout is None else timeout
+        start = time.time()
+        ele = (within or self.page).ele(locator, timeout=timeout)
+        if not ele:
+            self._fail(step, start, f"找不到元素 {locator}", locator, 'find')
+        self._record(step, start, True, locator, 'find')
+        return ele
+
+    def first(self, locators, timeout=None, step=None):
+        """几个备选定位哪个先出现用哪个, 返回 (定位, 元素)"""
+        step = step or ' | '.join(locators)
+        timeout = self.timeout if timeout is None else timeout
+        start = time.time()
+        rounds = 0
+        while True:
+            for locator in locators:
+                ele = self.page.ele(locator, timeout=0)
+                if ele:
+                    self._record(step, start, True, locator, 'find', rounds)
+                    return locator, ele
+            if time.time() - start > timeout:
+                self._fail(step, start, "备选元素都没出现", ' | '.join(locators), 'find', rounds)
+            rounds += 1
+            time.sleep(self.poll)
+
+    def clickable(self, locator, timeout=None, step=None, within=None):
+        """等元素出现并且可以点击 (可见、可用、没有被遮挡、不在动画中)"""
+        step = step or locator
+        timeout = self.timeout if timeout is None else timeout
+        start = time.time()
+        ele = (within or self.page).ele(locator, timeout=timeout)
+        if not ele:
+            self._fail(step, start, f"找不到元素 {locator}", locator, 'find')
+        remaining = max(0.1, timeout - (time.time() - start))
+        if not ele.wait.clickable(timeout=remaining):
+            self._fail(step, start, f"元素一直不可点击 {locator}", locator, 'find')
+        self._record(step, start, True, locator, 'find')
+        return ele
+
+    def click(self, locator, timeout=None, step=None, within=None):
+        ele = self.clickable(locator, timeout=timeout, step=step, within=within)
+        if self.tracer:
+            self.tracer.call('click', ele.click, step=step or locator, locator=locator)
+        else:
+            ele.click()
+        return ele
+
+    def dropdown_open(self, toggle_locator, menu_locator, timeout=None, step=None):
+        """点开下拉框, 等菜单真的展开后返回菜单元素"""
+        step = step or menu_locator
+        self.click(toggle_locator, timeout=timeout, step=f"{step} (按钮)")
+        timeout = self.timeout if timeout is None else timeout
+        start = time.time()
+        menu = self.page.ele(menu_locator, timeout=timeout)
+        if not menu or not menu.wait.displayed(timeout=max(0.1, timeout - (time.time() - start))):
+            self._fail(step, start, "下拉菜单没有展开", menu_locator)
+        self._record(step, start, True, menu_locator)
+        return menu
+
+    def navigation(self, url_part, timeout=None, step=None):
+        """等地址栏变成包含 url_part 的页面, 并且文档加载完成"""
+        step = step or f"跳转到 {url_part}"
+        timeout = self.timeout if timeout is None else timeout
+        start = time.time()
+        if not self.page.wait.url_change(url_part, timeout=timeout):
+            self._fail(step, start, f"页面地址一直没有变成 {url_part}", url_part)
+        self.page.wait.doc_loaded(timeout=max(0.1, timeout - (time.time() - start)))
+        self._record(step, start, True, url_part)
+
+    def network_idle(self, idle=0.5, timeout=None, step="网络空闲"):
+        """资源请求数在 idle 秒内不再增加且没有进行中的 jQuery 请求, 认为网络空闲"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.time()
+        js = ("return [document.readyState, performance.getEntriesByType('resource').length,"
+              " window.jQuery ? window.jQuery.active : 0]")
+        last_count, stable_since = None, time.time()
+        while time.time() - start <= timeout:
+            state, count, active = self.page.run_js(js)
+            if count != last_count or active or state != 'complete':
+                last_count, stable_since = count, time.time()
+            elif time.time() - stable_since >= idle:
+                self._record(step, start, True)
+                return
+            time.sleep(self.poll)
+        self._fail(step, start, "网络一直没有空闲")
+
+    def summary(self):
+        """打印每一步实际等待时间"""
+        total = sum(cost for _, cost, _ in self.records)
+        print(f"等待耗时汇总 (共 {total:.2f}s):")
+        for step, cost, ok in self.records:
+            print(f"  {'✓' if ok else '✗'} {cost:6.2f}s  {step}")
@@ -0,0 +1,192 @@
+"""
+dpconfig/user-files 浏览器 profile 瘦身和快照:
+缓存、代码缓存、Service Worker、历史记录这些都能重新生成, 只留 cookie、local storage、登录态,
+profile 越小 Chromium 启动越快。登录好、瘦身过的 profile 可以存成快照, 坏了或者又胖了秒级恢复。
+
+    python src/utils/profile_tools.py report [--measure]      查看大小 (--measure 顺便测启动耗时)
+    python src/utils/profile_tools.py prune [--measure]       瘦身, 前后对比
+    python src/utils/profile_tools.py snapshot [名字]          存快照 (默认用时间做名字)
+    python src/utils/profile_tools.py restore [名字]           恢复快照 (默认最新的)
+    python src/utils/profile_tools.py list                    列出快照
+
+操作前要先关掉用这个 profile 的浏览器 (python src/utils/browser_session.py stop)。
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.session_pool import (
+    BASE_PROFILE, EXCLUDE_DIRS, EXCLUDE_FILES, clone_profile, browser_ports_for, free_port, profile_subdir,
+)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+SNAPSHOT_DIR = os.path.join(project_root, 'dpconfig', 'profile-snapshots')
+
+# 在克隆时跳过的缓存之外, 瘦身还去掉历史记录/会话恢复这类和登录态无关的数据
+PRUNE_DIRS = EXCLUDE_DIRS | {
+    'Sessions', 'Session Storage', 'Feature Engagement Tracker', 'Download Service', 'GCM Store',
+    'VideoDecodeStats', 'MediaFoundationWidevineCdm', 'WidevineCdm', 'Safe Browsing Network', 'segmentation_platform',
+}
+PRUNE_FILES = EXCLUDE_FILES | {
+    'History', 'History-journal', 'Favicons', 'Favicons-journal', 'Top Sites', 'Top Sites-journal',
+    'Visited Links', 'Shortcuts', 'Shortcuts-journal', 'Network Action Predictor', 'Network Action Predictor-journal',
+    'Current Session', 'Current Tabs', 'Last Session', 'Last Tabs', 'BrowserMetrics-spare.pma',
+}
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def ensure_not_running(profile):
+    ports = browser_ports_for(profile)
+    if ports:
+        raise RuntimeError(f"还有浏览器在用这个 profile (端口 {sorted(ports)}), 先关掉再操作")
+
+
+def prune(profile=BASE_PROFILE):
+    """删掉可以重新生成的目录和文件, 返回 (删掉的个数, 释放的字节数)"""
+    ensure_not_running(profile)
+    removed, freed = 0, 0
+    for root, dirs, files in os.walk(profile):
+        for name in [d for d in dirs if d in PRUNE_DIRS]:
+            path = os.path.join(root, name)
+            freed += dir_size(path)
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        dirs[:] = [d for d in dirs if d not in PRUNE_DIRS]
+        for name in files:
+            if name in PRUNE_FILES:
+                path = os.path.join(root, name)
+                freed += os.lstat(path).st_size
+                os.remove(path)
+                removed += 1
+    return removed, freed
+
+
+def list_snapshots():
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    names = [n for n in os.listdir(SNAPSHOT_DIR) if not n.startswith('.')]
+    return sorted(names, reverse=True)
+
+
+def snapshot(profile=BASE_PROFILE, name=None):
+    """把瘦身后的 profile 存成快照 (原 profile 不动), 返回快照目录"""
+    ensure_not_running(profile)
+    name = name or time.strftime('%Y%m%d-%H%M%S')
+    dest = os.path.join(SNAPSHOT_DIR, name)
+    if os.path.exists(dest):
+        raise RuntimeError(f"快照 {name} 已经存在")
+    tmp = os.path.join(SNAPSHOT_DIR, f'.{name}.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    clone_profile(profile, tmp, PRUNE_DIRS, PRUNE_FILES)
+    os.rename(tmp, dest)
+    return dest
+
+
+def restore(name=None, profile=BASE_PROFILE):
+    """用快照换掉当前 profile: 先克隆到临时目录, 再两次 rename 换过去"""
+    ensure_not_running(profile)
+    snapshots = list_snapshots()
+    name = name or (snapshots[0] if snapshots else None)
+    if not name or name not in snapshots:
+        raise RuntimeError(f"找不到快照 {name or ''}, 现有: {snapshots}")
+    profile = os.path.normpath(profile)
+    staging, retired = profile + '.restore-tmp', profile + '.restore-old'
+    for path in (staging, retired):
+        shutil.rmtree(path, ignore_errors=True)
+    clone_profile(os.path.join(SNAPSHOT_DIR, name), staging, set(), set())
+    if os.path.exists(profile):
+        os.rename(profile, retired)
+    os.rename(staging, profile)
+    shutil.rmtree(retired, ignore_errors=True)
+    return name
+
+
+def measure_startup(profile=BASE_PROFILE):
+    """用这个 profile 冷启动一次浏览器 (随机端口), 返回拿到标签页的耗时"""
+    from DrissionPage import Chromium
+    from src.utils.open_browser_old_user_data import get_browser_options
+
+    ensure_not_running(profile)
+    user_data_path = os.path.join(profile, profile_subdir()) if profile_subdir() else profile
+    start = time.time()
+    browser = Chromium(get_browser_options(free_port(), user_data_path))
+    try:
+        browser.latest_tab
+        return time.time() - start
+    finally:
+        browser.quit()
+
+
+def report(profile, measure=False, label=''):
+    size = dir_size(profile)
+    line = f"{label}profile 大小 {format_size(size)}"
+    startup = None
+    if measure:
+        startup = measure_startup(profile)
+        line += f", 启动耗时 {startup:.2f}s"
+    print(line)
+    return size, startup
+
+
+def main():
+    parser = argparse.ArgumentParser(description='浏览器 profile 瘦身和快照')
+    parser.add_argument('cmd', choices=['report', 'prune', 'snapshot', 'restore', 'list'])
+    parser.add_argument('name', nargs='?', help='快照名字')
+    parser.add_argument('--profile', default=BASE_PROFILE)
+    parser.add_argument('--measure', action='store_true', help='顺便冷启动一次浏览器测启动耗时')
+    args = parser.parse_args()
+
+    try:
+        if args.cmd == 'report':
+            report(args.profile, args.measure)
+        elif args.cmd == 'prune':
+            report(args.profile, args.measure, '瘦身前: ')
+            removed, freed = prune(args.profile)
+            print(f"删除了 {removed} 个目录/文件, 释放 {format_size(freed)}")
+            report(args.profile, args.measure, '瘦身后: ')
+        elif args.cmd == 'snapshot':
+            dest = snapshot(args.profile, args.name)
+            print(f"已保存快照: {dest} ({format_size(dir_size(dest))})")
+        elif args.cmd == 'restore':
+            report(args.profile, args.measure, '恢复前: ')
+            start = time.time()
+            name = restore(args.name, args.profile)
+            print(f"已恢复快照 {name}, 耗时 {time.time() - start:.2f}s")
+            report(args.profile, args.measure, '恢复后: ')
+        else:
+            snapshots = list_snapshots()
+            if not snapshots:
+                print("还没有快照")
+            for name in snapshots:
+                print(f"  {name}  {format_size(dir_size(os.path.join(SNAPSHOT_DIR, name)))}")
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
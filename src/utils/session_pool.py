@@ -0,0 +1,295 @@
+"""
+并行浏览器会话池: 每个会话用动态分配的调试端口, 用户数据目录是已登录的 dpconfig/user-files 的克隆,
+这样批量合并 MR 和刷新 CDN 可以同时跑, 互不抢 9333 端口和同一个 profile。
+
+克隆规则:
+- 缓存类目录 (Cache / Code Cache / GPUCache / Service Worker 等) 和单例锁文件不复制, 浏览器会自己重建
+- 文件系统支持 reflink (btrfs / xfs / APFS) 时用写时复制, 又快又不占空间
+- 不支持时只硬链接 LevelDB 的 .ldb/.sst (写完就不会再改), Cookies / Login Data 这类 SQLite
+  和其他会原地修改的文件一律真复制, 否则会话里的写入会改坏原 profile
+- Windows 上原浏览器开着时 Cookies / Login Data / Local State 被锁住复制不了, 克隆出来是没登录的,
+  这时通过 CDP 从正在用原 profile 的浏览器取 cookie (Storage.getCookies) 再写进新会话 (Storage.setCookies)
+
+    python src/utils/session_pool.py list     查看残留的会话目录
+    python src/utils/session_pool.py clean    清理已经没人用的会话目录和浏览器
+"""
+import os
+import sys
+import shutil
+import socket
+import argparse
+import platform
+import threading
+import subprocess
+from contextlib import contextmanager
+
+import psutil
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.browser_session import kill_browser, probe
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+BASE_PROFILE = os.path.join(project_root, 'dpconfig', 'user-files')
+SESSION_ROOT = os.path.join(project_root, 'dpconfig', 'sessions')
+
+# 可以重新生成的目录, 克隆时跳过
+EXCLUDE_DIRS = {
+    'Cache', 'Code Cache', 'GPUCache', 'DawnCache', 'DawnGraphiteCache', 'DawnWebGPUCache', 'GrShaderCache',
+    'GraphiteDawnCache', 'ShaderCache', 'Service Worker', 'CacheStorage', 'Crashpad', 'BrowserMetrics',
+    'component_crx_cache', 'optimization_guide_model_store', 'Safe Browsing', 'blob_storage',
+}
+EXCLUDE_FILES = {'SingletonLock', 'SingletonCookie', 'SingletonSocket', 'lockfile', 'LOCK', 'RunningChromeVersion'}
+IMMUTABLE_SUFFIXES = ('.ldb', '.sst')  # LevelDB 的表文件写完就不改, 可以安全硬链接
+LOGIN_STATE_FILES = {'Cookies', 'Login Data', 'Local State'}  # 复制不了的话克隆出来就是没登录的
+# Storage.getCookies 返回的字段里 Storage.setCookies 不认的
+COOKIE_READONLY_FIELDS = ('size', 'session')
+
+FICLONE = 0x40049409  # linux ioctl, 整个文件 reflink
+_reflink_ok = {}      # 目标目录所在设备 -> 是否支持 reflink
+
+
+def free_port():
+    """让系统分配一个空闲端口"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def reflink(src, dst):
+    """尝试写时复制, 不支持返回 False (同一个设备失败一次后不再尝试)"""
+    dev = os.stat(os.path.dirname(dst)).st_dev
+    if _reflink_ok.get(dev) is False:
+        return False
+    try:
+        if sys.platform.startswith('linux'):
+            import fcntl
+            with open(src, 'rb') as s, open(dst, 'wb') as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        elif sys.platform == 'darwin':
+            subprocess.run(['cp', '-c', src, dst], check=True, capture_output=True)
+        else:
+            _reflink_ok[dev] = False
+            return False
+    except (OSError, subprocess.CalledProcessError):
+        if os.path.exists(dst):
+            os.remove(dst)
+        _reflink_ok[dev] = False
+        return False
+    _reflink_ok[dev] = True
+    shutil.copystat(src, dst)
+    return True
+
+
+def clone_file(src, dst):
+    if reflink(src, dst):
+        return 'reflink'
+    if src.endswith(IMMUTABLE_SUFFIXES):
+        try:
+            os.link(src, dst)
+            return 'link'
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+def clone_profile(base, dest, exclude_dirs=EXCLUDE_DIRS, exclude_files=EXCLUDE_FILES):
+    """
+    把 base 克隆到 dest, 返回 {'reflink': n, 'link': n, 'copy': n, 'skipped': n, 'locked': [...]}
+    locked 是被锁住没复制成功的登录态文件 (相对路径)
+    """
+    stats = {'reflink': 0, 'link': 0, 'copy': 0, 'skipped': 0, 'locked': []}
+    for root, dirs, files in os.walk(base):
+        skipped = [d for d in dirs if d in exclude_dirs]
+        stats['skipped'] += len(skipped)
+        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+        target = os.path.join(dest, os.path.relpath(root, base))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            if name in exclude_files:
+                continue
+            src = os.path.join(root, name)
+            if os.path.islink(src):
+                continue  # SingletonLock 之类在 linux 上是软链接
+            try:
+                stats[clone_file(src, os.path.join(target, name))] += 1
+            except OSError:
+                stats['skipped'] += 1  # 浏览器正开着, 个别文件被锁住了就跳过
+                if name in LOGIN_STATE_FILES:
+                    stats['locked'].append(os.path.relpath(src, base))
+    return stats
+
+
+def copy_cookies(base_profile, browser):
+    """
+    从正在用 base_profile 的浏览器取出所有 cookie 写进 browser, 返回复制的条数;
+    原浏览器没开着返回 None
+    """
+    from DrissionPage import Chromium
+
+    for port in sorted(browser_ports_for(base_profile)):
+        if not probe(port, timeout=0.5):
+            continue
+        cookies = Chromium(port).latest_tab.run_cdp('Storage.getCookies').get('cookies', [])
+        params = []
+        for cookie in cookies:
+            cookie = {k: v for k, v in cookie.items() if k not in COOKIE_READONLY_FIELDS}
+            if cookie.get('expires', -1) < 0:
+                cookie.pop('expires', None)  # 会话 cookie
+            params.append(cookie)
+        if params:
+            browser.latest_tab.run_cdp('Storage.setCookies', cookies=params)
+        return len(params)
+    return None
+
+
+def profile_subdir():
+    """Windows 上 user-files 下面还有一层 User Data"""
+    return 'User Data' if platform.system() == 'Windows' else ''
+
+
+class PooledSession:
+    """池子里的一个会话: 独立端口 + 独立 profile, close() 关浏览器并删掉 profile"""
+
+    def __init__(self, port, profile_dir, browser):
+        self.port = port
+        self.profile_dir = profile_dir
+        self.browser = browser
+
+    def close(self):
+        try:
+            self.browser.quit()
+        except Exception:
+            pass
+        if probe(self.port, timeout=0.5):
+            kill_browser(self.port)
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class SessionPool:
+
+    def __init__(self, options_factory, base_profile=BASE_PROFILE, max_sessions=4, root=SESSION_ROOT):
+        self.options_factory = options_factory  # options_factory(port, user_data_path) -> ChromiumOptions
+        self.base_profile = base_profile
+        self.root = root
+        self.slots = threading.BoundedSemaphore(max_sessions)
+        self.lock = threading.Lock()
+        self.counter = 0
+        self.sessions = []
+
+    def start(self):
+        """克隆 profile, 分配端口, 启动浏览器, 返回 PooledSession (用完要 close, 或者用 session())"""
+        from DrissionPage import Chromium
+
+        self.slots.acquire()
+        with self.lock:
+            self.counter += 1
+            name = f"{os.getpid()}-{self.counter}"
+        profile_dir = os.path.join(self.root, name)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            stats = clone_profile(self.base_profile, profile_dir)
+            port = free_port()
+            print(f"yong ->  会话 {name}: 端口 {port}, profile 克隆 "
+                  f"(reflink {stats['reflink']} / 硬链接 {stats['link']} / 复制 {stats['copy']} / 跳过 {stats['skipped']})")
+            user_data_path = os.path.join(profile_dir, profile_subdir()) if profile_subdir() else profile_dir
+            browser = Chromium(self.options_factory(port, user_data_path))
+            if stats['locked']:
+                self.restore_login(name, browser, stats['locked'])
+        except Exception:
+            self.slots.release()
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+        session = PooledSession(port, profile_dir, browser)
+        with self.lock:
+            self.sessions.append(session)
+        return session
+
+    def restore_login(self, name, browser, locked):
+        """登录态文件被锁住没复制过来, 从开着的原浏览器把 cookie 拷过来, 拷不了就大声提示"""
+        print(f"yong ->  ⚠ 会话 {name}: 登录态文件被锁住没复制: {', '.join(locked)}")
+        try:
+            copied = copy_cookies(self.base_profile, browser)
+        except Exception as e:
+            copied = None
+            print(f"yong ->  ⚠ 从原浏览器复制 cookie 失败: {e}")
+        if copied is None:
+            print(f"yong ->  ⚠⚠ 会话 {name} 没有登录态, 需要登录的页面会跳到登录页! 关掉原浏览器再试, 或者在会话里重新登录")
+        else:
+            print(f"yong ->  会话 {name}: 从原浏览器复制了 {copied} 个 cookie")
+
+    def stop(self, session):
+        session.close()
+        with self.lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+                self.slots.release()
+
+    @contextmanager
+    def session(self):
+        """with pool.session() as s: s.browser.latest_tab ..."""
+        s = self.start()
+        try:
+            yield s
+        finally:
+            self.stop(s)
+
+    def close_all(self):
+        for s in list(self.sessions):
+            self.stop(s)
+
+
+def leftover_sessions(root=SESSION_ROOT):
+    """会话目录名是 <pid>-<序号>, pid 已经不在了的就是残留"""
+    if not os.path.isdir(root):
+        return []
+    result = []
+    for name in sorted(os.listdir(root)):
+        pid = name.split('-', 1)[0]
+        alive = pid.isdigit() and psutil.pid_exists(int(pid))
+        result.append((os.path.join(root, name), alive))
+    return result
+
+
+def browser_ports_for(profile_dir):
+    """找出还在用这个 profile 的浏览器的调试端口"""
+    target = os.path.normcase(os.path.normpath(profile_dir))
+    ports = set()
+    for p in psutil.process_iter(['cmdline']):
+        cmdline = p.info['cmdline'] or []
+        if any(arg.startswith('--user-data-dir=') and target in os.path.normcase(os.path.normpath(arg))
+               for arg in cmdline):
+            ports.update(int(arg.split('=', 1)[1]) for arg in cmdline if arg.startswith('--remote-debugging-port='))
+    return ports
+
+
+def clean(root=SESSION_ROOT):
+    removed = 0
+    for path, alive in leftover_sessions(root):
+        if alive:
+            continue
+        for port in browser_ports_for(path):
+            kill_browser(port)
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并行浏览器会话池')
+    parser.add_argument('cmd', choices=['list', 'clean'])
+    args = parser.parse_args()
+    if args.cmd == 'clean':
+        print(f"清理了 {clean()} 个残留会话")
+    else:
+        sessions = leftover_sessions()
+        if not sessions:
+            print("没有会话目录")
+        for path, alive in sessions:
+            print(f"  {'使用中' if alive else '残留  '} {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+浏览器自动化的分步耗时记录: 每一次查找元素/点击/输入记下定位、动作、耗时、重试次数和结果,
+流程结束后写到 dpconfig/traces/<流程>-<时间>-<毫秒>-<pid>.jsonl, 并打印最慢的几步。
+用来调等待时间、找出老是超时的定位。
+
+    python src/utils/step_trace.py              # 汇总最近的 trace, 按定位统计平均/最大耗时和失败次数
+    python src/utils/step_trace.py a.jsonl ...  # 只看指定的 trace 文件
+"""
+import os
+import sys
+import glob
+import json
+import time
+from contextlib import contextmanager
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+TRACE_DIR = os.path.join(project_root, 'dpconfig', 'traces')
+TRACE_KEEP = 50  # 最多保留多少个 trace 文件
+
+
+def recent_traces(trace_dir=TRACE_DIR):
+    """目录里的 trace 文件, 按修改时间从旧到新"""
+    paths = []
+    for path in glob.glob(os.path.join(trace_dir, '*.jsonl')):
+        try:
+            paths.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue
+    return [path for _, path in sorted(paths)]
+
+
+class StepTracer:
+
+    def __init__(self, flow, trace_dir=TRACE_DIR, keep=TRACE_KEEP):
+        self.flow = flow
+        self.trace_dir = trace_dir
+        self.keep = keep
+        self.started = time.time()
+        self.steps = []
+
+    def record(self, step, start, ok, locator='', action='', retries=0, error=''):
+        entry = {
+            'flow': self.flow,
+            'step': step,
+            'locator': locator,
+            'action': action,
+            'offset': round(start - self.started, 3),       # 从流程开始算的时间点
+            'duration': round(time.time() - start, 3),
+            'retries': retries,
+            'outcome': 'ok' if ok else ('timeout' if 'Timeout' in error or '超时' in error else 'error'),
+            'error': error,
+        }
+        self.steps.append(entry)
+        return entry
+
+    @contextmanager
+    def step(self, step, locator='', action=''):
+        """with tracer.step('提交按钮', locator, 'click'): ... 出异常也会记下来再抛出去"""
+        start = time.time()
+        try:
+            yield
+        except Exception as e:
+            self.record(step, start, False, locator, action, error=f"{type(e).__name__}: {e}")
+            raise
+        self.record(step, start, True, locator, action)
+
+    def call(self, action, func, *args, step=None, locator='', retries=0, retry_delay=0.3, **kwargs):
+        """执行 func, 失败按 retries 重试, 整个过程记成一步"""
+        start = time.time()
+        for attempt in range(retries + 1):
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if attempt < retries:
+                    time.sleep(retry_delay)
+                    continue
+                self.record(step or locator, start, False, locator, action, attempt, f"{type(e).__name__}: {e}")
+                raise
+            self.record(step or locator, start, True, locator, action, attempt)
+            return result
+
+    def page(self, page):
+        """包一层 page, 原来的 page.ele(...).click() 写法不用改就能记录耗时"""
+        return TracedPage(page, self)
+
+    def write(self):
+        """把这次的记录写成 jsonl, 顺带清理太旧的 trace, 返回文件路径"""
+        if not self.steps:
+            return None
+        os.makedirs(self.trace_dir, exist_ok=True)
+        # 带上毫秒和 pid, 同一秒里并发跑的流程不会互相覆盖
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        name = f"{self.flow}-{stamp}-{int(self.started * 1000) % 1000:03d}-{os.getpid()}.jsonl"
+        path = os.path.join(self.trace_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            for entry in self.steps:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        # 按修改时间清理, 文件名开头是流程名, 按名字排会把某个流程的新 trace 删掉
+        for old in recent_traces(self.trace_dir)[:-self.keep]:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass  # 别的进程同时在清理
+        return path
+
+    def summary(self, top=5):
+        """打印失败的步骤和最慢的 top 步"""
+        total = time.time() - self.started
+        failed = [s for s in self.steps if s['outcome'] != 'ok']
+        print(f"[{self.flow}] 共 {len(self.steps)} 步, 总耗时 {total:.2f}s, 失败 {len(failed)} 步")
+        for s in failed:
+            print(f"  ✗ {s['outcome']:<7} {s['duration']:6.2f}s  {s['action']:<6} {s['step']}  {s['error']}")
+        print(f"  最慢的 {min(top, len(self.steps))} 步:")
+        for s in sorted(self.steps, key=lambda s: s['duration'], reverse=True)[:top]:
+            retries = f" (重试 {s['retries']} 次)" if s['retries'] else ''
+            print(f"    {s['duration']:6.2f}s  {s['action']:<6} {s['step']}{retries}")
+
+    def finish(self, top=5):
+        self.summary(top)
+        path = self.write()
+        if path:
+            print(f"  详细记录: {path}")
+        return path
+
+
+class TracedElement:
+    """元素的薄包装: click/input/clear/focus 记录耗时, 其他属性原样转给元素"""
+
+    ACTIONS = ('click', 'input', 'clear', 'focus')
+
+    def __init__(self, ele, tracer, locator, step):
+        self._ele = ele
+        self._tracer = tracer
+        self._locator = locator
+        self._step = step
+
+    def __getattr__(self, name):
+        attr = getattr(self._ele, name)
+        if name not in self.ACTIONS or not callable(attr):
+            return attr
+
+        def traced(*args, **kwargs):
+            return self._tracer.call(name, attr, *args, step=self._step, locator=self._locator, **kwargs)
+        return traced
+
+    def ele(self, locator, *args, step=None, **kwargs):
+        found = self._tracer.call('find', self._ele.ele, locator, *args, step=step or locator, locator=locator, **kwargs)
+        return TracedElement(found, self._tracer, locator, step or locator) if found else found
+
+    def __bool__(self):
+        return bool(self._ele)
+
+
+class TracedPage:
+    """page 的薄包装: ele() 记录查找耗时 (没找到算失败), 返回的元素也带记录"""
+
+    def __init__(self, page, tracer):
+        self._page = page
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        return getattr(self._page, name)
+
+    def ele(self, locator, *args, step=None, **kwargs):
+        step = step or locator
+        start = time.time()
+        found = self._page.ele(locator, *args, **kwargs)
+        self._tracer.record(step, start, bool(found), locator, 'find', error='' if found else '找不到元素')
+        return TracedElement(found, self._tracer, locator, step) if found else found
+
+    def get(self, url, *args, **kwargs):
+        return self._tracer.call('get', self._page.get, url, *args, step=f"打开 {url}", locator=url, **kwargs)
+
+
+def load_traces(paths):
+    steps = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            steps.extend(json.loads(line) for line in f if line.strip())
+    return steps
+
+
+def report(paths, top=15):
+    """按 (流程, 动作, 定位) 汇总多次运行的耗时和失败次数"""
+    groups = {}
+    for s in load_traces(paths):
+        groups.setdefault((s['flow'], s['action'], s['locator'] or s['step']), []).append(s)
+    rows = []
+    for (flow, action, locator), items in groups.items():
+        durations = [s['duration'] for s in items]
+        failed = sum(1 for s in items if s['outcome'] != 'ok')
+        rows.append((max(durations), sum(durations) / len(durations), len(items), failed, flow, action, locator))
+    print(f"{len(paths)} 个 trace 文件, 按最大耗时排序:")
+    print(f"  {'最大':>7} {'平均':>7} {'次数':>4} {'失败':>4}  流程 / 动作 / 定位")
+    for worst, avg, count, failed, flow, action, locator in sorted(rows, reverse=True)[:top]:
+        print(f"  {worst:6.2f}s {avg:6.2f}s {count:4d} {failed:4d}  {flow} / {action} / {locator}")
+
+
+if __name__ == '__main__':
+    files = sys.argv[1:] or recent_traces()
+    if not files:
+        print(f"{TRACE_DIR} 下还没有 trace 文件")
+    else:
+        report(files)
@@ -0,0 +1,191 @@
+"""
+用本地模拟页面 (mock_pages.py) 反复跑 push_flow / refetch_cdn 的浏览器流程, 统计整体和每一步的耗时,
+改了等待逻辑、浏览器启动方式或者后端之后, 拿两次结果对比就知道是快了还是慢了。
+
+    python src/xiongmaoboshi/bench_flows.py --runs 5                          # 两个流程各跑 5 次
+    python src/xiongmaoboshi/bench_flows.py --flow push --picker dropdown --latency 0.2 --render-delay 0.5
+    python src/xiongmaoboshi/bench_flows.py --fast --save fast                # 结果存到 dpconfig/bench/fast.json
+    python src/xiongmaoboshi/bench_flows.py --fast --compare normal           # 和之前存的 normal 对比
+
+每次运行的日志默认不打印, 失败的那次才打印出来; 每一步的 trace 在 dpconfig/bench/traces。
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.step_trace import StepTracer
+from src.utils.http_pool import percentile
+from src.utils.open_browser_old_user_data import get_session_pool
+from src.xiongmaoboshi.mock_pages import start_mock_pages, CMS_PATH
+from src.xiongmaoboshi import push_flow, refetch_cdn
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+BENCH_DIR = os.path.join(project_root, 'dpconfig', 'bench')
+
+BENCH_PROJECT = 'panda-h5/bench-project'
+BENCH_SOURCE, BENCH_TARGET = 'feat-bench', 'master'
+BENCH_CDN_FILES = 8  # 刷新页面里填多少个 URL
+
+
+def push_config(base_url, args):
+    return dict(
+        push_flow.get_const(), openurl=f'{base_url}/{BENCH_PROJECT}', devNode=BENCH_SOURCE, targetNode=BENCH_TARGET,
+        branchPicker=args.picker, gitlabToken='bench', waitTimeout=args.timeout,
+        isolatedBrowser=args.isolated, fastBrowser=args.fast,
+    )
+
+
+def cdn_config(base_url, args):
+    return dict(
+        refetch_cdn.get_const(), cdnOpenUrl=f'{base_url}{CMS_PATH}?title=CMS#/other/assets-management/link',
+        cdnUrl=[f'{base_url}/edge/bench/{i}.js' for i in range(BENCH_CDN_FILES)],
+        cdnDirThreshold=0, cdnVerify=False, isolatedBrowser=args.isolated, fastBrowser=args.fast,
+    )
+
+
+def wait_until(check, timeout=5):
+    """流程返回后, 等模拟服务端确认真的收到了提交 (这段不算进耗时)"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if check():
+            return True
+        time.sleep(0.05)
+    return check()
+
+
+# 流程名 -> (StepTracer 名, 生成配置, 执行流程, 服务端确认提交成功)
+FLOWS = {
+    'push': ('push_flow', push_config, push_flow.open_and_click,
+             lambda state, before: state.merged_count() > before['merged']),
+    'cdn': ('refetch_cdn', cdn_config, refetch_cdn.open_and_click,
+            lambda state, before: len(state.cdn_submitted) > before['cdn']),
+}
+
+
+def run_once(name, config, state, trace_dir):
+    flow, _, func, confirm = FLOWS[name]
+    tracer = StepTracer(flow, trace_dir=trace_dir)
+    before = {'merged': state.merged_count(), 'cdn': len(state.cdn_submitted)}
+    log = io.StringIO()
+    start = time.time()
+    with redirect_stdout(log):
+        page = func(config, tracer)
+    total = time.time() - start
+    ok = page is not None and wait_until(lambda: confirm(state, before))
+    if config.get('isolatedBrowser'):
+        get_session_pool(fast=config.get('fastBrowser', False)).close_all()  # 每次都用新会话, 别把池子占满
+    steps = [(s['step'], s['duration'], s['outcome'] == 'ok') for s in tracer.steps]
+    return {'total': total, 'ok': ok, 'steps': steps, 'log': log.getvalue()}
+
+
+def summarize(runs):
+    """把多次运行汇总成 {'runs', 'failed', 'total': {...}, 'steps': {步骤: {...}}}, 步骤按第一次出现的顺序"""
+    def stats(values):
+        values = sorted(values)
+        return {'median': statistics.median(values), 'p90': percentile(values, 90),
+                'min': values[0], 'max': values[-1]}
+
+    ok_runs = [r for r in runs if r['ok']]
+    steps = {}
+    for r in ok_runs:
+        for step, duration, _ in r['steps']:
+            steps.setdefault(step, []).append(duration)
+        # 没有记录到的时间 (比如写死的 sleep) 单独算一项
+        steps.setdefault('(其他, 未记录)', []).append(max(0.0, r['total'] - sum(s[1] for s in r['steps'])))
+    return {
+        'runs': len(runs), 'failed': len(runs) - len(ok_runs),
+        'total': stats([r['total'] for r in ok_runs]) if ok_runs else None,
+        'steps': {step: stats(values) for step, values in steps.items()},
+    }
+
+
+def print_summary(name, summary, baseline=None):
+    def delta(now, before):
+        if not before:
+            return ''
+        diff = now['median'] - before['median']
+        return f"  {'+' if diff >= 0 else ''}{diff:.2f}s"
+
+    print(f"\n[{name}] {summary['runs']} 次, 失败 {summary['failed']} 次")
+    if not summary['total']:
+        return
+    base_steps = (baseline or {}).get('steps', {})
+    total = summary['total']
+    print(f"  {'':<36} {'中位数':>8} {'p90':>8} {'最小':>8} {'最大':>8}")
+    print(f"  {'端到端':<36} {total['median']:7.2f}s {total['p90']:7.2f}s {total['min']:7.2f}s {total['max']:7.2f}s"
+          f"{delta(total, (baseline or {}).get('total'))}")
+    for step, s in summary['steps'].items():
+        print(f"    {step[:34]:<34} {s['median']:7.2f}s {s['p90']:7.2f}s {s['min']:7.2f}s {s['max']:7.2f}s"
+              f"{delta(s, base_steps.get(step))}")
+
+
+def bench_path(name):
+    return name if name.endswith('.json') else os.path.join(BENCH_DIR, f'{name}.json')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='浏览器流程耗时基准 (本地模拟页面)')
+    parser.add_argument('--flow', choices=sorted(FLOWS), action='append', help='要测的流程, 默认都测')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1, help='先跑几次不计入结果 (浏览器冷启动)')
+    parser.add_argument('--latency', type=float, default=0.0, help='模拟服务端每个请求的延迟 (秒)')
+    parser.add_argument('--render-delay', type=float, default=0.3, help='页面主要元素渲染出来的延迟 (秒)')
+    parser.add_argument('--merge-check', type=float, default=0.5, help='合并按钮多久后可以点 (秒)')
+    parser.add_argument('--pages-dir', help='录下来的页面目录, 见 mock_pages.py')
+    parser.add_argument('--port', type=int, default=8931, help='固定端口, 分支缓存按地址区分, 换端口会重新拉分支')
+    parser.add_argument('--picker', choices=['url', 'dropdown'], default='url', help='push 流程选分支的方式')
+    parser.add_argument('--fast', action='store_true', help='用 fast 浏览器模式')
+    parser.add_argument('--isolated', action='store_true', help='每次用会话池里的独立浏览器')
+    parser.add_argument('--timeout', type=float, default=15, help='每一步等待超时')
+    parser.add_argument('--save', help='结果存成 dpconfig/bench/<名字>.json')
+    parser.add_argument('--compare', help='和之前存的结果对比 (名字或者 json 路径)')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(bench_path(args.compare), 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['flows']
+
+    server, base_url = start_mock_pages(args.port, args.latency, args.render_delay, args.merge_check,
+                                        args.pages_dir, ['master', 'dev', 'pre', BENCH_SOURCE])
+    trace_dir = os.path.join(BENCH_DIR, 'traces')
+    results = {}
+    try:
+        for name in args.flow or sorted(FLOWS):
+            config = FLOWS[name][1](base_url, args)
+            runs = []
+            for i in range(args.warmup + args.runs):
+                result = run_once(name, config, server.state, trace_dir)
+                label = '预热' if i < args.warmup else f'第 {i - args.warmup + 1} 次'
+                print(f"[{name}] {label}: {result['total']:.2f}s {'✓' if result['ok'] else '✗'}")
+                if not result['ok']:
+                    print(result['log'])
+                if i >= args.warmup:
+                    runs.append(result)
+            results[name] = summarize(runs)
+    finally:
+        server.shutdown()
+
+    for name, summary in results.items():
+        print_summary(name, summary, baseline.get(name))
+
+    if args.save:
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        options = {k: v for k, v in vars(args).items() if k not in ('save', 'compare')}
+        with open(bench_path(args.save), 'w', encoding='utf-8') as f:
+            json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'options': options, 'flows': results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {bench_path(args.save)}")
+    sys.exit(0 if all(s['failed'] == 0 for s in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
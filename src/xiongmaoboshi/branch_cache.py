@@ -0,0 +1,74 @@
+"""
+GitLab 分支查找: 用接口分页拉分支列表, 按仓库缓存到 dpconfig/gitlab-branches.json。
+缓存没过期 (branchCacheTtl 秒) 直接用, 过期了每页带 ETag 做条件请求, 没变的页服务端只回 304。
+不用再去网页上展开分支下拉框一条条找, 新建 MR 的页面地址也可以直接带上源/目标分支。
+"""
+import os
+import json
+import time
+import difflib
+import threading
+from urllib.parse import urlencode
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+BRANCH_CACHE = os.path.join(project_root, 'dpconfig', 'gitlab-branches.json')
+
+_file_lock = threading.Lock()  # 批量模式多个线程共用一个缓存文件
+
+
+def mr_form_url(base_url, project, source, target, path='/merge_requests/new'):
+    """新建 MR 页面的地址, 源分支和目标分支已经选好, 打开就是填标题的那一步"""
+    query = urlencode({'merge_request[source_branch]': source, 'merge_request[target_branch]': target})
+    return f"{base_url.rstrip('/')}/{project}{path}?{query}"
+
+
+class BranchResolver:
+
+    def __init__(self, client, base_url, ttl=600, cache_file=BRANCH_CACHE):
+        self.client = client
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.cache_file = cache_file
+
+    def _key(self, project):
+        return f"{self.base_url}/{project}"
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, project, entry):
+        with _file_lock:
+            cache = self._load()
+            cache[self._key(project)] = entry
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp = self.cache_file + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+
+    def branches(self, project, refresh=False):
+        """返回 (分支名集合, 是否刚从服务端确认过)"""
+        entry = self._load().get(self._key(project)) or {}
+        if not refresh and entry and time.time() - entry.get('fetched_at', 0) < self.ttl:
+            return {n for page in entry['pages'] for n in page['names']}, False
+        pages = self.client.list_branches(project, entry.get('pages') or ())
+        self._save(project, {'fetched_at': time.time(), 'pages': pages})
+        return {n for page in pages for n in page['names']}, True
+
+    def missing(self, project, names):
+        """返回不存在的分支; 缓存里找不到时先重新确认一次 (可能是刚建的分支)"""
+        known, fresh = self.branches(project)
+        missing = [n for n in names if n not in known]
+        if missing and not fresh:
+            known, _ = self.branches(project, refresh=True)
+            missing = [n for n in names if n not in known]
+        return missing
+
+    def suggest(self, project, name, limit=3):
+        known, _ = self.branches(project)
+        return difflib.get_close_matches(name, sorted(known), n=limit, cutoff=0.5)
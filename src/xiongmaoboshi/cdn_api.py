@@ -0,0 +1,170 @@
+"""
+直接调 CMS 的 CDN 刷新接口, 不用再打开资产管理页面往 textarea 里一条条输入。
+登录态用浏览器里的 cookie: 第一次从浏览器会话里拿, 存到 dpconfig/cms-cookies.json,
+之后直接用缓存, 接口返回 401/403 再去浏览器里重新拿。
+"""
+import os
+import json
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.http_pool import HTTPError, TokenBucket, shared_pool
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+COOKIE_CACHE = os.path.join(project_root, 'dpconfig', 'cms-cookies.json')
+
+
+THROTTLE_WORDS = ('限流', '频繁', '稍后', 'too many', 'rate limit', 'throttl')
+
+
+class CdnApiError(Exception):
+    """CDN 刷新接口返回错误, throttled 表示被限流了可以重试"""
+
+    def __init__(self, message, status=None, throttled=False, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.throttled = throttled
+        self.retry_after = retry_after
+
+
+def domain_matches(host, domain):
+    domain = domain.lstrip('.')
+    return host == domain or host.endswith('.' + domain)
+
+
+def cookies_from_browser(api_url):
+    """从浏览器会话里拿 CMS 域名下的 cookie, 拼成 Cookie 请求头"""
+    from src.utils.open_browser_old_user_data import open_browser
+
+    host = urlsplit(api_url).hostname
+    cookies = [c for c in open_browser().cookies() if domain_matches(host, c['domain'])]
+    return '; '.join(f"{c['name']}={c['value']}" for c in cookies)
+
+
+def load_cached_cookies(api_url):
+    try:
+        with open(COOKIE_CACHE, 'r', encoding='utf-8') as f:
+            return json.load(f).get(urlsplit(api_url).hostname)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_cookies(api_url, cookie_header):
+    try:
+        with open(COOKIE_CACHE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache[urlsplit(api_url).hostname] = cookie_header
+    os.makedirs(os.path.dirname(COOKIE_CACHE), exist_ok=True)
+    with open(COOKIE_CACHE, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+
+
+class CmsCdnClient:
+
+    def __init__(self, api_url, cookie_header=None, field='urls', headers=None, pool=None, cookie_loader=None,
+                 dir_field='dirs'):
+        self.api_url = api_url
+        self.field = field                 # 请求体里放 URL 列表的字段名
+        self.dir_field = dir_field         # 目录刷新时放目录列表的字段名
+        self.headers = dict(headers or {})
+        self.pool = pool or shared_pool()
+        self.cookie_loader = cookie_loader or cookies_from_browser
+        self.cookie_header = cookie_header
+        # purge_urls 多个线程同时拿到 401 时只重新拿一次 cookie: 每次重新拿 generation 加一,
+        # 线程带着自己请求时的 generation 来, 已经被别的线程换过就直接用新的
+        self.cookie_lock = threading.Lock()
+        self.cookie_generation = 0
+
+    def _post(self, urls, field):
+        with self.cookie_lock:
+            cookie, generation = self.cookie_header, self.cookie_generation
+        headers = dict(self.headers, Cookie=cookie or '')
+        return self.pool.post(self.api_url, json={field: list(urls)}, headers=headers), generation
+
+    def ensure_cookies(self):
+        with self.cookie_lock:
+            if not self.cookie_header:
+                self.cookie_header = load_cached_cookies(self.api_url)
+        return self.cookie_header or self.reload_cookies(self.cookie_generation)
+
+    def refresh(self, urls, dirs=False):
+        """一次请求提交所有 URL (dirs=True 时按目录刷新), 登录过期会从浏览器重新拿一次 cookie"""
+        self.ensure_cookies()
+        field = self.dir_field if dirs else self.field
+        resp, generation = self._post(urls, field)
+        if resp.status in (401, 403):
+            self.reload_cookies(generation)
+            resp, _ = self._post(urls, field)
+        return self.check(resp)
+
+    def refresh_dirs(self, dirs):
+        return self.refresh(dirs, dirs=True)
+
+    def reload_cookies(self, stale_generation=None):
+        """从浏览器重新拿 cookie; stale_generation 是调用方用过的那一代, 别的线程已经换过就不再拿"""
+        with self.cookie_lock:
+            if stale_generation is None or stale_generation == self.cookie_generation:
+                self.cookie_header = self.cookie_loader(self.api_url)
+                self.cookie_generation += 1
+                save_cached_cookies(self.api_url, self.cookie_header)
+            return self.cookie_header
+
+    def check(self, resp):
+        body = resp.json() if resp.body[:1] in (b'{', b'[') else None
+        message = (body or {}).get('message') if isinstance(body, dict) else None
+        message = str(message or resp.text[:200])
+        throttled = resp.status in (429, 503) or any(w in message.lower() for w in THROTTLE_WORDS)
+        retry_after = resp.headers.get('retry-after')
+        retry_after = float(retry_after) if retry_after and retry_after.replace('.', '', 1).isdigit() else None
+        if not resp.ok:
+            raise CdnApiError(f"刷新接口返回 {resp.status}: {message}", resp.status, throttled, retry_after)
+        # CMS 接口一般是 {"code": 0, "data": ...}, code 不是 0/200 也算失败
+        if isinstance(body, dict) and body.get('code') not in (None, 0, 200, '0', '200'):
+            raise CdnApiError(f"刷新接口返回错误: {message}", resp.status, throttled, retry_after)
+        return body
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def purge_urls(submit, urls, chunk_size=20, concurrency=4, rate=2.0, max_retries=4, backoff=1.0):
+    """
+    批量刷新: 按接口单次上限切块, 多个块并发提交, 整体受令牌桶限速 (每秒 rate 个请求)。
+    被限流的块按指数退避 + 随机抖动重试, 服务端给了 Retry-After 就按它等。
+    submit(chunk) 提交一块 URL, 失败抛 CdnApiError。返回 {url: {'status', 'attempts', 'detail'}}
+    """
+    bucket = TokenBucket(rate, burst=concurrency)
+    report = {}
+
+    def run(chunk):
+        for attempt in range(1, max_retries + 2):
+            bucket.acquire()
+            try:
+                submit(chunk)
+                return 'ok', attempt, ''
+            except CdnApiError as e:
+                if not e.throttled or attempt > max_retries:
+                    return ('throttled' if e.throttled else 'failed'), attempt, str(e)
+                wait = e.retry_after or backoff * 2 ** (attempt - 1)
+                wait += random.uniform(0, wait / 2)
+                if e.retry_after:
+                    bucket.pause(e.retry_after)
+            except HTTPError as e:
+                if attempt > max_retries:
+                    return 'failed', attempt, str(e)
+                wait = backoff * 2 ** (attempt - 1) + random.uniform(0, backoff)
+            time.sleep(wait)
+
+    chunks = chunked(list(urls), chunk_size)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for chunk, (status, attempts, detail) in zip(chunks, executor.map(run, chunks)):
+            for url in chunk:
+                report[url] = {'status': status, 'attempts': attempts, 'detail': detail}
+    return report
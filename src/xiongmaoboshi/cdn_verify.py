@@ -0,0 +1,131 @@
+"""
+刷新后验证 CDN 节点是否真的拿到了新内容:
+刷新前先对每个 URL 发一次 HEAD 记下 ETag / Last-Modified / Content-Length, 刷新后并发轮询,
+满足下面任意一条才算新鲜:
+- 给了预期值 (build.py 刷新任务里的 expected, 比如产物文件大小) 并且都对得上
+- ETag / Last-Modified / Content-Length 和刷新前不一样, 或者刷新前还是 404 现在有了
+X-Cache 是 MISS / Age 很小只说明节点回源了, 源站要是还没更新拿到的还是旧内容, 所以只写进原因里做参考。
+"""
+import time
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.http_pool import HTTPError, shared_pool
+
+CACHE_STATUS_HEADERS = ('x-cache', 'x-cache-status', 'x-cache-lookup', 'cf-cache-status', 'eo-cache-status')
+FRESH_WORDS = ('miss', 'expired', 'refresh', 'bypass', 'revalidated')
+
+
+def probe(pool, url):
+    """发 HEAD (不支持时退回 GET), 返回关心的缓存相关响应头"""
+    try:
+        resp = pool.head(url)
+        if resp.status in (405, 501):
+            resp = pool.get(url)
+    except HTTPError as e:
+        return {'error': str(e)}
+    cache_status = next((resp.headers[h] for h in CACHE_STATUS_HEADERS if h in resp.headers), None)
+    age = resp.headers.get('age')
+    length = resp.headers.get('content-length')
+    return {
+        'status': resp.status,
+        'age': int(age) if age and age.isdigit() else None,
+        'etag': resp.headers.get('etag'),
+        'last_modified': resp.headers.get('last-modified'),
+        # 压缩过的长度和文件大小对不上, 不拿来比
+        'content_length': int(length) if length and length.isdigit() and not resp.headers.get('content-encoding') else None,
+        'cache_status': cache_status,
+    }
+
+
+def content_changed(before, now, expected=None):
+    """内容确实是新的返回原因, 否则返回 None"""
+    if expected:
+        checked = [k for k in ('etag', 'last_modified', 'content_length') if k in expected and now.get(k) is not None]
+        if checked and all(now[k] == expected[k] for k in checked):
+            return f"{'/'.join(checked)} 和预期一致"
+        if checked:
+            return None  # 有预期值但对不上, 还是旧内容
+    if not before or 'error' in before:
+        return None  # 没有刷新前的基线, 证明不了
+    if before['status'] >= 400:
+        return f"刷新前 HTTP {before['status']}, 现在有内容了"
+    for key, label in (('etag', 'ETag'), ('last_modified', 'Last-Modified'), ('content_length', 'Content-Length')):
+        if now.get(key) is not None and before.get(key) is not None and now[key] != before[key]:
+            return f"{label} 变了"
+    return None
+
+
+def freshness(before, now, purged_at, expected=None):
+    """判断这次探测的结果是否是刷新之后的新内容, 返回 (是否新鲜, 原因)"""
+    if 'error' in now:
+        return False, now['error']
+    if now['status'] >= 400:
+        return False, f"HTTP {now['status']}"
+    hints = []
+    if now['cache_status'] and any(w in now['cache_status'].lower() for w in FRESH_WORDS):
+        hints.append(f"缓存状态 {now['cache_status']}")
+    if now['age'] is not None and now['age'] < time.time() - purged_at:
+        hints.append(f"Age={now['age']}s")
+    changed = content_changed(before, now, expected)
+    if changed:
+        return True, ', '.join([changed] + hints)
+    return False, f"还没拿到新内容 (Age={now['age']} 缓存状态={now['cache_status']})"
+
+
+class CdnVerifier:
+
+    def __init__(self, concurrency=8, pool=None):
+        self.concurrency = concurrency
+        self.pool = pool or shared_pool()
+
+    def allow_concurrency(self, urls):
+        """
+        共用连接池每个 host 默认只有 maxPerHost 个并发, 比 cdnVerifyConcurrency 小的话探测其实跑不满。
+        没在 http.hosts 里单独配过的 CDN 域名把并发提到 concurrency; 配过的按配置来
+        """
+        for host in {urlsplit(u).hostname for u in urls} - set(self.pool.host_limits):
+            if self.pool.max_per_host < self.concurrency:
+                self.pool.set_host_limit(host, concurrency=self.concurrency)
+
+    def probe_all(self, urls):
+        self.allow_concurrency(urls)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return dict(zip(urls, executor.map(lambda u: probe(self.pool, u), urls)))
+
+    def baseline(self, urls):
+        """刷新前调用, 记下每个 URL 当前的 ETag / Last-Modified"""
+        return self.probe_all(list(urls))
+
+    def verify(self, urls, baseline, purged_at, timeout=120, interval=5, expected=None):
+        """
+        并发轮询直到所有 URL 都新鲜或者超时, 返回
+        {url: {'fresh', 'seconds' (刷新后多久确认新鲜), 'reason', 'probes'}}
+        expected: {url: {'etag' / 'last_modified' / 'content_length': 预期值}}, 可选
+        """
+        expected = expected or {}
+        report = {u: {'fresh': False, 'seconds': None, 'reason': '', 'probes': 0} for u in urls}
+        deadline = time.time() + timeout
+        pending = list(urls)
+        while pending:
+            for url, now in self.probe_all(pending).items():
+                fresh, reason = freshness(baseline.get(url), now, purged_at, expected.get(url))
+                entry = report[url]
+                entry.update(reason=reason, probes=entry['probes'] + 1)
+                if fresh:
+                    entry.update(fresh=True, seconds=time.time() - purged_at)
+            pending = [u for u in pending if not report[u]['fresh']]
+            if not pending or time.time() + interval > deadline:
+                break
+            time.sleep(interval)
+        return report
+
+
+def print_freshness_report(report):
+    fresh = sum(1 for r in report.values() if r['fresh'])
+    print(f"CDN 新鲜度: {fresh}/{len(report)} 个 URL 已经是新内容")
+    for url, r in report.items():
+        if r['fresh']:
+            print(f"  ✓ {r['seconds']:6.1f}s  {url}  ({r['reason']})")
+        else:
+            print(f"  ✗   超时   {url}  ({r['reason']}, 探测 {r['probes']} 次)")
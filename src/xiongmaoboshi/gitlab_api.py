@@ -0,0 +1,149 @@
+"""
+GitLab REST API (v4) 客户端, 用来代替在网页上点来点去地创建和合并 MR。
+token 从 const.yaml 的 gitlabToken 或者环境变量 GITLAB_TOKEN 读取。
+"""
+import os
+import time
+from urllib.parse import urlsplit, quote
+
+from src.utils.http_pool import shared_pool
+
+
+class GitLabError(Exception):
+    """GitLab 接口返回错误"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class MergeConflict(GitLabError):
+    """MR 有冲突, 不能自动合并"""
+
+
+def split_project_url(openurl):
+    """https://git.100tal.com/panda-h5/new-cms -> ('https://git.100tal.com', 'panda-h5/new-cms')"""
+    parts = urlsplit(openurl)
+    return f"{parts.scheme}://{parts.netloc}", parts.path.strip('/').removesuffix('.git')
+
+
+def get_token(config):
+    token = config.get('gitlabToken') or os.environ.get('GITLAB_TOKEN')
+    if not token:
+        raise GitLabError("没有配置 GitLab token, 在 const.yaml 里加 gitlabToken 或者设置环境变量 GITLAB_TOKEN")
+    return token
+
+
+class GitLabClient:
+
+    def __init__(self, base_url, token, pool=None):
+        self.api = base_url.rstrip('/') + '/api/v4'
+        self.pool = pool or shared_pool()
+        self.headers = {'PRIVATE-TOKEN': token}
+
+    def _url(self, project, path=''):
+        return f"{self.api}/projects/{quote(project, safe='')}{path}"
+
+    def _check(self, method, url, resp):
+        if not resp.ok:
+            body = resp.json() if resp.body.startswith(b'{') else {}
+            message = body.get('message') or body.get('error') or resp.text[:200]
+            raise GitLabError(f"{method} {url} 返回 {resp.status}: {message}", resp.status)
+        return resp
+
+    def _call(self, method, url, **kwargs):
+        resp = self.pool.request(method, url, headers=self.headers, **kwargs)
+        return self._check(method, url, resp).json()
+
+    def list_branches(self, project, cached_pages=(), per_page=100):
+        """
+        分页拉取全部分支名。cached_pages 是上次的 [{'etag', 'names'}], 每一页都带 If-None-Match,
+        没变的页返回 304 直接用缓存。返回新的 [{'etag', 'names'}]
+        """
+        url = self._url(project, '/repository/branches')
+        pages = []
+        while True:
+            old = cached_pages[len(pages)] if len(pages) < len(cached_pages) else None
+            headers = dict(self.headers)
+            if old and old.get('etag'):
+                headers['If-None-Match'] = old['etag']
+            resp = self.pool.get(url, params={'per_page': per_page, 'page': len(pages) + 1}, headers=headers)
+            if resp.status == 304 and old:
+                pages.append(old)
+            else:
+                names = [b['name'] for b in self._check('GET', url, resp).json()]
+                pages.append({'etag': resp.headers.get('etag'), 'names': names})
+            if len(pages[-1]['names']) < per_page:
+                return pages
+
+    def find_merge_request(self, project, source, target, state='opened'):
+        """找同源同目标的 MR (默认找打开的, state='merged' 找最近合并的)"""
+        mrs = self._call('GET', self._url(project, '/merge_requests'), params={
+            'state': state, 'source_branch': source, 'target_branch': target,
+        })
+        return mrs[0] if mrs else None
+
+    def create_merge_request(self, project, source, target, title=None):
+        """创建 MR, 已经有打开的就直接复用"""
+        try:
+            return self._call('POST', self._url(project, '/merge_requests'), json={
+                'source_branch': source,
+                'target_branch': target,
+                'title': title or f"Merge branch '{source}' into '{target}'",
+            })
+        except GitLabError as e:
+            if e.status != 409:
+                raise
+            mr = self.find_merge_request(project, source, target)
+            if not mr:
+                raise
+            return mr
+
+    def compare(self, project, source, target):
+        """target..source 之间的提交, 为空说明 source 已经全部合进 target 了"""
+        return self._call('GET', self._url(project, '/repository/compare'), params={
+            'from': target, 'to': source, 'straight': 'false',
+        })
+
+    def has_changes(self, project, source, target):
+        return bool(self.compare(project, source, target).get('commits'))
+
+    def list_pipelines(self, project, sha, etag=None):
+        """某个提交的流水线, 带上次的 etag 做条件请求, 没变化时返回 (None, etag)"""
+        url = self._url(project, '/pipelines')
+        headers = dict(self.headers)
+        if etag:
+            headers['If-None-Match'] = etag
+        resp = self.pool.get(url, params={'sha': sha}, headers=headers)
+        if resp.status == 304:
+            return None, etag
+        return self._check('GET', url, resp).json(), resp.headers.get('etag')
+
+    def get_merge_request(self, project, iid):
+        return self._call('GET', self._url(project, f'/merge_requests/{iid}'))
+
+    def wait_mergeable(self, project, iid, timeout=30, interval=0.5):
+        """新建的 MR 要等 GitLab 做完合并检查, merge_status 才会变成 can_be_merged"""
+        deadline = time.time() + timeout
+        while True:
+            mr = self.get_merge_request(project, iid)
+            status = mr.get('detailed_merge_status') or mr.get('merge_status')
+            if status not in ('unchecked', 'checking', 'preparing', 'approvals_syncing'):
+                return mr
+            if time.time() > deadline:
+                return mr
+            time.sleep(interval)
+
+    def accept_merge_request(self, project, iid, timeout=30):
+        mr = self.wait_mergeable(project, iid, timeout=timeout)
+        if mr.get('state') == 'merged':
+            return mr
+        if mr.get('has_conflicts') or mr.get('merge_status') == 'cannot_be_merged':
+            raise MergeConflict(f"!{iid} 有冲突, 不能自动合并", 406)
+        try:
+            return self._call('PUT', self._url(project, f'/merge_requests/{iid}/merge'))
+        except GitLabError as e:
+            # 406: 有冲突; 405 (草稿/流水线没过/需要审批) 原样抛出, MR 留着等人处理
+            if e.status == 406:
+                raise MergeConflict(str(e), e.status) from e
+            raise
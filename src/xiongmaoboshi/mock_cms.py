@@ -0,0 +1,160 @@
+"""
+本地模拟的 CMS CDN 刷新接口, 用来在不碰线上 CMS 的情况下调试 refetch_cdn 的 API 模式。
+
+    python src/xiongmaoboshi/mock_cms.py --port 8930
+
+然后在 cdn.yaml 里把 cdnApiUrl 改成 http://127.0.0.1:8930/api/cdn/refresh,
+cookie 需要带上 session=mock (可以先用 --no-auth 关掉校验)。
+
+/edge/ 下面的地址模拟 CDN 节点: 带 X-Cache / Age / ETag 头, 提交刷新后过 --purge-delay 秒才失效,
+cdnUrl 写成 http://127.0.0.1:8930/edge/xxx 就可以调试刷新后的新鲜度验证。
+"""
+import json
+import time
+import argparse
+import threading
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REFRESH_PATH = '/api/cdn/refresh'
+
+
+class MockCmsState:
+
+    def __init__(self, session_cookie='session=mock', latency=0.0, max_urls=None, rate=None, purge_delay=0.0):
+        self.lock = threading.Lock()
+        self.session_cookie = session_cookie  # None 表示不校验登录态
+        self.latency = latency
+        self.max_urls = max_urls  # 单次最多提交多少个 URL
+        self.rate = rate          # 每秒最多处理多少个请求, 超了返回 429
+        self.window = []          # 最近一秒内的请求时间
+        self.throttled = 0
+        self.submitted = []  # 每次请求提交的 URL 列表
+        self.task_id = 0
+        self.purge_delay = purge_delay
+        self.edge = {}       # 路径 -> [缓存建立时间, 版本号, 失效时间]
+        self.started = time.time()
+
+
+class MockCmsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def edge_response(self, with_body):
+        """模拟 CDN 节点: 第一次访问当作已经缓存了一小时, 刷新生效后下一次访问回源 (MISS)"""
+        path = urlsplit(self.path).path
+        now = time.time()
+        with self.state.lock:
+            entry = self.state.edge.setdefault(path, [self.state.started - 3600, 1, None])
+            cache_status = 'HIT'
+            if entry[2] is not None and now >= entry[2]:
+                entry[:] = [now, entry[1] + 1, None]
+                cache_status = 'MISS'
+            cached_at, version = entry[0], entry[1]
+        body = f'{path} v{version}'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', f'"v{version}"')
+        self.send_header('Age', str(int(now - cached_at)))
+        self.send_header('X-Cache', cache_status)
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/edge/'):
+            return self.edge_response(True)
+        self.send_json(404, {'code': 404, 'message': 'not found'})
+
+    def do_HEAD(self):
+        if self.path.startswith('/edge/'):
+            return self.edge_response(False)
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if self.path != REFRESH_PATH:
+            return self.send_json(404, {'code': 404, 'message': 'not found'})
+        cookie = self.headers.get('Cookie') or ''
+        if self.state.session_cookie and self.state.session_cookie not in cookie:
+            return self.send_json(401, {'code': 401, 'message': '未登录'})
+        try:
+            body = json.loads(raw or b'{}')
+            urls = body.get('urls') or body.get('dirs') or []
+        except ValueError:
+            return self.send_json(400, {'code': 400, 'message': '请求体不是 JSON'})
+        if not urls:
+            return self.send_json(200, {'code': 1, 'message': 'urls 不能为空'})
+        if self.state.max_urls and len(urls) > self.state.max_urls:
+            return self.send_json(200, {'code': 1, 'message': f'单次最多提交 {self.state.max_urls} 个 URL'})
+        with self.state.lock:
+            now = time.time()
+            self.state.window = [t for t in self.state.window if now - t < 1]
+            if self.state.rate and len(self.state.window) >= self.state.rate:
+                self.state.throttled += 1
+                return self.send_json(429, {'code': 429, 'message': '请求太频繁, 请稍后再试'}, {'Retry-After': '1'})
+            self.state.window.append(now)
+            self.state.submitted.append(urls)
+            for url in urls:
+                path = urlsplit(url).path
+                if path.startswith('/edge/'):
+                    entry = self.state.edge.setdefault(path, [self.state.started - 3600, 1, None])
+                    entry[2] = now + self.state.purge_delay
+            self.state.task_id += 1
+            task_id = self.state.task_id
+        self.send_json(200, {'code': 0, 'message': 'ok', 'data': {'taskId': task_id, 'count': len(urls)}})
+
+
+def start_mock_cms(port=0, session_cookie='session=mock', latency=0.0, max_urls=None, rate=None, purge_delay=0.0):
+    """在后台线程启动模拟服务, 返回 (server, 刷新接口地址), 用完调用 server.shutdown()"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockCmsHandler)
+    server.daemon_threads = True
+    server.state = MockCmsState(session_cookie, latency, max_urls, rate, purge_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}{REFRESH_PATH}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 CMS CDN 刷新接口')
+    parser.add_argument('--port', type=int, default=8930)
+    parser.add_argument('--no-auth', action='store_true', help='不校验 cookie')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求额外延迟的秒数')
+    parser.add_argument('--max-urls', type=int, default=None, help='单次最多提交多少个 URL')
+    parser.add_argument('--rate', type=float, default=None, help='每秒最多处理多少个请求, 超了返回 429')
+    parser.add_argument('--purge-delay', type=float, default=0.0, help='/edge/ 下的地址提交刷新后多少秒才失效')
+    args = parser.parse_args()
+
+    server, api_url = start_mock_cms(
+        args.port, None if args.no_auth else 'session=mock', args.latency, args.max_urls, args.rate, args.purge_delay
+    )
+    print(f"模拟 CMS 已启动: {api_url}, Ctrl+C 退出")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
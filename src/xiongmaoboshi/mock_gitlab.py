@@ -0,0 +1,258 @@
+"""
+本地模拟的 GitLab API, 用来在不碰公司 GitLab 的情况下调试 push_flow 的 API 模式。
+
+    python src/xiongmaoboshi/mock_gitlab.py --port 8929 --conflict feat-bad
+
+然后在 const.yaml 里把 openurl 改成 http://127.0.0.1:8929/panda-h5/xxx, gitlabToken 随便填。
+"""
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class MockGitLabState:
+    """
+    内存里的 MR 数据, 分支名在 conflict_branches 里的 MR 合并时报冲突,
+    在 empty_branches 里的分支和目标分支比较没有新提交; branches 是分支列表接口返回的分支 (每个仓库都一样)。
+    MR 合并后给合并提交建一条流水线, pipeline_duration 秒后结束, 源分支在 failing_branches 里的流水线失败
+    """
+
+    def __init__(self, conflict_branches=(), latency=0.0, empty_branches=(), branches=None,
+                 pipeline_duration=2.0, failing_branches=()):
+        self.lock = threading.Lock()
+        self.pipeline_duration = pipeline_duration
+        self.failing_branches = set(failing_branches)
+        self.pipelines = {}  # (project, sha) -> 流水线
+        self.branches = sorted(branches or ['master', 'dev', 'pre'])
+        self.conflict_branches = set(conflict_branches)
+        self.empty_branches = set(empty_branches)
+        self.latency = latency
+        self.merge_requests = {}  # project -> [mr]
+        self.requests = []        # (method, path) 记录下来方便检查
+
+    def find_mr(self, project, iid):
+        for mr in self.merge_requests.get(project, []):
+            if mr['iid'] == int(iid):
+                return mr
+        return None
+
+    def open_mr(self, project, source, target, title='', host=''):
+        """新建 MR, 返回 (mr, 是否新建); 同样的源/目标分支已经有打开的 MR 时返回那个"""
+        with self.lock:
+            mrs = self.merge_requests.setdefault(project, [])
+            for mr in mrs:
+                if mr['state'] == 'opened' and mr['source_branch'] == source and mr['target_branch'] == target:
+                    return mr, False
+            conflict = source in self.conflict_branches
+            mr = {
+                'id': 1000 + len(mrs) + 1, 'iid': len(mrs) + 1, 'project_path': project,
+                'title': title, 'state': 'opened',
+                'source_branch': source, 'target_branch': target,
+                'merge_status': 'cannot_be_merged' if conflict else 'can_be_merged',
+                'has_conflicts': conflict, 'merge_commit_sha': None,
+                'web_url': f'http://{host}/{project}/-/merge_requests/{len(mrs) + 1}',
+            }
+            mrs.append(mr)
+            return mr, True
+
+    def merge(self, project, iid, host=''):
+        """合并 MR 并给合并提交建流水线, 返回 (状态码, mr 或错误信息)"""
+        with self.lock:
+            mr = self.find_mr(project, iid)
+            if not mr:
+                return 404, '404 Not found'
+            if mr['has_conflicts']:
+                return 406, 'Branch cannot be merged'
+            if mr['state'] != 'opened':
+                return 405, '405 Method Not Allowed'
+            mr['state'] = 'merged'
+            mr['merge_commit_sha'] = f'{abs(hash((project, mr["iid"]))):040x}'[:40]
+            self.pipelines[(project, mr['merge_commit_sha'])] = {
+                'id': 5000 + len(self.pipelines) + 1, 'sha': mr['merge_commit_sha'], 'ref': mr['target_branch'],
+                'started': time.time(), 'fail': mr['source_branch'] in self.failing_branches,
+                'web_url': f'http://{host}/{project}/pipelines/{5000 + len(self.pipelines) + 1}',
+            }
+            return 200, mr
+
+
+class MockGitLabHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持 keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(raw or b'{}')
+        return {k: v[0] for k, v in parse_qs(raw.decode('utf-8')).items()}
+
+    def dispatch(self, method):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        parts = urlsplit(self.path)
+        self.state.requests.append((method, parts.path))
+        if not self.headers.get('PRIVATE-TOKEN'):
+            return self.send_json(401, {'message': '401 Unauthorized'})
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        match = re.match(r'^/api/v4/projects/([^/]+)(/.*)?$', parts.path)
+        if not match:
+            return self.send_json(404, {'message': '404 Not Found'})
+        project, rest = unquote(match.group(1)), match.group(2) or ''
+        for pattern, handler_method, handler in self.routes():
+            m = re.match(pattern, rest)
+            if m and handler_method == method:
+                return handler(project, query, *m.groups())
+        return self.send_json(404, {'message': '404 Not Found'})
+
+    def routes(self):
+        return [
+            (r'^/merge_requests$', 'GET', self.list_mrs),
+            (r'^/merge_requests$', 'POST', self.create_mr),
+            (r'^/merge_requests/(\d+)$', 'GET', self.get_mr),
+            (r'^/merge_requests/(\d+)/merge$', 'PUT', self.merge_mr),
+            (r'^/repository/compare$', 'GET', self.compare),
+            (r'^/repository/branches$', 'GET', self.list_branches),
+            (r'^/pipelines$', 'GET', self.list_pipelines),
+        ]
+
+    def find_mr(self, project, iid):
+        return self.state.find_mr(project, iid)
+
+    def list_mrs(self, project, query):
+        with self.state.lock:
+            mrs = [mr for mr in self.state.merge_requests.get(project, [])
+                   if all(str(mr.get(k)) == v for k, v in query.items() if k in ('state', 'source_branch', 'target_branch'))]
+        self.send_json(200, mrs)
+
+    def create_mr(self, project, query):
+        body = self.read_body()
+        source, target = body.get('source_branch'), body.get('target_branch')
+        if not source or not target:
+            return self.send_json(400, {'error': 'source_branch, target_branch are missing'})
+        mr, created = self.state.open_mr(project, source, target, body.get('title', ''), self.headers.get('Host'))
+        if not created:
+            return self.send_json(409, {'message': [f'Another open merge request already exists for this source branch: !{mr["iid"]}']})
+        self.send_json(201, mr)
+
+    def get_mr(self, project, query, iid):
+        mr = self.find_mr(project, iid)
+        if not mr:
+            return self.send_json(404, {'message': '404 Not found'})
+        self.send_json(200, mr)
+
+    def merge_mr(self, project, query, iid):
+        status, mr = self.state.merge(project, iid, self.headers.get('Host'))
+        if status != 200:
+            return self.send_json(status, {'message': mr})
+        self.send_json(200, mr)
+
+    def compare(self, project, query):
+        source = query.get('to')
+        commits = [] if source in self.state.empty_branches else [
+            {'id': f'{abs(hash((project, source))):040x}'[:40], 'title': f'commit on {source}'}
+        ]
+        self.send_json(200, {'commits': commits, 'diffs': []})
+
+    def list_branches(self, project, query):
+        """分页 + ETag, 和 GitLab 一样带 X-Next-Page / X-Total-Pages"""
+        per_page, page = int(query.get('per_page', 20)), int(query.get('page', 1))
+        with self.state.lock:
+            names = self.state.branches[(page - 1) * per_page:page * per_page]
+            total_pages = max(1, -(-len(self.state.branches) // per_page))
+        data = [{'name': n, 'merged': False, 'protected': n == 'master'} for n in names]
+        etag = 'W/"%s"' % hashlib.md5(json.dumps(data).encode('utf-8')).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            return self.send_not_modified(etag)
+        self.send_json(200, data, {
+            'ETag': etag, 'X-Page': str(page), 'X-Total-Pages': str(total_pages),
+            'X-Next-Page': str(page + 1) if page < total_pages else '',
+        })
+
+    def list_pipelines(self, project, query):
+        """按时间推进状态: pending -> running -> success / failed, 带 ETag, 没变化回 304"""
+        with self.state.lock:
+            found = self.state.pipelines.get((project, query.get('sha')))
+        data = []
+        if found:
+            elapsed = time.time() - found['started']
+            duration = self.state.pipeline_duration
+            status = ('pending' if elapsed < duration * 0.2 else 'running' if elapsed < duration
+                      else 'failed' if found['fail'] else 'success')
+            data = [{'id': found['id'], 'sha': found['sha'], 'ref': found['ref'], 'status': status,
+                     'web_url': found['web_url']}]
+        etag = 'W/"%s"' % hashlib.md5(json.dumps(data).encode('utf-8')).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            return self.send_not_modified(etag)
+        self.send_json(200, data, {'ETag': etag})
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+
+def start_mock_gitlab(port=0, conflict_branches=(), latency=0.0, empty_branches=(), branches=None,
+                      pipeline_duration=2.0, failing_branches=()):
+    """在后台线程启动模拟服务, 返回 (server, base_url), 用完调用 server.shutdown()"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockGitLabHandler)
+    server.daemon_threads = True
+    server.state = MockGitLabState(conflict_branches, latency, empty_branches, branches,
+                                   pipeline_duration, failing_branches)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 GitLab API')
+    parser.add_argument('--port', type=int, default=8929)
+    parser.add_argument('--conflict', action='append', default=[], help='合并时报冲突的源分支, 可以写多次')
+    parser.add_argument('--empty', action='append', default=[], help='没有新提交的源分支, 可以写多次')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求额外延迟的秒数')
+    parser.add_argument('--branches', type=int, default=0, help='额外生成多少个 feature-xxx 分支, 模拟分支很多的仓库')
+    parser.add_argument('--pipeline-duration', type=float, default=2.0, help='合并后流水线跑多少秒')
+    parser.add_argument('--fail', action='append', default=[], help='合并后流水线失败的源分支, 可以写多次')
+    args = parser.parse_args()
+
+    branches = ['master', 'dev', 'pre'] + [f'feature-{i:04d}' for i in range(args.branches)]
+    server, base_url = start_mock_gitlab(args.port, args.conflict, args.latency, args.empty, branches,
+                                         args.pipeline_duration, args.fail)
+    print(f"模拟 GitLab 已启动: {base_url}, Ctrl+C 退出")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""
+本地模拟的 GitLab 新建 MR 页面和 CMS 刷新 CDN 页面, 元素和 push_flow / refetch_cdn 用的定位一模一样,
+用来在不碰公司 GitLab 和线上 CMS 的情况下跑浏览器流程、测耗时 (见 bench_flows.py)。
+/api/v4/ 下面还是 mock_gitlab 的接口, 和页面共用一份 MR 数据, 所以分支检查、合并后查提交都能用。
+
+    python src/xiongmaoboshi/mock_pages.py --port 8931 --latency 0.2 --render-delay 0.5 --merge-check 1
+
+然后把 const.yaml 的 openurl 改成 http://127.0.0.1:8931/panda-h5/xxx,
+cdn.yaml 的 cdnOpenUrl 改成 http://127.0.0.1:8931/cms/?title=CMS#/other/assets-management/link
+
+- --latency: 每个请求 (页面和接口) 服务端延迟的秒数
+- --render-delay: 页面打开后过多久才渲染出主要元素, 模拟前端框架加载
+- --merge-check: MR 页面的合并按钮多久后才可以点, 模拟 GitLab 的合并检查
+- --pages-dir: 用录下来的页面 (project.html / merge_requests.html / compare.html / new.html / show.html / cms.html)
+  代替内置页面, 里面可以用 $project $source $target $iid $branches $render_delay_ms $merge_check_ms
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from html import escape
+from string import Template
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.xiongmaoboshi.mock_gitlab import MockGitLabHandler, MockGitLabState
+
+CMS_PATH = '/cms/'
+CMS_REFRESH_PATH = '/api/cdn/refresh'
+
+# 所有页面共用: 主要内容放在 <template> 里, 过 render_delay 才插进页面; 下拉菜单加上 show 才显示
+LAYOUT = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>$title</title>
+<style>
+  body { font-family: sans-serif; margin: 24px; }
+  .dropdown-menu { display: none; border: 1px solid #ccc; padding: 4px; list-style: none; }
+  .dropdown-menu.show { display: block; }
+  .dropdown-menu li { padding: 4px 8px; cursor: pointer; }
+  textarea { width: 600px; height: 200px; }
+</style></head>
+<body>
+<template id="app">$body</template>
+<script>
+  setTimeout(function () {
+    document.body.appendChild(document.getElementById('app').content.cloneNode(true));
+    if (window.onRendered) { window.onRendered(); }
+  }, $render_delay_ms);
+$script
+</script>
+</body></html>
+'''
+
+PAGES = {
+    'project': ('$project', '''
+<nav><a class="shortcuts-merge_requests qa-merge-requests-link" href="/$project/merge_requests">Merge Requests</a></nav>
+<h1>$project</h1>
+''', ''),
+
+    'merge_requests': ('Merge Requests · $project', '''
+<h1>Merge Requests</h1>
+<a class="btn btn-success" title="New merge request" href="/$project/merge_requests/new">New merge request</a>
+''', ''),
+
+    'compare': ('New Merge Request · $project', '''
+<form method="get" action="/$project/merge_requests/new">
+  <input type="hidden" name="merge_request[source_branch]" id="source_branch">
+  <input type="hidden" name="merge_request[target_branch]" id="target_branch">
+  <div>
+    <button class="dropdown-menu-toggle js-compare-dropdown js-source-branch monospace" type="button" data-toggle="dropdown" data-for="source">选择源分支</button>
+    <div class="dropdown-menu dropdown-menu-selectable js-source-branch-dropdown git-revision-dropdown"><ul>$branches</ul></div>
+  </div>
+  <div>
+    <button class="dropdown-menu-toggle js-compare-dropdown js-target-branch monospace" type="button" data-toggle="dropdown" data-for="target">选择目标分支</button>
+    <div class="dropdown-menu dropdown-menu-selectable js-target-branch-dropdown git-revision-dropdown"><ul>$branches</ul></div>
+  </div>
+  <input type="submit" name="commit" class="btn btn-success mr-compare-btn" value="Compare branches and continue">
+</form>
+''', '''
+  document.addEventListener('click', function (e) {
+    var toggle = e.target.closest('[data-toggle=dropdown]');
+    if (toggle) {
+      toggle.nextElementSibling.classList.toggle('show');
+      return;
+    }
+    var item = e.target.closest('.dropdown-menu li');
+    if (item) {
+      var menu = item.closest('.dropdown-menu');
+      var which = menu.previousElementSibling.getAttribute('data-for');
+      document.getElementById(which + '_branch').value = item.textContent;
+      menu.previousElementSibling.textContent = item.textContent;
+      menu.classList.remove('show');
+    }
+  });
+'''),
+
+    'new': ('New Merge Request · $project', '''
+<form method="post" action="/$project/merge_requests">
+  <input type="hidden" name="merge_request[source_branch]" value="$source">
+  <input type="hidden" name="merge_request[target_branch]" value="$target">
+  <p>From <code>$source</code> into <code>$target</code></p>
+  <input type="text" name="merge_request[title]" value="Merge $source into $target">
+  <input type="submit" name="commit" class="btn btn-success qa-issuable-create-button" value="Submit merge request">
+</form>
+''', ''),
+
+    'show': ('!$iid · $project', '''
+<h1>!$iid $source → $target</h1>
+<div class="mr-widget">
+  <span class="mr-status">正在检查能否合并...</span>
+  <button class="qa-merge-button btn btn-sm btn-success accept-merge-request" type="button" disabled>Merge</button>
+</div>
+''', '''
+  window.onRendered = function () {
+    var button = document.querySelector('.accept-merge-request');
+    setTimeout(function () {
+      button.disabled = false;
+      document.querySelector('.mr-status').textContent = '可以合并';
+    }, $merge_check_ms);
+    button.addEventListener('click', function () {
+      button.disabled = true;
+      fetch('/$project/merge_requests/$iid/merge', {method: 'POST'})
+        .then(function (r) { return r.json(); })
+        .then(function (data) { document.querySelector('.mr-status').textContent = data.state || data.message; });
+    });
+  };
+'''),
+
+    'cms': ('CMS v1.0-live', '''
+<h2>资产管理 / 刷新链接</h2>
+<form id="refresh">
+  <textarea id="url" placeholder="每行一个 URL"></textarea>
+  <button class="ant-btn ant-btn-primary" type="submit">提交</button>
+</form>
+<p id="result"></p>
+''', '''
+  document.addEventListener('submit', function (e) {
+    e.preventDefault();
+    var urls = document.getElementById('url').value.split('\\n').filter(function (u) { return u.trim(); });
+    fetch('$refresh_path', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                            body: JSON.stringify({urls: urls})})
+      .then(function (r) { return r.json(); })
+      .then(function (data) { document.getElementById('result').textContent = data.message; });
+  });
+'''),
+}
+
+
+class MockPagesState(MockGitLabState):
+    """在 MockGitLabState 的基础上加页面参数和 CMS 刷新记录"""
+
+    def __init__(self, latency=0.0, render_delay=0.0, merge_check=0.0, pages_dir=None, branches=None, **kwargs):
+        super().__init__(latency=latency, branches=branches, **kwargs)
+        self.render_delay = render_delay
+        self.merge_check = merge_check
+        self.pages_dir = pages_dir
+        self.cdn_submitted = []  # 每次在 CMS 页面提交的 URL 列表
+
+    def merged_count(self):
+        with self.lock:
+            return sum(1 for mrs in self.merge_requests.values() for mr in mrs if mr['state'] == 'merged')
+
+
+class MockPagesHandler(MockGitLabHandler):
+
+    def send_html(self, name, **values):
+        title, body, script = PAGES[name]
+        recorded = os.path.join(self.state.pages_dir or '', f'{name}.html')
+        if self.state.pages_dir and os.path.exists(recorded):
+            with open(recorded, 'r', encoding='utf-8') as f:
+                page = f.read()
+        else:
+            page = LAYOUT.replace('$title', title).replace('$body', body).replace('$script', script)
+        values = dict(values, refresh_path=CMS_REFRESH_PATH,
+                      render_delay_ms=int(self.state.render_delay * 1000),
+                      merge_check_ms=int(self.state.merge_check * 1000))
+        data = Template(page).safe_substitute(values).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def redirect(self, location):
+        self.send_response(303)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def page(self, method):
+        """页面路由, 返回 False 表示不是页面地址"""
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        if path == CMS_PATH.rstrip('/') or path == CMS_PATH:
+            self.send_html('cms')
+        elif path == CMS_REFRESH_PATH and method == 'POST':
+            urls = self.read_body().get('urls') or []
+            with self.state.lock:
+                self.state.cdn_submitted.append(urls)
+            self.send_json(200, {'code': 0, 'message': f'已提交 {len(urls)} 个 URL'})
+        elif m := re.match(r'^/(.+?)(?:/-)?/merge_requests/new$', path):
+            source = query.get('merge_request[source_branch]')
+            target = query.get('merge_request[target_branch]')
+            if source and target:
+                self.send_html('new', project=m.group(1), source=escape(source), target=escape(target))
+            else:
+                branches = ''.join(f'<li>{escape(b)}</li>' for b in self.state.branches)
+                self.send_html('compare', project=m.group(1), branches=branches)
+        elif (m := re.match(r'^/(.+?)(?:/-)?/merge_requests$', path)) and method == 'POST':
+            form = self.read_body()
+            mr, _ = self.state.open_mr(m.group(1), form.get('merge_request[source_branch]'),
+                                       form.get('merge_request[target_branch]'),
+                                       form.get('merge_request[title]', ''), self.headers.get('Host'))
+            self.redirect(f"/{m.group(1)}/merge_requests/{mr['iid']}")
+        elif m := re.match(r'^/(.+?)(?:/-)?/merge_requests$', path):
+            self.send_html('merge_requests', project=m.group(1))
+        elif (m := re.match(r'^/(.+?)(?:/-)?/merge_requests/(\d+)/merge$', path)) and method == 'POST':
+            status, mr = self.state.merge(m.group(1), m.group(2), self.headers.get('Host'))
+            self.send_json(status, mr if status == 200 else {'message': mr})
+        elif m := re.match(r'^/(.+?)(?:/-)?/merge_requests/(\d+)$', path):
+            mr = self.state.find_mr(m.group(1), m.group(2))
+            if not mr:
+                return self.send_json(404, {'message': '404 Not found'})
+            self.send_html('show', project=m.group(1), iid=mr['iid'],
+                           source=escape(mr['source_branch']), target=escape(mr['target_branch']))
+        elif m := re.match(r'^/([^/]+/[^/]+)/?$', path):
+            self.send_html('project', project=m.group(1))
+        else:
+            return False
+        return True
+
+    def dispatch(self, method):
+        if self.path.startswith('/api/v4/'):
+            return super().dispatch(method)
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        self.state.requests.append((method, urlsplit(self.path).path))
+        if not self.page(method):
+            self.send_json(404, {'message': '404 Not Found'})
+
+
+def start_mock_pages(port=0, latency=0.0, render_delay=0.0, merge_check=0.0, pages_dir=None, branches=None):
+    """在后台线程启动模拟页面, 返回 (server, base_url), 用完调用 server.shutdown()"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockPagesHandler)
+    server.daemon_threads = True
+    server.state = MockPagesState(latency, render_delay, merge_check, pages_dir, branches)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 GitLab / CMS 页面')
+    parser.add_argument('--port', type=int, default=8931)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求服务端延迟的秒数')
+    parser.add_argument('--render-delay', type=float, default=0.0, help='页面打开后多久渲染出主要元素')
+    parser.add_argument('--merge-check', type=float, default=0.0, help='合并按钮多久后可以点')
+    parser.add_argument('--pages-dir', help='录下来的页面目录, 有同名文件就用它代替内置页面')
+    parser.add_argument('--branch', action='append', default=[], help='额外的分支名, 可以写多次')
+    args = parser.parse_args()
+
+    server, base_url = start_mock_pages(args.port, args.latency, args.render_delay, args.merge_check,
+                                        args.pages_dir, ['master', 'dev', 'pre'] + args.branch)
+    print(f"模拟页面已启动: {base_url}/<group>/<project>  {base_url}{CMS_PATH}, Ctrl+C 退出")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
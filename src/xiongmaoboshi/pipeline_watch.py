@@ -0,0 +1,132 @@
+"""
+合并完盯流水线: 用 asyncio 同时轮询每个仓库合并提交的流水线, 全部结束后返回,
+都成功了还可以接着跑 pipelineFollowUp 配的命令 (比如刷新 CDN)。
+
+- 所有仓库共用一个连接池, 每次轮询放到线程里跑 (asyncio.to_thread), 不阻塞事件循环
+- 每次请求带上次的 ETag, 没变化时 GitLab 只回 304
+- 状态没变化就逐渐拉长轮询间隔 (最长 pipelinePollMax 秒), 一有变化马上恢复
+
+    python src/xiongmaoboshi/pipeline_watch.py <仓库地址> <提交 sha>     单独盯一个提交
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.http_pool import HTTPError, shared_pool, configure_shared_pool
+from src.xiongmaoboshi.gitlab_api import GitLabClient, GitLabError, split_project_url, get_token
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+
+FINISHED = {'success', 'failed', 'canceled', 'skipped', 'manual'}  # manual 要人去点, 也算结束
+MAX_ERRORS = 5  # 连续这么多次请求失败就放弃这个仓库
+
+
+async def watch_pipeline(client, project, sha, timeout=1800, interval=5, max_interval=60, grace=120):
+    """
+    轮询一个提交的流水线直到结束, 返回 {'status', 'pipeline', 'url', 'seconds', 'polls'}。
+    grace 秒内一直没有流水线 (仓库没配 CI) 返回 status=none。
+    """
+    start = time.monotonic()
+    etag, latest, wait, polls, errors = None, None, interval, 0, 0
+    while True:
+        polls += 1
+        changed = False
+        try:
+            pipelines, etag = await asyncio.to_thread(client.list_pipelines, project, sha, etag)
+            errors = 0
+        except (GitLabError, HTTPError) as e:
+            errors += 1
+            if errors >= MAX_ERRORS:
+                return {'status': 'error', 'pipeline': None, 'url': '', 'detail': str(e),
+                        'seconds': time.monotonic() - start, 'polls': polls}
+            pipelines = None
+        if pipelines:
+            newest = max(pipelines, key=lambda p: p['id'])
+            changed = latest is None or (newest['id'], newest['status']) != (latest['id'], latest['status'])
+            latest = newest
+            if changed:
+                print(f"  [{project}] 流水线 #{latest['id']} {latest['status']}")
+        elapsed = time.monotonic() - start
+        result = {'pipeline': latest and latest['id'], 'url': (latest or {}).get('web_url', ''), 'detail': '',
+                  'seconds': elapsed, 'polls': polls}
+        if latest and latest['status'] in FINISHED:
+            return dict(result, status=latest['status'])
+        if not latest and elapsed > grace:
+            return dict(result, status='none', detail=f"{grace}s 内没有出现流水线")
+        if elapsed > timeout:
+            return dict(result, status='timeout', detail=f"最后状态 {latest['status'] if latest else '无'}")
+        wait = interval if changed else min(max_interval, wait * 1.5)
+        await asyncio.sleep(wait + random.uniform(0, wait / 5))
+
+
+async def watch_all(targets, token, timeout=1800, interval=5, max_interval=60, grace=120, pool=None):
+    """targets: [{'openurl', 'sha', 'label'}], 并发盯所有流水线, 返回和 targets 一一对应的结果"""
+    pool = pool or shared_pool()
+
+    async def one(target):
+        base_url, project = split_project_url(target['openurl'])
+        client = GitLabClient(base_url, token, pool)
+        result = await watch_pipeline(client, project, target['sha'], timeout, interval, max_interval, grace)
+        return dict(result, label=target.get('label') or project, sha=target['sha'])
+
+    return await asyncio.gather(*(one(t) for t in targets))
+
+
+def print_pipeline_report(results):
+    print(f"\n流水线结果 ({len(results)} 个):")
+    for r in results:
+        mark = '✓' if r['status'] in ('success', 'none') else '✗'
+        pipeline = f"#{r['pipeline']}" if r['pipeline'] else ''
+        print(f"  {mark} {r['status']:<9} {r['label']:<40} {pipeline:<8} {r['seconds']:6.0f}s "
+              f"(轮询 {r['polls']} 次) {r['detail'] or r['url']}")
+
+
+def run_follow_up(command):
+    print(f"流水线都通过了, 执行: {command}")
+    return subprocess.run(command, shell=True, cwd=project_root).returncode == 0
+
+
+def watch_merged(targets, config):
+    """
+    合并完调用: 盯完所有流水线, 打印结果; 全部成功 (或者仓库没有 CI) 且配了 pipelineFollowUp 就执行它。
+    返回是否全部成功。
+    """
+    targets = [t for t in targets if t.get('sha')]
+    if not targets:
+        print("没有拿到合并提交, 不用盯流水线")
+        return True
+    print(f"开始盯 {len(targets)} 个合并提交的流水线...")
+    results = asyncio.run(watch_all(
+        targets, get_token(config),
+        timeout=config.get('pipelineTimeout', 1800),
+        interval=config.get('pipelinePoll', 5),
+        max_interval=config.get('pipelinePollMax', 60),
+        grace=config.get('pipelineGrace', 120),
+    ))
+    print_pipeline_report(results)
+    ok = all(r['status'] in ('success', 'none') for r in results)
+    follow_up = config.get('pipelineFollowUp')
+    if ok and follow_up:
+        ok = run_follow_up(follow_up)
+    elif follow_up:
+        print(f"有流水线没通过, 不执行 {follow_up}")
+    return ok
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    import yaml
+
+    with open(os.path.join(current_dir, 'const.yaml'), 'r', encoding='utf-8') as f:
+        const = yaml.safe_load(f)
+    configure_shared_pool(const)
+    ok = watch_merged([{'openurl': sys.argv[1], 'sha': sys.argv[2]}], dict(const, pipelineFollowUp=None))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,73 @@
+"""
+刷新前先把 cdnUrl 整理一遍:
+1. 规范化: scheme/host 小写, 去掉默认端口和 #hash (hash 不会发给服务器, /dev/#/ 和 /dev/#/rights 是同一个地址),
+   可选去掉 query (?buttonTap=pageBackInToc 这种对 CDN 缓存是同一个文件时),
+2. 去重: 非根路径结尾有没有 / 算同一个 (/minisite/course 和 /minisite/course/), 两种都有时留带 / 的
+   (build.py 给 index.html 生成的目录地址带 /, 去掉的话刷的就是另一个缓存了)
+3. 同一个目录下的 URL 数量达到阈值就合并成一个目录刷新 (比如 cs-user-h5/assets/icons/ 下的一堆图片)
+"""
+import posixpath
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url, drop_query=True):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    query = '' if drop_query else parts.query
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def dedup_key(url):
+    """去重用: 去掉非根路径结尾的 /"""
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(path=parts.path.rstrip('/') or '/'))
+
+
+def parent_dir(url):
+    """https://a.com/x/y/z.png -> https://a.com/x/y/ ; https://a.com/x/y/ -> https://a.com/x/"""
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/')
+    parent = posixpath.dirname(path)
+    parent = parent if parent.endswith('/') else parent + '/'
+    return urlunsplit((parts.scheme, parts.netloc, parent, '', ''))
+
+
+def minimize(urls, drop_query=True, dir_threshold=5, dir_prefixes=()):
+    """
+    返回 (files, dirs): 要按文件刷新的 URL 和要按目录刷新的目录 (以 / 结尾)。
+    dir_threshold: 同一目录下至少这么多个 URL 才合并成目录刷新, 0 表示不合并。
+    dir_prefixes: 只有在这些前缀下面的目录才允许合并, 为空表示都允许。
+    """
+    unique = {}
+    for url in urls:
+        url = normalize_url(url, drop_query)
+        key = dedup_key(url)
+        if key not in unique or url.endswith('/'):
+            unique[key] = url  # 位置还是第一次出现的位置
+    seen = list(unique.values())
+
+    groups = {}
+    for url in seen:
+        groups.setdefault(parent_dir(url), []).append(url)
+
+    dirs = []
+    if dir_threshold:
+        for directory, members in groups.items():
+            if urlsplit(directory).path == '/':
+                continue  # 不会整站刷新
+            if dir_prefixes and not any(directory.startswith(p) for p in dir_prefixes):
+                continue
+            if len(members) >= dir_threshold:
+                dirs.append(directory)
+
+    # 被更上层目录覆盖的目录不用单独刷
+    dirs = [d for d in dirs if not any(d != other and d.startswith(other) for other in dirs)]
+    # 目录本身 (/minisite/course/ 或者不带 / 的 /minisite/course) 也在目录刷新范围内
+    files = [u for u in seen if not any(u.startswith(d) or u + '/' == d for d in dirs)]
+    return files, dirs
@@ -1,4 +1,5 @@
 import platform
+import re
 from DrissionPage import ChromiumOptions, Chromium, ChromiumPage
 from DrissionPage.common import Settings
 import subprocess
@@ -10,10 +11,17 @@ import shutil
 import stat
 import yaml
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.utils.open_browser_old_user_data import open_browser
+from src.utils.page_waits import PageWaiter, WaitTimeout
+from src.utils.step_trace import StepTracer
+from src.utils.http_pool import HTTPError, shared_pool, configure_shared_pool
+from src.xiongmaoboshi.gitlab_api import GitLabClient, GitLabError, MergeConflict, split_project_url, get_token
+from src.xiongmaoboshi.branch_cache import BranchResolver, mr_form_url
+from src.xiongmaoboshi.pipeline_watch import watch_merged
 
 # 读取const.yaml文件
 def get_const():
@@ -23,86 +31,346 @@ def get_const():
         return yaml.safe_load(file)
 
 
-def open_and_click():
+def check_branches(config, branches=None, client=None):
+    """
+    配了 token 就先用分支缓存确认分支都存在 (默认 devNode / targetNode), 不存在直接报错并给出相近的分支名
+    传了 client 就用它, 不再自己取 token
+    """
+    branches = branches or [config['devNode'], config['targetNode']]
+    base_url, project = split_project_url(config['openurl'])
+    if client is None:
+        try:
+            client = GitLabClient(base_url, get_token(config))
+        except GitLabError:
+            return  # 没有 token 就不检查, 交给页面去报错
+    start = time.time()
+    resolver = BranchResolver(client, base_url, ttl=config.get('branchCacheTtl', 600))
+    missing = resolver.missing(project, branches)
+    for name in missing:
+        similar = resolver.suggest(project, name)
+        print(f"分支 {name} 不存在" + (f", 是不是: {', '.join(similar)}" if similar else ''))
+    if missing:
+        raise GitLabError(f"{project} 没有分支 {', '.join(missing)}", 404)
+    print(f"分支确认: {' -> '.join(branches)}, 耗时 {time.time() - start:.2f}s")
+
+
+def open_mr_form_by_url(page, waiter, tracer, config):
+    """直接打开已经选好源/目标分支的新建 MR 页面"""
+    check_branches(config)
+    base_url, project = split_project_url(config['openurl'])
+    url = mr_form_url(base_url, project, config['devNode'], config['targetNode'],
+                      config.get('mrNewPath', '/merge_requests/new'))
+    print("打开新建合并请求页面...")
+    tracer.call('get', page.get, url, step='打开新建合并请求页', locator=url)
+
+
+def open_mr_form_by_dropdown(page, waiter, tracer, config):
+    """老办法: 从项目页一路点进新建 MR, 在下拉框里找分支"""
+    # 打开目标网址
+    print("打开目标网址...")
+    tracer.call('get', page.get, config['openurl'], step='打开项目页', locator=config['openurl'])
+
+
+    waiter.ele('tag:a@@class=shortcuts-merge_requests qa-merge-requests-link', step='项目页加载')
+    page.stop_loading()
+
+
+    print("开始执行页面操作...")
+
+    print("开始点击 merge requests 链接...")
+    # 等链接可点击再点, 然后等跳转到合并请求列表
+    waiter.click('tag:a@@class=shortcuts-merge_requests qa-merge-requests-link', step='merge requests 链接')
+    waiter.navigation('merge_requests', step='进入合并请求列表')
+
+
+    print("开始点击新建合并请求按钮...")
+
+    # 新建合并请求按钮有两种, 哪个先出现点哪个
+    locator, _ = waiter.first([
+        'tag:a@@title=新建合并请求@@id^new_merge_request_body_link',
+        'tag:a@@class=btn btn-success@@title=New merge request',
+    ], step='新建合并请求按钮')
+    waiter.click(locator, step='点击新建合并请求按钮')
+    print("点击了新建合并请求按钮")
+    waiter.navigation('merge_requests/new', step='进入新建合并请求页')
+
+    # 左边分支 名字
+    menu = waiter.dropdown_open(
+        'tag:button@@class=dropdown-menu-toggle js-compare-dropdown js-source-branch monospace@@type=button@@data-toggle=dropdown',
+        'tag:div@@class=dropdown-menu dropdown-menu-selectable js-source-branch-dropdown git-revision-dropdown show',
+        step='左边分支下拉框',
+    )
+    waiter.click('tag:li@@text()=' + config['devNode'], within=menu, step='选择左边分支')
+    print("点击了 左边分支")
+
+
+    # 右边分支 名字
+    menu = waiter.dropdown_open(
+        'tag:button@@class=dropdown-menu-toggle js-compare-dropdown js-target-branch monospace@@type=button@@data-toggle=dropdown',
+        'tag:div@@class=dropdown-menu dropdown-menu-selectable js-target-branch-dropdown git-revision-dropdown show',
+        step='右边分支下拉框',
+    )
+    waiter.click('tag:li@@text()=' + config['targetNode'], within=menu, step='选择右边分支')
+    print("点击了 右边分支")
+
+    waiter.click('tag:input@@type=submit@@name=commit@@class=btn btn-success mr-compare-btn', step='比较分支按钮')
+
+
+def open_and_click(config=None, tracer=None):
+    tracer = tracer or StepTracer('push_flow')
     try:
-        config = get_const()
+        config = config or get_const()
 
         # 创建浏览器对象
-        browser = open_browser()
+        with tracer.step('启动浏览器', action='launch'):
+            browser = open_browser(isolated=config.get('isolatedBrowser', False), fast=config.get('fastBrowser', False))
 
         # 获取最新标签页
         page = browser.latest_tab
         page.set.load_mode.none()
+        waiter = PageWaiter(page, timeout=config.get('waitTimeout', 15), tracer=tracer)
 
-        # 打开目标网址
-        print("打开目标网址...")
-        page.get(config['openurl'])
+        # branchPicker: url 直接打开选好分支的页面, dropdown 在下拉框里找分支
+        if config.get('branchPicker', 'url') == 'dropdown':
+            open_mr_form_by_dropdown(page, waiter, tracer, config)
+        else:
+            open_mr_form_by_url(page, waiter, tracer, config)
 
+        # 点击创建合并请求
+        waiter.click('tag:input@@type=submit@@name=commit@@class=btn btn-success qa-issuable-create-button', step='提交合并请求按钮')
+        print("点击了 合并请求")
 
-        page.ele('tag:a@@class=shortcuts-merge_requests qa-merge-requests-link')  # 查找text包含"中国日报"的元素
-        page.stop_loading()
 
+        # 合并按钮要等合并检查做完才可点击
+        waiter.click('tag:button@@class=qa-merge-button btn btn-sm btn-success accept-merge-request', step='合并按钮')
+        print("点击了 最后的合并按钮")
+        waiter.network_idle(step='等待合并请求发送完成')
+        return page
 
-        print("开始执行页面操作...")
+    except WaitTimeout as e:
+        print(f"等待超时: {e}")
+        return None
+    except Exception as e:
+        print(f"发生错误: {e}")
+        return None
+    finally:
+        tracer.finish()
 
-        print("开始点击 merge requests 链接...")
-        # 等待并点击元素，使用显式等待
-        shortcuts_merge_requests = page.ele('tag:a@@class=shortcuts-merge_requests qa-merge-requests-link')
+def merge_via_api(config=None):
+    """API 模式: 直接调 GitLab 接口创建并合并 devNode -> targetNode 的 MR"""
+    config = config or get_const()
+    start = time.time()
+    try:
+        check_branches(config)
+        base_url, project = split_project_url(config['openurl'])
+        client = GitLabClient(base_url, get_token(config))
 
-        shortcuts_merge_requests.click()
-        time.sleep(2)
+        mr = client.create_merge_request(project, config['devNode'], config['targetNode'])
+        print(f"创建了合并请求 !{mr['iid']}: {mr.get('web_url', '')}")
 
+        mr = client.accept_merge_request(project, mr['iid'])
+        print(f"合并完成 !{mr['iid']} ({config['devNode']} -> {config['targetNode']}), 耗时 {time.time() - start:.2f}s")
+        return mr
+    except MergeConflict as e:
+        print(f"有冲突, 合并不了: {e}")
+        return None
+    except GitLabError as e:
+        print(f"GitLab 接口出错: {e}")
+        return None
+    except HTTPError as e:
+        print(f"连不上 GitLab: {e}")
+        return None
 
-        print("开始点击新建合并请求按钮...")
 
-        # 尝试点击新建合并请求按钮
-        new_merge_request_body_link = page.ele('tag:a@@title=新建合并请求@@id^new_merge_request_body_link')
-        if new_merge_request_body_link:
-            new_merge_request_body_link.click()
-            print("点击了新建合并请求按钮")
-        else:
-            print("尝试查找替代的新建合并请求按钮...")
-            new_merge_request = page.ele('tag:a@@class=btn btn-success@@title=New merge request')
-            if new_merge_request:
-                new_merge_request.click()
-                print("点击了替代的新建合并请求按钮")
+def prepare_hop(client, project, source, target):
+    """没有新提交返回 skipped, 否则建好 MR 并等 GitLab 做完合并检查"""
+    if source == target or not client.has_changes(project, source, target):
+        return 'skipped', None, f"{source} 没有需要合进 {target} 的提交"
+    mr = client.create_merge_request(project, source, target)
+    return 'ready', client.wait_mergeable(project, mr['iid']), ''
 
-        time.sleep(1)
 
-        # 左边分支 名字
-        page.ele('tag:button@@class=dropdown-menu-toggle js-compare-dropdown js-source-branch monospace@@type=button@@data-toggle=dropdown').click()
-        time.sleep(2)
-        page.ele('tag:div@@class=dropdown-menu dropdown-menu-selectable js-source-branch-dropdown git-revision-dropdown show').ele('tag:li@@text()='+config['devNode']).click()
-        time.sleep(2)
-        print("点击了 左边分支")
+def accept_hop(client, project, mr):
+    try:
+        return 'merged', client.accept_merge_request(project, mr['iid']), ''
+    except MergeConflict as e:
+        return 'conflict', mr, str(e)
+    except GitLabError as e:
+        # 比如流水线没过/需要审批, MR 已经建好了, 留给人处理
+        return 'created', mr, str(e)
 
 
-        # 右边分支 名字
-        page.ele('tag:button@@class=dropdown-menu-toggle js-compare-dropdown js-target-branch monospace@@type=button@@data-toggle=dropdown').click()
-        time.sleep(2)
-        page.ele('tag:div@@class=dropdown-menu dropdown-menu-selectable js-target-branch-dropdown git-revision-dropdown show').ele('tag:li@@text()='+config['targetNode']).click()
-        time.sleep(2)
-        print("点击了 右边分支")
+def merge_one(client, project, source, target):
+    """单个仓库: 没有新提交就跳过, 否则建 MR 并合并, 返回状态和说明"""
+    status, mr, detail = prepare_hop(client, project, source, target)
+    if status == 'skipped':
+        return status, mr, detail
+    return accept_hop(client, project, mr)
 
 
-        # 点击创建合并请求
-        page.ele('tag:input@@type=submit@@name=commit@@class=btn btn-success mr-compare-btn').click()
-        time.sleep(1)
-        page.ele('tag:input@@type=submit@@name=commit@@class=btn btn-success qa-issuable-create-button').click()
-        time.sleep(3)
-        print("点击了 合并请求")
+def merge_batch(config=None, max_workers=None):
+    """
+    批量模式: const.yaml 的 batch 里每一项是一个仓库 (openurl / devNode / targetNode),
+    没写 devNode/targetNode 的用最外层的, 有限并发地一起处理, 最后打印结果表
+    """
+    config = config or get_const()
+    jobs = config.get('batch') or []
+    if not jobs:
+        print("const.yaml 里没有配置 batch 列表")
+        return []
+    max_workers = max_workers or config.get('batchParallel', 4)
+    pool = shared_pool()  # 所有仓库共用一个连接池, 每个 host 的并发/限速按 const.yaml 的 http 段
 
+    def run(job):
+        source = job.get('devNode', config.get('devNode'))
+        target = job.get('targetNode', config.get('targetNode'))
+        base_url, project = split_project_url(job['openurl'])
+        start = time.time()
+        try:
+            # batch 里单个仓库可以写自己的 gitlabToken, 没 token 只影响这一个仓库
+            client = GitLabClient(base_url, get_token(dict(config, **job)), pool)
+            check_branches(dict(config, **job), [source, target], client)
+            status, mr, detail = merge_one(client, project, source, target)
+        except (GitLabError, HTTPError) as e:
+            status, mr, detail = 'error', None, str(e)
+        return {
+            'repo': project, 'source': source, 'target': target, 'status': status,
+            'mr': f"!{mr['iid']}" if mr else '', 'detail': detail, 'seconds': time.time() - start,
+            'openurl': job['openurl'], 'sha': mr.get('merge_commit_sha') if status == 'merged' else None,
+        }
 
-        # 点击合并
-        page.ele('tag:button@@class=qa-merge-button btn btn-sm btn-success accept-merge-request').click()
-        print("点击了 最后的合并按钮")
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(run, jobs))
 
-        # time.sleep(3)
+    print(f"\n批量合并结果 ({len(results)} 个仓库, 耗时 {time.time() - start:.2f}s):")
+    print(f"{'仓库':<40} {'分支':<30} {'状态':<10} {'MR':<6} 说明")
+    for r in results:
+        branches = f"{r['source']} -> {r['target']}"
+        print(f"{r['repo']:<40} {branches:<30} {r['status']:<10} {r['mr']:<6} {r['detail']}")
+    return results
 
 
-    except Exception as e:
-        print(f"发生错误: {e}")
+def promote_chain(config=None):
+    """
+    多跳晋升: devNode -> promoteChain[0] -> promoteChain[1] ... 依次建 MR 并合并, 遇到冲突就停。
+    前面的跳已经合过去 (没有新提交) 时, 后面一跳的 MR 会同时准备; 每一跳合并完马上开始准备下一跳。
+    """
+    config = config or get_const()
+    chain = config.get('promoteChain') or []
+    branches = [config['devNode']] + [b for b in chain if b != config['devNode']]
+    hops = list(zip(branches, branches[1:]))
+    if not hops:
+        print("const.yaml 里没有配置 promoteChain")
+        return []
+
+    start = time.time()
+    base_url, project = split_project_url(config['openurl'])
+    print(f"晋升链: {' -> '.join(branches)}")
+
+    try:
+        # 没 token 或者链上有分支不存在, 一跳都不做
+        client = GitLabClient(base_url, get_token(config))
+        check_branches(config, branches, client)
+    except (GitLabError, HTTPError) as e:
+        print(f"晋升没法开始: {e}")
+        return [{'source': source, 'target': target, 'status': 'error' if i == 0 else 'not run', 'mr': '',
+                 'detail': str(e) if i == 0 else ''} for i, (source, target) in enumerate(hops)]
+
+    results = []
+    with ThreadPoolExecutor(max_workers=len(hops)) as executor:
+        futures = {}
+
+        def schedule(i):
+            if i < len(hops) and i not in futures:
+                futures[i] = executor.submit(prepare_hop, client, project, *hops[i])
+
+        try:
+            # 先并发比较每一跳, 已经合过去的前缀和第一个要合并的跳可以一起准备
+            changed = list(executor.map(lambda hop: client.has_changes(project, *hop), hops))
+        except (GitLabError, HTTPError) as e:
+            print(f"比较分支出错, 只准备第一跳: {e}")
+            changed = [True]
+        for i, has_changes in enumerate(changed):
+            schedule(i)
+            if has_changes:
+                break
+
+        for i, (source, target) in enumerate(hops):
+            schedule(i)
+            try:
+                status, mr, detail = futures[i].result()
+                if status == 'ready':
+                    status, mr, detail = accept_hop(client, project, mr)
+            except (GitLabError, HTTPError) as e:
+                status, mr, detail = 'error', None, str(e)
+            if status in ('merged', 'skipped'):
+                schedule(i + 1)
+            results.append({'source': source, 'target': target, 'status': status,
+                            'mr': f"!{mr['iid']}" if mr else '', 'detail': detail,
+                            'sha': mr.get('merge_commit_sha') if status == 'merged' else None})
+            print(f"  {source} -> {target}: {status} {results[-1]['mr']} {detail}")
+            if status not in ('merged', 'skipped'):
+                print(f"晋升停在 {source} -> {target} ({status}), 后面的跳不再执行")
+                break
+
+    for source, target in hops[len(results):]:
+        results.append({'source': source, 'target': target, 'status': 'not run', 'mr': '', 'detail': ''})
+        print(f"  {source} -> {target}: 没有执行")
+    print(f"晋升结束, 耗时 {time.time() - start:.2f}s")
+    return results
+
+
+def merged_commit(config, page_url, timeout=60, interval=1):
+    """
+    浏览器模式合并完, 从页面地址 (.../merge_requests/<iid>) 拿到刚才那个 MR,
+    轮询到它真的合并了、有合并提交为止 (没有 token 就拿不到)。
+    不按分支查最近合并的 MR: 点完合并按钮 GitLab 还在合并时, 查到的是上一个
+    """
+    m = re.search(r'/merge_requests/(\d+)', page_url or '')
+    if not m:
+        print(f"页面地址里没有 MR 编号 ({page_url}), 不盯流水线")
+        return None
+    iid = int(m.group(1))
+    deadline = time.time() + timeout
+    try:
+        base_url, project = split_project_url(config['openurl'])
+        client = GitLabClient(base_url, get_token(config))
+        while True:
+            mr = client.get_merge_request(project, iid)
+            if mr.get('state') == 'merged' and mr.get('merge_commit_sha'):
+                return mr['merge_commit_sha']
+            if mr.get('state') == 'closed' or time.time() > deadline:
+                print(f"!{iid} 状态是 {mr.get('state')}, 没拿到合并提交, 不盯流水线")
+                return None
+            time.sleep(interval)
+    except (GitLabError, HTTPError) as e:
+        print(f"查不到合并提交, 不盯流水线: {e}")
         return None
 
+
 if __name__ == "__main__":
-    page = open_and_click()
+    config = get_const()
+    configure_shared_pool(config)
+    targets = []
+    # const.yaml 里 pushMode: api 或者命令行带 --api 走接口, 否则还是点网页
+    if '--batch' in sys.argv:
+        targets = merge_batch(config)
+    elif '--promote' in sys.argv:
+        targets = [dict(r, openurl=config['openurl'], label=f"{r['source']} -> {r['target']}")
+                   for r in promote_chain(config)]
+    elif '--api' in sys.argv or config.get('pushMode') == 'api':
+        mr = merge_via_api(config)
+        if mr:
+            targets = [{'openurl': config['openurl'], 'sha': mr.get('merge_commit_sha')}]
+    else:
+        page = open_and_click(config)
+        if page and (config.get('watchPipelines') or '--watch' in sys.argv):
+            targets = [{'openurl': config['openurl'], 'sha': merged_commit(config, page.url)}]
+
+    # watchPipelines: true 或者带 --watch, 合并完接着盯流水线
+    ok = True
+    if targets and (config.get('watchPipelines') or '--watch' in sys.argv):
+        ok = watch_merged(targets, config)
+    shared_pool().print_metrics()
+    sys.exit(0 if ok else 1)
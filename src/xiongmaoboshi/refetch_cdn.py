@@ -10,10 +10,23 @@ import shutil
 import stat
 import yaml
 import sys
+import json
+import glob
+import argparse
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.utils.open_browser_old_user_data import open_browser
+from src.xiongmaoboshi.cdn_api import CmsCdnClient, CdnApiError, purge_urls
+from src.xiongmaoboshi.purge_set import minimize, normalize_url
+from src.xiongmaoboshi.cdn_verify import CdnVerifier, print_freshness_report
+from src.utils.step_trace import StepTracer
+from src.utils.http_pool import shared_pool, configure_shared_pool
+
+
+PURGE_JOB_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "dpconfig", "purge-jobs"
+)  # src/jd/build.py 部署完把刷新任务写到这里
 
 
 # 读取const.yaml文件
@@ -24,42 +37,198 @@ def get_const():
         return yaml.safe_load(file)
 
 
-def open_and_click():
+def prepare_urls(config, allow_dirs=True):
+    """
+    规范化、去重, 同目录下 URL 够多就合并成目录刷新, 返回 (文件 URL, 目录)。
+    allow_dirs=False 时不合并目录: 网页上的 textarea 只收单个 URL, 目录只有接口能刷
+    """
+    urls = config.get("cdnUrl") or []
+    files, dirs = minimize(
+        urls,
+        drop_query=config.get("cdnDropQuery", True),
+        dir_threshold=config.get("cdnDirThreshold", 0) if allow_dirs else 0,
+        dir_prefixes=config.get("cdnDirPrefixes") or (),
+    )
+    if len(files) + len(dirs) != len(urls):
+        print(f"刷新列表从 {len(urls)} 条精简到 {len(files)} 个 URL + {len(dirs)} 个目录")
+    for d in dirs:
+        print(f"  目录刷新: {d}")
+    return files, dirs
+
+
+def make_verifier(config):
+    """cdnVerify 打开时返回 CdnVerifier, 否则 None"""
+    if not config.get("cdnVerify"):
+        return None
+    return CdnVerifier(concurrency=config.get("cdnVerifyConcurrency", 8))
+
+
+def verify_refresh(config, verifier, files, baseline, purged_at):
+    """刷新提交后轮询 CDN 节点, 直到都拿到新内容或超时 (目录没法探测, 只验证文件 URL)"""
+    if not verifier or not files:
+        return None
+    print(f"开始验证 {len(files)} 个 URL 是否已刷新...")
+    # 刷新任务里带的预期值 (产物文件大小), key 和 files 一样规范化
+    drop_query = config.get("cdnDropQuery", True)
+    expected = {normalize_url(u, drop_query): v for u, v in (config.get("cdnExpected") or {}).items()}
+    report = verifier.verify(
+        files, baseline, purged_at,
+        timeout=config.get("cdnVerifyTimeout", 120),
+        interval=config.get("cdnVerifyInterval", 5),
+        expected=expected,
+    )
+    print_freshness_report(report)
+    return report
+
+
+def open_and_click(config=None, tracer=None):
+    tracer = tracer or StepTracer('refetch_cdn')
     try:
-        config = get_const()
+        config = config or get_const()
+        urls, _ = prepare_urls(config, allow_dirs=False)
+        verifier = make_verifier(config)
+        baseline = verifier.baseline(urls) if verifier else {}
 
         # 创建浏览器对象
-        browser = open_browser()
+        with tracer.step("启动浏览器", action="launch"):
+            browser = open_browser(isolated=config.get("isolatedBrowser", False), fast=config.get("fastBrowser", False))
 
-        # 获取最新标签页
-        page = browser.latest_tab
+        # 获取最新标签页, 包一层记录每一步耗时
+        page = tracer.page(browser.latest_tab)
         page.set.load_mode.none()
 
         # 打开目标网址
         print("打开目标网址...")
         page.get(config["cdnOpenUrl"])
 
-        page.ele("tag:textarea@@id=url")
+        page.ele("tag:textarea@@id=url", step="资产管理页加载")
         page.stop_loading()
 
         print("开始执行页面操作...")
 
         page.ele("tag:textarea@@id=url").focus()
         page.ele("tag:textarea@@id=url").clear()
-        for index, i in enumerate(config["cdnUrl"]):
+        for index, i in enumerate(urls):
             page.ele("tag:textarea@@id=url").input(i)
-            if index != len(config["cdnUrl"]) - 1:
+            if index != len(urls) - 1:
                 page.actions.key_down("ENTER")
 
         time.sleep(1.5)
-        page.ele("tag:button@@class=ant-btn ant-btn-primary@@type=submit").click()
+        page.ele("tag:button@@class=ant-btn ant-btn-primary@@type=submit", step="提交刷新按钮").click()
+        verify_refresh(config, verifier, urls, baseline, time.time())
 
         # time.sleep(3)
+        return page
 
     except Exception as e:
         print(f"发生错误: {e}")
         return None
+    finally:
+        tracer.finish()
+
+
+def print_purge_report(report):
+    ok = sum(1 for r in report.values() if r['status'] == 'ok')
+    print(f"刷新结果: {ok}/{len(report)} 成功")
+    for url, r in report.items():
+        mark = '✓' if r['status'] == 'ok' else '✗'
+        extra = f" (第 {r['attempts']} 次)" if r['attempts'] > 1 else ''
+        print(f"  {mark} {r['status']:<9} {url}{extra} {r['detail']}")
+
+
+def refresh_via_api(config=None):
+    """
+    API 模式: 按 cdnChunkSize 切块并发提交给 CMS 刷新接口, 受 cdnRate 限速, 被限流自动退避重试,
+    登录态复用浏览器里的 cookie
+    """
+    config = config or get_const()
+    files, dirs = prepare_urls(config)
+    if not files and not dirs:
+        print("cdn.yaml 里没有要刷新的 cdnUrl")
+        return None
+    verifier = make_verifier(config)
+    baseline = verifier.baseline(files) if verifier else {}
+    start = time.time()
+    try:
+        client = CmsCdnClient(
+            config["cdnApiUrl"],
+            field=config.get("cdnApiField", "urls"),
+            dir_field=config.get("cdnDirField", "dirs"),
+            headers=config.get("cdnApiHeaders"),
+        )
+        client.ensure_cookies()
+        options = dict(
+            chunk_size=config.get("cdnChunkSize", 20),
+            concurrency=config.get("cdnConcurrency", 4),
+            rate=config.get("cdnRate", 2),
+        )
+        report = purge_urls(client.refresh, files, **options) if files else {}
+        if dirs:
+            report.update(purge_urls(client.refresh_dirs, dirs, **options))
+        print(f"已提交 {len(files)} 个 URL + {len(dirs)} 个目录刷新, 耗时 {time.time() - start:.2f}s")
+        print_purge_report(report)
+        ok_files = [u for u in files if report[u]['status'] == 'ok']
+        verify_refresh(config, verifier, ok_files, baseline, time.time())
+        return report
+    except CdnApiError as e:
+        print(f"刷新接口出错: {e}")
+        return None
+
+
+def load_job(job_file):
+    with open(job_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def pending_jobs():
+    return sorted(glob.glob(os.path.join(PURGE_JOB_DIR, "*.json")))
+
+
+def finish_job(job_file):
+    """提交成功的任务挪到 done/ 下面, 留个记录"""
+    done_dir = os.path.join(os.path.dirname(job_file), "done")
+    os.makedirs(done_dir, exist_ok=True)
+    shutil.move(job_file, os.path.join(done_dir, os.path.basename(job_file)))
+
+
+def run_job(job_file, use_api):
+    """用部署生成的刷新任务代替 cdn.yaml 里的 cdnUrl, 全部提交成功才算完成"""
+    job = load_job(job_file)
+    print(f"刷新任务 {os.path.basename(job_file)}: {job.get('project', '')} {len(job['urls'])} 个 URL")
+    config = dict(get_const(), cdnUrl=job["urls"], cdnExpected=job.get("expected"))
+    if use_api:
+        report = refresh_via_api(config)
+        done = report is not None and all(r["status"] == "ok" for r in report.values())
+    else:
+        done = open_and_click(config) is not None
+    if done:
+        finish_job(job_file)
+    else:
+        print(f"任务没有全部成功, 保留在 {job_file}")
+    return done
 
 
 if __name__ == "__main__":
-    page = open_and_click()
+    parser = argparse.ArgumentParser(description="刷新 CDN")
+    parser.add_argument("--api", action="store_true", help="直接调 CMS 刷新接口, 不点网页")
+    parser.add_argument("--job", help="提交 build.py 生成的刷新任务文件, 代替 cdn.yaml 里的 cdnUrl")
+    parser.add_argument("--jobs", action="store_true", help=f"提交 {PURGE_JOB_DIR} 下所有没完成的刷新任务")
+    args = parser.parse_args()
+
+    # cdn.yaml 里 cdnMode: api 或者命令行带 --api 直接调接口, 否则还是点网页
+    config = get_const()
+    configure_shared_pool(config)
+    use_api = args.api or config.get("cdnMode") == "api"
+    ok = True
+    if args.job or args.jobs:
+        jobs = [args.job] if args.job else pending_jobs()
+        if not jobs:
+            print("没有待提交的刷新任务")
+        ok = all([run_job(job_file, use_api) for job_file in jobs])
+    elif use_api:
+        report = refresh_via_api(config)
+        ok = report is not None and all(r["status"] == "ok" for r in report.values())
+    else:
+        ok = open_and_click(config) is not None
+    shared_pool().print_metrics()
+    sys.exit(0 if ok else 1)